@@ -0,0 +1,5 @@
+"""Performance benchmarks.
+
+Run the suite with ``python -m benchmarks.runner`` or a single benchmark module
+with ``python -m benchmarks.<name>``.
+"""
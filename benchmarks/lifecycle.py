@@ -0,0 +1,186 @@
+"""Service lifecycle and task scheduling benchmark cases.
+
+Run with ``python -m benchmarks.runner``.
+"""
+import asyncio
+import logging
+import time
+
+from core_service import Service, requirements, task
+from core_service.container import ServiceCollection
+from core_service.logging import set_debug_sampling
+
+from .runner import case
+
+
+class Leaf(Service):
+    pass
+
+
+class Wide(Service):
+    def __init__(self, width: int, **kwargs):
+        super().__init__(**kwargs)
+        self.width = width
+
+    @requirements()
+    async def nested(self):
+        return [Leaf(**self.kwargs) for _ in range(self.width)]
+
+    @property
+    def kwargs(self):
+        return {'monitoring_interval': self._monitoring_interval}
+
+
+class Deep(Service):
+    def __init__(self, depth: int):
+        super().__init__()
+        self.depth = depth
+
+    @requirements()
+    async def nested(self):
+        return [Deep(self.depth - 1)] if self.depth > 1 else []
+
+
+def make_discovery_class(tasks: int, requirements_methods: int) -> type:
+    """Service class with many non-periodic tasks and requirements methods.
+    """
+    namespace = {}
+    for i in range(tasks):
+        async def noop(self):
+            pass
+        namespace['task_%i' % i] = task(periodic=False)(noop)
+    for i in range(requirements_methods):
+        async def no_services(self):
+            return []
+        deps = ('requirements_%i' % (i - 1),) if i else ()
+        namespace['requirements_%i' % i] = requirements(*deps)(no_services)
+    return type('DiscoveryService', (Service,), namespace)
+
+
+@case(params=[{'width': 1000}, {'width': 10000}], quick=[{'width': 100}])
+async def tree_start_stop_wide(width: int):
+    service = Wide(width)
+    await service.start()
+    await service.stop()
+
+
+@case(params=[{'width': 1000, 'sample_rate': 1}, {'width': 1000, 'sample_rate': 100}],
+      quick=[{'width': 100, 'sample_rate': 10}])
+async def tree_start_stop_debug_logging(width: int, sample_rate: int):
+    """Wide tree start and stop with debug logging enabled and written to a null handler.
+    """
+    root = logging.getLogger()
+    level = root.level
+    handler = logging.NullHandler()
+    root.addHandler(handler)
+    root.setLevel(logging.DEBUG)
+    set_debug_sampling(sample_rate)
+    try:
+        service = Wide(width)
+        await service.start()
+        await service.stop()
+    finally:
+        set_debug_sampling(1)
+        root.setLevel(level)
+        root.removeHandler(handler)
+
+
+@case(params=[{'depth': 1000}], quick=[{'depth': 50}])
+async def tree_start_stop_deep(depth: int):
+    service = Deep(depth)
+    await service.start()
+    await service.stop()
+
+
+@case(params=[{'tasks': 50, 'requirements': 50, 'starts': 100}],
+      quick=[{'tasks': 5, 'requirements': 5, 'starts': 10}])
+async def discovery(tasks: int, requirements: int, starts: int):
+    """Class definition plus `starts` start/stop cycles of a service with many tasks and requirements.
+    """
+    cls_started = time.perf_counter()
+    cls = make_discovery_class(tasks, requirements)
+    class_definition = time.perf_counter() - cls_started
+    started = time.perf_counter()
+    for _ in range(starts):
+        service = cls()
+        await service.start()
+        await service.stop()
+    return {
+        'class_definition_seconds': class_definition,
+        'start_stop_seconds': (time.perf_counter() - started) / starts,
+    }
+
+
+@case(params=[{'services': 1000, 'interval': interval, 'duration': 1.} for interval in (.01, .1, 1.)],
+      quick=[{'services': 50, 'interval': .01, 'duration': .1}])
+async def monitoring_overhead(services: int, interval: float, duration: float):
+    """CPU time spent on monitoring of an idle service tree.
+    """
+    service = Wide(services, monitoring_interval=interval)
+    await service.start()
+    cpu_started = time.process_time()
+    await asyncio.sleep(duration)
+    cpu = time.process_time() - cpu_started
+    await service.stop()
+    return {
+        'cpu_seconds_per_second': cpu / duration,
+        'checks_per_second': (services + 1) / interval,
+    }
+
+
+@case(params=[{'workers': workers, 'duration': 1.} for workers in (10, 1000)],
+      quick=[{'workers': 10, 'duration': .1}])
+async def periodic_throughput(workers: int, duration: float):
+    """Iterations per second of a periodic task with zero sleep interval.
+    """
+    class Periodic(Service):
+        runs = 0
+
+        @task(sleep_interval=0, workers=workers)
+        async def tick(self):
+            self.runs += 1
+
+    service = Periodic()
+    await service.start()
+    await asyncio.sleep(duration)
+    runs = service.runs
+    await service.stop()
+    return {'runs_per_second': runs / duration}
+
+
+@case(params=[{'services': 1000, 'checks': 10}, {'services': 10000, 'checks': 10}],
+      quick=[{'services': 100, 'checks': 2}])
+async def healthcheck_fanout(services: int, checks: int):
+    """Latency of a collection healthcheck with deep checks of all services.
+    """
+    collection = ServiceCollection()
+    for _ in range(services):
+        leaf = Leaf()
+        leaf.running = True
+        collection.add(leaf)
+    started = time.perf_counter()
+    for _ in range(checks):
+        await collection.healthcheck()
+    latency = (time.perf_counter() - started) / checks
+    for leaf in collection.services:
+        leaf.running = False
+    return {'healthcheck_seconds': latency}
+
+
+@case(params=[{'workers': 10000}, {'workers': 100000}], quick=[{'workers': 1000}])
+async def workers_start_stop(workers: int):
+    """Start and stop of a service running many workers of a single task.
+    """
+    class Workers(Service):
+        @task(sleep_interval=1, workers=workers)
+        async def tick(self):
+            pass
+
+    service = Workers()
+    started = time.perf_counter()
+    await service.start()
+    start_seconds = time.perf_counter() - started
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    await service.stop()
+    return {'start_seconds': start_seconds, 'stop_seconds': time.perf_counter() - started}
@@ -0,0 +1,92 @@
+"""Overhead of the service task iteration bookkeeping.
+
+Measures `ServiceTask._invoke` wrapping a no-op task method: metrics recording,
+worker busy time accounting and tracing check, compared to awaiting the method directly.
+Cost of the metrics recording alone is reported separately.
+
+Usage::
+
+    python -m benchmarks.metrics --iterations 1000000
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from core_service import Service
+from core_service.metrics import TaskMetrics
+from core_service.tasks import ServiceTask
+
+
+async def noop():
+    pass
+
+
+async def invoke(service_task: ServiceTask, iterations: int):
+    for _ in range(iterations):
+        await service_task._invoke(0)
+
+
+async def baseline(service_task: ServiceTask, iterations: int):
+    f = service_task.callable
+    for _ in range(iterations):
+        await f()
+
+
+def record(metrics: TaskMetrics, iterations: int):
+    latency = metrics.latency
+    for _ in range(iterations):
+        metrics.in_flight += 1
+        metrics.in_flight -= 1
+        metrics.iterations += 1
+        latency.record(1e-4)
+
+
+def empty(metrics: TaskMetrics, iterations: int):
+    for _ in range(iterations):
+        pass
+
+
+def best_of(f, args, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        f(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+async def measure_on_loop(iterations: int, repeat: int) -> dict:
+    service_task = ServiceTask(Service(), noop, name='noop')
+    results = {}
+    for name, f in (('baseline', baseline), ('invoke', invoke)):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            await f(service_task, iterations)
+            timings.append(time.perf_counter() - started)
+        results[name] = min(timings)
+    overhead = (results['invoke'] - results['baseline']) / iterations
+    metrics = TaskMetrics()
+    recording = best_of(record, (metrics, iterations), repeat) - best_of(empty, (metrics, iterations), repeat)
+    return {
+        'iterations': iterations,
+        'overhead_us_per_iteration': overhead * 1e6,
+        'record_us_per_iteration': recording / iterations * 1e6,
+    }
+
+
+def measure(iterations: int, repeat: int) -> dict:
+    return asyncio.run(measure_on_loop(iterations, repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(measure(args.iterations, args.repeat), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Benchmark suite runner.
+
+Runs registered benchmark cases and prints JSON results. Results of two runs
+can be compared case by case.
+
+Usage::
+
+    python -m benchmarks.runner --output results.json
+    python -m benchmarks.runner --filter tree --compare results.json
+"""
+import argparse
+import asyncio
+import gc
+import inspect
+import json
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+
+class Case(NamedTuple):
+    """Registered benchmark case.
+    """
+    name: str
+    func: Callable
+    #: parameter sets, case is run once per set
+    params: List[Dict[str, Any]]
+    #: smaller parameter sets used with `--quick`
+    quick_params: List[Dict[str, Any]]
+
+
+CASES: List[Case] = []
+
+
+def case(params: Optional[List[Dict[str, Any]]] = None, quick: Optional[List[Dict[str, Any]]] = None):
+    """Register benchmark case.
+
+    Case is a sync or async function called with parameters of each set. Its execution
+    time is measured. If it returns a dict, values are reported as additional case metrics.
+    """
+    def wrapper(f):
+        params_list = params or [{}]
+        CASES.append(Case(f.__name__, f, params_list, quick or params_list))
+        return f
+
+    return wrapper
+
+
+def run_case(f: Callable, params: Dict[str, Any], rounds: int) -> dict:
+    """Run case `rounds` times in a new event loop each and collect timings in seconds.
+    """
+    timings = []
+    extra: Dict[str, list] = {}
+    for _ in range(rounds):
+        gc.collect()
+        started = time.perf_counter()
+        if inspect.iscoroutinefunction(f):
+            result = asyncio.run(f(**params))
+        else:
+            result = f(**params)
+        timings.append(time.perf_counter() - started)
+        for key, value in (result or {}).items():
+            extra.setdefault(key, []).append(value)
+    return {
+        'rounds': rounds,
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.mean(timings),
+        'max': max(timings),
+        'metrics': {key: statistics.median(values) for key, values in extra.items()},
+    }
+
+
+def run(name_filter: str = '', rounds: int = 3, quick: bool = False) -> dict:
+    """Run cases with name containing `name_filter`.
+    """
+    results = []
+    for registered in CASES:
+        if name_filter not in registered.name:
+            continue
+        for params in (registered.quick_params if quick else registered.params):
+            result = run_case(registered.func, params, rounds)
+            results.append({'name': registered.name, 'params': params, **result})
+            print("%s %s: median %.6f s" % (registered.name, params, result['median']), file=sys.stderr)
+    return {
+        'machine': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+        },
+        'time': time.time(),
+        'quick': quick,
+        'results': results,
+    }
+
+
+def compare(baseline: dict, current: dict) -> List[dict]:
+    """Median time ratio of the current and baseline results of the same cases.
+    """
+    baseline_results = {_key(result): result for result in baseline['results']}
+    comparison = []
+    for result in current['results']:
+        base = baseline_results.get(_key(result))
+        if base is None:
+            continue
+        comparison.append({
+            'name': result['name'],
+            'params': result['params'],
+            'baseline': base['median'],
+            'current': result['median'],
+            'ratio': result['median'] / base['median'] if base['median'] else None,
+        })
+    return comparison
+
+
+def _key(result: dict):
+    return result['name'], json.dumps(result['params'], sort_keys=True)
+
+
+def main():
+    # cases are registered in the imported module, not in `__main__`
+    from . import lifecycle, runner  # noqa
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filter', default='', help="run cases with name containing this string")
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--quick', action='store_true', help="use small parameters")
+    parser.add_argument('--output', help="write results to the file instead of stdout")
+    parser.add_argument('--compare', help="compare results with results file of the previous run")
+    args = parser.parse_args()
+    results = runner.run(args.filter, args.rounds, args.quick)
+    if args.compare:
+        with open(args.compare) as f:
+            results['comparison'] = runner.compare(json.load(f), results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Periodic service tasks sleeping with `asyncio.sleep` versus the shared timer wheel.
+
+Usage::
+
+    python -m benchmarks.timer_wheel --workers 10000 --interval 0.1 --duration 5
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Optional
+
+from core_service import Service, task
+
+
+def make_service(workers: int, interval: float, resolution: Optional[float]) -> Service:
+    class PeriodicService(Service):
+        runs = 0
+
+        @task(sleep_interval=interval, workers=workers, stagger=True)
+        async def tick(self):
+            self.runs += 1
+
+    return PeriodicService(timer_resolution=resolution)
+
+
+async def measure(workers: int, interval: float, duration: float, resolution: Optional[float]) -> dict:
+    service = make_service(workers, interval, resolution)
+    await service.start()
+    # skip staggered start
+    await asyncio.sleep(interval)
+    runs = service.runs
+    started, cpu_started = time.perf_counter(), time.process_time()
+    await asyncio.sleep(duration)
+    elapsed, cpu = time.perf_counter() - started, time.process_time() - cpu_started
+    runs = service.runs - runs
+    await service.stop()
+    return {
+        'timer': 'asyncio.sleep' if resolution is None else 'wheel(%s)' % resolution,
+        'workers': workers,
+        'interval': interval,
+        'runs': runs,
+        'runs_per_second': runs / elapsed,
+        'expected_runs_per_second': workers / interval,
+        'cpu_seconds': cpu,
+        'cpu_us_per_run': cpu / runs * 1e6 if runs else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=10000)
+    parser.add_argument('--interval', type=float, default=.1)
+    parser.add_argument('--duration', type=float, default=3.)
+    parser.add_argument('--resolution', type=float, default=.01)
+    args = parser.parse_args()
+    results = [
+        asyncio.run(measure(args.workers, args.interval, args.duration, None)),
+        asyncio.run(measure(args.workers, args.interval, args.duration, args.resolution)),
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
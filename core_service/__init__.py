@@ -1,8 +1,10 @@
 from .base import Service
 from .decorators import task, requirements
+from .runner import run
 
 __all__ = (
     'Service',
     'task',
     'requirements',
+    'run',
 )
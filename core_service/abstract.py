@@ -5,23 +5,47 @@ from typing import Optional
 
 from .exceptions import UnhealthyException
 from .logging import ServiceLoggerAdapter
+from .timers import TimerWheel
 
 
 class AbstractService(abc.ABC):
     running: bool = False
     should_stop: bool = False
+    #: maximum number of seconds to wait for service startup as a nested service
+    start_timeout: Optional[float] = None
+    #: maximum number of seconds to wait for service healthcheck as a nested service
+    healthcheck_timeout: Optional[float] = None
+    #: service containing this service as a nested one
+    parent: Optional['AbstractService'] = None
+    #: health is checked by the shared monitoring scheduler
+    monitored: bool = False
+    #: timer wheel driving periodic tasks of the service tree, used if set on the root service
+    timer_wheel: Optional[TimerWheel] = None
 
     _loop: Optional[asyncio.AbstractEventLoop] = None
     _log: Optional[ServiceLoggerAdapter] = None
 
     @property
-    def loop(self):
+    def loop(self) -> asyncio.AbstractEventLoop:
         """Event loop
+
+        Running event loop is used if loop was not provided explicitly.
+
+        :raise RuntimeError: if there is no running event loop
         """
         if not self._loop:
-            self._loop = asyncio.get_event_loop()
+            self._loop = asyncio.get_running_loop()
         return self._loop
 
+    @property
+    def root(self) -> 'AbstractService':
+        """Root service of the service tree.
+        """
+        service = self
+        while service.parent is not None:
+            service = service.parent
+        return service
+
     @property
     def name(self):
         """Service name.
@@ -68,6 +92,13 @@ class AbstractService(abc.ABC):
         if not self.running:
             raise UnhealthyException
 
+    def _health_changed(self):
+        """Notify service monitoring about health state change.
+
+        Monitoring will check the service health as soon as possible.
+        """
+        pass
+
     def __del__(self):
         if self.running:
             raise RuntimeError("Service %s is not stopped correctly" % self.name)
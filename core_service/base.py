@@ -1,10 +1,17 @@
 import asyncio
-from typing import Optional
+import inspect
+from typing import Dict, List, Optional, Tuple
 
 from .abstract import AbstractService
 from .container import ServiceContainerMixin
-from .exceptions import UnhealthyException
+from .exceptions import DegradedException, UnhealthyException
+from .health import DEGRADED, HEALTHY, NOT_STARTED, SEVERITY, UNHEALTHY, HealthState
+from .limits import Limiter
+from .metrics import TaskMetrics
+from .monitoring import LoopWatchdog, MonitoringScheduler, Wakeup
 from .tasks import TasksMixin
+from .timers import TimerWheel
+from .tracing import reset_current_span, traced
 
 
 class Service(ServiceContainerMixin, TasksMixin, AbstractService):
@@ -16,14 +23,51 @@ class Service(ServiceContainerMixin, TasksMixin, AbstractService):
     You should extend it for your needs.
     """
     _monitoring_task: Optional[asyncio.Task] = None
+    _monitoring_scheduler: Optional[MonitoringScheduler] = None
+    _monitoring_wakeup: Optional[Wakeup] = None
+    _stopped: Optional[asyncio.Event] = None
+    #: maximum number of seconds to wait for service task workers to finish current iteration on stop
+    drain_timeout: Optional[float] = None
+    #: event loop watchdog owned by the root service
+    loop_watchdog: Optional[LoopWatchdog] = None
+    #: cached health of the service and its nested services, updated on their checks and task failures
+    health: HealthState = NOT_STARTED
+    _own_health: HealthState = NOT_STARTED
+    #: entry of the service in the parent collection if it differs from the service, e.g. lazy service wrapper
+    _health_entry: Optional[AbstractService] = None
     #: interval in seconds to sleep between healthcheck runs
     _monitoring_interval: float = .1
 
-    def __init__(self, *, loop=None, monitoring_interval: float = .1):
+    def __init__(self, *, loop=None, monitoring_interval: float = .1,
+                 start_timeout: Optional[float] = None,
+                 healthcheck_timeout: Optional[float] = None,
+                 timer_resolution: Optional[float] = None,
+                 loop_lag_threshold: Optional[float] = None,
+                 max_loop_lag: Optional[float] = None,
+                 drain_timeout: Optional[float] = None,
+                 limiters: Optional[Dict[str, Limiter]] = None):
         self._loop = loop
         self._monitoring_interval = monitoring_interval
+        self.start_timeout = start_timeout
+        self.healthcheck_timeout = healthcheck_timeout
+        self._timer_resolution = timer_resolution
+        self._loop_lag_threshold = loop_lag_threshold or max_loop_lag
+        self._max_loop_lag = max_loop_lag
+        self.drain_timeout = drain_timeout
         super().__init__()
+        for name, limiter in (limiters or {}).items():
+            limiter.name = limiter.name or name
+            self.limiters[name] = limiter
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # overridden lifecycle methods are traced as a whole
+        for name in ('start', 'stop', 'healthcheck'):
+            method = cls.__dict__.get(name)
+            if inspect.iscoroutinefunction(method) and not getattr(method, 'traced', False):
+                setattr(cls, name, traced(name)(method))
+
+    @traced('start')
     async def start(self):
         """Start service.
 
@@ -33,59 +77,272 @@ class Service(ServiceContainerMixin, TasksMixin, AbstractService):
         You can override this method in your service implementation to apply custom
         start logic. But don't forget to invoke super implementation.
         """
-        self.log.debug("Starting")
+        self.log.debug_sampled("Starting")
         self.running = True
-        self.log.debug("Starting service tasks...")
-        await self._start_service_tasks()
+        self.should_stop = False
+        self._stopped = asyncio.Event()
+        if self._timer_resolution is not None and self.parent is None:
+            self.timer_wheel = TimerWheel(self.loop, self._timer_resolution)
+        if self._loop_lag_threshold is not None and self.parent is None:
+            self.loop_watchdog = LoopWatchdog(self.loop, self._loop_lag_threshold)
+            self.loop_watchdog.start()
         try:
-            self.log.debug("Starting nested services...")
+            self.log.debug_sampled("Starting service tasks...")
+            await self._start_service_tasks()
+            self.log.debug_sampled("Starting nested services...")
             await self._start_nested_services()
-        except Exception:
-            self.log.exception("Failed to start nested service")
+        except BaseException:
+            # cancelled startup, e.g. by `start_timeout`, is rolled back too
+            self.log.exception("Failed to start service")
             self.running = False
             self.should_stop = True
+            await self._stop_nested_services()
             await self._stop_service_tasks()
+            await self._close_timer_wheel()
+            self._stop_loop_watchdog()
+            self._set_health(UNHEALTHY, "Service failed to start")
+            self._stopped.set()
             raise
-        self._monitoring_task = self.loop.create_task(self.monitoring_task(),
-                                                      name=f"{self.name}.monitoring_task")
-        self.log.debug("Service was started")
+        self._set_health(HEALTHY)
+        self._start_monitoring()
+        self.log.debug_sampled("Service was started")
+
+    @traced('healthcheck')
+    async def healthcheck(self):
+        """Healthcheck method.
+
+        Raise :py:class:`core_service.exceptions.UnhealthyException` if service is not running,
+        some of its tasks failed or nested services are unhealthy.
+
+        Raise :py:class:`core_service.exceptions.UnhealthyException` if sustained event loop
+        lag measured by the root service watchdog exceeds `max_loop_lag`.
+
+        Raise :py:class:`core_service.exceptions.DegradedException` if service tasks
+        are retrying failed runs or nested services are degraded and the service is
+        otherwise healthy. Degraded service is not stopped by monitoring.
+        """
+        nested_degraded = None
+        try:
+            await super().healthcheck()
+        except DegradedException as e:
+            # unhealthy event loop takes precedence
+            nested_degraded = e
+        if self.loop_watchdog is not None and self._max_loop_lag is not None:
+            lag = self.loop_watchdog.sustained_lag
+            if lag > self._max_loop_lag:
+                raise UnhealthyException("Sustained event loop lag %.3f seconds exceeds %s" % (
+                    lag, self._max_loop_lag))
+        if nested_degraded is not None:
+            raise nested_degraded
+        degraded = self.degraded_tasks()
+        if degraded:
+            raise DegradedException("Failing tasks: %s" % ', '.join(
+                "%s (%r)" % (service_task.name, service_task.last_error) for service_task in degraded
+            ))
 
+    @traced('stop')
     async def stop(self):
         """Stop service.
 
         Set `should_stop` flag to `True`, `running` to `False` and start shutdown sequence.
 
         Nested services will be stopped first, service tasks will be cancelled than.
+        If `drain_timeout` is set, workers running an iteration are cancelled only
+        after they finished it or the timeout expired.
 
         You can override this method in your service implementation to apply custom
         start logic. But don't forget to invoke super implementation.
         """
         self.should_stop = True
         self.running = False
-        if self._monitoring_task:
-            self._monitoring_task.cancel()
-        self.log.debug("Stopping nested services...")
+        await self._stop_monitoring()
+        self.log.debug_sampled("Stopping nested services...")
         await self._stop_nested_services()
-        self.log.debug("Stopping service tasks...")
-        await self._stop_service_tasks()
-        self.log.debug("Service was stopped")
+        self.log.debug_sampled("Stopping service tasks...")
+        await self._stop_service_tasks(self.drain_timeout)
+        await self._close_timer_wheel()
+        self._stop_loop_watchdog()
+        if self._own_health.status != UNHEALTHY:
+            # failure reason is kept
+            self._set_health(UNHEALTHY, "Service is stopped")
+        if self._stopped is not None:
+            self._stopped.set()
+        self.log.debug_sampled("Service was stopped")
+
+    def get_metrics(self) -> dict:
+        """Runtime metrics of the service tasks rolled up across nested services.
+
+        Result contains metrics of each service task under `tasks` key, metrics of nested
+        services under `services` key and metrics of all the tasks of the service
+        and its nested services merged together under `total` key.
+        """
+        # tree is walked iteratively, nested services are collected before their parents
+        order: List[Service] = []
+        stack: List[Service] = [self]
+        while stack:
+            service = stack.pop()
+            order.append(service)
+            stack.extend(nested for nested in service._services.services if isinstance(nested, Service))
+        collected: Dict[Service, Tuple[dict, TaskMetrics]] = {}
+        for service in reversed(order):
+            total = service.get_task_metrics()
+            services = []
+            for nested in service._services.services:
+                if isinstance(nested, Service):
+                    metrics, nested_total = collected[nested]
+                    services.append(metrics)
+                    total.merge(nested_total)
+            collected[service] = {
+                'service': service.name,
+                'tasks': {name: service_task.metrics.snapshot()
+                          for name, service_task in service._service_tasks.items()},
+                'services': services,
+                'total': total.snapshot(),
+            }, total
+        return collected[self][0]
+
+    async def wait_stopped(self):
+        """Wait until started service is stopped.
+
+        Service can be stopped explicitly or by monitoring after its failure.
+
+        :raise RuntimeError: if service was not started
+        """
+        if self._stopped is None:
+            raise RuntimeError("Service %s was not started" % self.name)
+        await self._stopped.wait()
+
+    async def _close_timer_wheel(self):
+        if self._timer_resolution is not None and self.timer_wheel is not None:
+            await self.timer_wheel.close()
+            self.timer_wheel = None
+
+    def _stop_loop_watchdog(self):
+        if self.loop_watchdog is not None:
+            self.loop_watchdog.stop()
+            self.loop_watchdog = None
+
+    def _get_monitoring_scheduler(self) -> MonitoringScheduler:
+        """Get monitoring scheduler shared by the service tree.
+
+        Scheduler is created by the root service on the first request. Ancestors are
+        walked iteratively and cache the scheduler too, so deep trees don't hit recursion limit.
+        """
+        if self._monitoring_scheduler is None:
+            path = [self]
+            while isinstance(path[-1].parent, Service) and path[-1]._monitoring_scheduler is None:
+                path.append(path[-1].parent)
+            scheduler = path[-1]._monitoring_scheduler or MonitoringScheduler(self.loop)
+            for service in path:
+                service._monitoring_scheduler = scheduler
+            return scheduler
+        return self._monitoring_scheduler
+
+    def _start_monitoring(self):
+        """Start service monitoring.
+
+        Services of the service tree are monitored by the shared scheduler.
+        Standalone service runs own :py:meth:`monitoring_task`.
+        """
+        if self._monitoring_scheduler is None and not isinstance(self.parent, Service):
+            self._monitoring_task = self.loop.create_task(self.monitoring_task(),
+                                                          name=f"{self.name}.monitoring_task")
+            return
+        scheduler = self._get_monitoring_scheduler()
+        scheduler.register(self)
+        if not isinstance(self.parent, Service):
+            scheduler.start()
+
+    async def _stop_monitoring(self):
+        if self._monitoring_task and self._monitoring_task is not asyncio.current_task():
+            self._monitoring_task.cancel()
+        scheduler, self._monitoring_scheduler = self._monitoring_scheduler, None
+        if scheduler is not None:
+            scheduler.unregister(self)
+            if not isinstance(self.parent, Service):
+                await scheduler.stop()
+
+    def _set_health(self, status: str, reason: Optional[str] = None):
+        """Update health of the service own check.
+        """
+        own = self._own_health
+        if own.status == status and own.reason == reason:
+            return
+        self._own_health = HealthState(status, self.loop.time(), reason)
+        self._update_health()
+
+    def _update_health(self):
+        """Aggregate health of the service and its nested services and push changes to ancestors.
+
+        Ancestors are updated iteratively while they are running and the health changes.
+        """
+        service: Service = self
+        while True:
+            state = service._own_health
+            worst = service._services.worst_health()
+            if worst is not None:
+                nested, nested_state = worst
+                if SEVERITY[nested_state.status] > SEVERITY[state.status]:
+                    state = HealthState(nested_state.status, nested_state.since,
+                                        "%s: %s" % (nested.name, nested_state.reason))
+            if state.status == service.health.status and state.reason == service.health.reason:
+                return
+            service.health = state
+            parent = service.parent
+            entry = service._health_entry or service
+            if not isinstance(parent, Service) or not parent.running or entry not in parent._services:
+                return
+            parent._services.set_health(entry, state)
+            service = parent
+
+    def _on_task_failure(self, task: asyncio.Task, e: BaseException):
+        super()._on_task_failure(task, e)
+        if not self.should_stop:
+            self._set_health(UNHEALTHY, "Service task %s failed: %r" % (task.get_name(), e))
+
+    def _health_changed(self):
+        if self._monitoring_scheduler is not None:
+            self._monitoring_scheduler.check_now(self)
+        elif self._monitoring_wakeup is not None:
+            self._monitoring_wakeup.wake()
+
+    async def _monitoring_check(self) -> bool:
+        """Run healthcheck limited by `healthcheck_timeout` and log failure.
+
+        :return: `True` if service is healthy
+        """
+        try:
+            await asyncio.wait_for(self.healthcheck(), self.healthcheck_timeout)
+        except DegradedException as e:
+            self.log.warning("Service is degraded: %s", e)
+            self._set_health(DEGRADED, str(e))
+            return True
+        except UnhealthyException as e:
+            self.log.exception("Healthcheck failed with exception")
+            self._set_health(UNHEALTHY, str(e) or e.__class__.__name__)
+            return False
+        except Exception as e:  # noqa
+            self.log.exception("Service healthcheck failed with unexpected exception")
+            self._set_health(UNHEALTHY, repr(e))
+            return False
+        self._set_health(HEALTHY)
+        return True
 
     async def monitoring_task(self):
         """Monitoring task.
 
-        Started with a service. Run healthcheck periodically and force service
+        Started with a standalone service. Run healthcheck periodically and force service
         to stop if it failed.
+
+        Nested services and services containing them are monitored by the shared
+        :py:class:`core_service.monitoring.MonitoringScheduler` instead.
         """
+        reset_current_span()
+        wakeup = self._monitoring_wakeup = Wakeup(self.loop)
         while not self.should_stop:
-            try:
-                await self.healthcheck()
-            except UnhealthyException:
-                self.log.exception("Healthcheck failed with exception")
-                break
-            except Exception:  # noqa
-                self.log.exception("Service healthcheck failed with unexpected exception")
+            if not await self._monitoring_check():
                 break
-            await asyncio.sleep(self._monitoring_interval)
+            await wakeup.sleep(self._monitoring_interval)
         # terminate service on exit
         if not self.should_stop:
             await self.stop()
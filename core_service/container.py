@@ -4,78 +4,249 @@ Any service can contain other services. Nested services will be started
 and stopped together.
 """
 import abc
-import inspect
+import asyncio
 import logging
-from typing import List
+from typing import Dict, List, Optional, Sequence, Tuple
 
 from .abstract import AbstractService
-from .exceptions import ServiceStartupException
+from .decorators import marked_members
+from .logging import debug_sampled
+from .exceptions import (DegradedException, RequirementsResolutionException, ServiceStartupException,
+                         UnhealthyException, UnhealthyServicesException)
+from .health import DEGRADED, UNHEALTHY, HealthState
 
 log = logging.getLogger(__name__)
 
 
+def resolve_requirements(definitions: Sequence[Tuple[str, Sequence[str]]]) -> Tuple[Tuple[str, ...], ...]:
+    """Resolve startup order of requirements methods.
+
+    Topologically sort `(name, dependencies)` pairs with Kahn's algorithm.
+    Methods are grouped into levels, methods of each level depend only on methods
+    of previous levels. Order of methods inside level follows order of definitions.
+
+    :raise RequirementsResolutionException: on unknown dependency or dependency cycle
+    """
+    dependencies = {name: set(deps) for name, deps in definitions}
+    unknown = {name: sorted(deps - dependencies.keys()) for name, deps in dependencies.items()
+               if not deps <= dependencies.keys()}
+    if unknown:
+        raise RequirementsResolutionException(
+            "Unknown requirements: %s" % '; '.join(
+                "%s requires %s" % (name, ', '.join(deps)) for name, deps in unknown.items()
+            ),
+            unknown=unknown,
+        )
+    position = {name: i for i, (name, _) in enumerate(definitions)}
+    dependents: Dict[str, List[str]] = {name: [] for name in dependencies}
+    for name, deps in dependencies.items():
+        for dep in deps:
+            dependents[dep].append(name)
+    indegree = {name: len(deps) for name, deps in dependencies.items()}
+    level = [name for name, degree in indegree.items() if degree == 0]
+    levels = []
+    while level:
+        levels.append(tuple(level))
+        next_level = []
+        for name in level:
+            for dependent in dependents[name]:
+                indegree[dependent] -= 1
+                if indegree[dependent] == 0:
+                    next_level.append(dependent)
+        level = sorted(next_level, key=position.__getitem__)
+    if sum(len(level) for level in levels) < len(dependencies):
+        cycle = _find_cycle({name: deps for name, deps in dependencies.items() if indegree[name] > 0})
+        raise RequirementsResolutionException(
+            "Can't resolve services dependencies, cycle found: %s" % ' -> '.join(cycle),
+            cycle=cycle,
+        )
+    return tuple(levels)
+
+
+def _find_cycle(dependencies: Dict[str, set]) -> List[str]:
+    """Find dependency cycle among unresolved requirements.
+
+    Each unresolved requirement depends on at least one other unresolved requirement,
+    so following such dependencies always ends up in a cycle.
+    """
+    name = min(dependencies)
+    path: List[str] = []
+    visited: Dict[str, int] = {}
+    while name not in visited:
+        visited[name] = len(path)
+        path.append(name)
+        name = min(dep for dep in dependencies[name] if dep in dependencies)
+    return path[visited[name]:] + [name]
+
+
 class ServiceCollection:
     """Collection of services.
 
     Services in collection can be started, stopped and checked together
     with appropriate methods.
 
-    Services are started in direct order and stopped in backward. Only
+    Services added between two :py:meth:`start_all` calls form a startup level.
+    Services of the same level are started and stopped concurrently, levels are
+    started in order they were added and stopped in backward order. Only
     already started services will be stopped if some of the service startup
     failed.
+
+    Monitored services push their health changes to the collection with
+    :py:meth:`set_health`, only failed and degraded ones are kept.
     """
     services: List[AbstractService]
     started_services: List[AbstractService]
+    #: started services grouped by startup level
+    started_levels: List[List[AbstractService]]
+    #: last pushed health of unhealthy and degraded services in order of failure
+    unhealthy: Dict[AbstractService, HealthState]
+    degraded: Dict[AbstractService, HealthState]
 
     def __init__(self):
         self.services = []
         self.started_services = []
+        self.started_levels = []
+        self.unhealthy = {}
+        self.degraded = {}
+        self._pending = []
+        self._members = set()
+        self._unmonitored: Optional[List[AbstractService]] = None
+
+    def __contains__(self, service) -> bool:
+        return service in self._members
 
     def add(self, service: AbstractService):
         """Add service to collection.
+
+        Service will be started on the next :py:meth:`start_all` call.
         """
         self.services.append(service)
+        self._members.add(service)
+        self._pending.append(service)
+        self._unmonitored = None
+
+    def set_health(self, service: AbstractService, state: HealthState):
+        """Store health state pushed by the service.
+        """
+        self.unhealthy.pop(service, None)
+        self.degraded.pop(service, None)
+        if state.status == UNHEALTHY:
+            self.unhealthy[service] = state
+        elif state.status == DEGRADED:
+            self.degraded[service] = state
+
+    def worst_health(self) -> Optional[Tuple[AbstractService, HealthState]]:
+        """The first failed service and its state, or the first degraded one.
+        """
+        for states in (self.unhealthy, self.degraded):
+            for service, state in states.items():
+                return service, state
+        return None
 
     async def healthcheck(self):
         """Check health of all services in collection.
+
+        Services monitored by the shared monitoring scheduler are not checked,
+        their health pushed with :py:meth:`set_health` is used instead.
+        Other services are checked concurrently. Each check is limited by
+        the service `healthcheck_timeout`.
+
+        :raise UnhealthyServicesException: with all failed services
+        :raise DegradedException: if some services are degraded and none failed
         """
-        for service in self.services:
-            await service.healthcheck()
+        errors: List[Tuple[AbstractService, BaseException]] = [
+            (service, UnhealthyException(state.reason)) for service, state in self.unhealthy.items()
+        ]
+        degraded = [(service, DegradedException(state.reason)) for service, state in self.degraded.items()]
+        if self._unmonitored is None:
+            # monitoring is started with the service, so the list is final once services were started
+            self._unmonitored = [service for service in self.services if not service.monitored]
+        checked = self._unmonitored
+        results = await asyncio.gather(*[self._healthcheck(service) for service in checked],
+                                       return_exceptions=True) if checked else []
+        for service, result in zip(checked, results):
+            if isinstance(result, DegradedException):
+                degraded.append((service, result))
+            elif result is not None:
+                errors.append((service, result))
+        if errors:
+            raise UnhealthyServicesException(errors)
+        if degraded:
+            raise DegradedException("Degraded services: %s" % ', '.join(
+                "%s (%s)" % (service.name, e) for service, e in degraded
+            ))
+
+    @staticmethod
+    async def _healthcheck(service: AbstractService):
+        await asyncio.wait_for(service.healthcheck(), service.healthcheck_timeout)
 
     async def start_all(self):
-        """Start all services or rollback on failure.
+        """Start all pending services or rollback on failure.
+
+        Services added since the previous call are started concurrently.
+        Each service startup is limited by its `start_timeout`.
 
-        Services will be started in order they were added.
+        All started services will be stopped if any of them failed to start.
         """
+        level, self._pending = self._pending, []
+        started: List[AbstractService] = []
+        # level is recorded before awaiting, so services of the cancelled startup are stopped too
+        self.started_levels.append(started)
         try:
-            for service in self.services:
-                try:
-                    await service.start()
-                    await service.healthcheck()
-                except Exception as e:
-                    log.exception("Exception while starting %s service", service)
-                    raise ServiceStartupException from e
-                self.started_services.append(service)
-        except ServiceStartupException:
+            results = await asyncio.gather(*[self._start(service) for service in level],
+                                           return_exceptions=True)
+        except BaseException:
+            started.extend(service for service in level if service.running)
+            self.started_services.extend(started)
+            raise
+        failed = None
+        for service, result in zip(level, results):
+            if result is None:
+                started.append(service)
+                continue
+            if failed is None:
+                failed = result
+            if service.running:
+                # service was started but failed healthcheck or timed out
+                started.append(service)
+        self.started_services.extend(started)
+        self._unmonitored = None
+        if failed is not None:
             log.error("Stopping services on startup failure")
             await self.stop_all()
-            raise
+            raise failed
+
+    async def _start(self, service: AbstractService):
+        """Start single service and check its health.
+        """
+        try:
+            await asyncio.wait_for(service.start(), service.start_timeout)
+            await self._healthcheck(service)
+        except DegradedException:
+            log.warning("Service %s is degraded on startup", service, exc_info=True)
+        except Exception as e:
+            log.exception("Exception while starting %s service", service)
+            raise ServiceStartupException from e
 
     async def stop_all(self):
         """Stop all services in collection.
 
-        Only started services will be stopped. Services will be stopped
-        in reverse to startup order.
+        Only started services will be stopped. Startup levels are stopped
+        in reverse to startup order, services of the same level are stopped
+        concurrently.
         """
-        log.debug("Stopping nested services.")
-        for service in reversed(self.started_services):
-            try:
-                await service.stop()
-            except Exception:  # noqa
-                log.exception("Fail to stop %s service.", service)
-        else:
-            log.debug("There are no services to stop.")
-        log.debug("All nested services were stopped.")
+        debug_sampled(log, "Stopping nested services.")
+        if not self.started_services:
+            debug_sampled(log, "There are no services to stop.")
+        while self.started_levels:
+            level = self.started_levels.pop()
+            results = await asyncio.gather(*[service.stop() for service in level], return_exceptions=True)
+            # the last level is the tail of started services
+            del self.started_services[len(self.started_services) - len(level):]
+            for service, result in zip(level, results):
+                if isinstance(result, Exception):
+                    log.error("Fail to stop %s service.", service, exc_info=result)
+        debug_sampled(log, "All nested services were stopped.")
 
 
 class ServiceContainerMixin(AbstractService, abc.ABC):
@@ -84,66 +255,77 @@ class ServiceContainerMixin(AbstractService, abc.ABC):
     Add service collection and related functionality to BaseService.
     """
     _services: ServiceCollection
+    #: `(name, dependencies)` pairs of requirements methods defined on the class
+    _requirements_definitions: Tuple[Tuple[str, Tuple[str, ...]], ...] = ()
+    _requirements_levels: Tuple[Tuple[str, ...], ...]
 
     def __init__(self):
         self._services = ServiceCollection()
         super().__init__()
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._requirements_definitions = tuple(
+            (name, tuple(member.service_requirements))
+            for name, member in marked_members(cls, 'requirements_definition')
+        )
+
     async def healthcheck(self):
         await super().healthcheck()
         await self._services.healthcheck()
 
+    @classmethod
+    def requirements_levels(cls) -> Tuple[Tuple[str, ...], ...]:
+        """Names of requirements methods grouped into startup levels.
+
+        Methods of each level depend only on methods of previous levels.
+        Nested services are started level by level and stopped in reverse order.
+        Resolved once per class.
+
+        :raise RequirementsResolutionException: if startup order can't be resolved
+        """
+        levels = cls.__dict__.get('_requirements_levels')
+        if levels is None:
+            levels = resolve_requirements(cls._requirements_definitions)
+            cls._requirements_levels = levels
+        return levels
+
     async def _start_nested_services(self):
         """Start nested services.
 
         Underlying collection will be filled.
 
-        Startup order depend on the requirement method name defined on Service class
-        and the defined dependencies.
+        Requirement methods are grouped into levels by the defined dependencies.
+        Services of each level are started concurrently after all services
+        of the previous level were started.
 
-        :raise RuntimeError: if startup order can't be resolved
+        :raise RequirementsResolutionException: if startup order can't be resolved
         """
-        loaded = set()
-        members = inspect.getmembers(self, predicate=inspect.ismethod)
-        ordering_required = [name for name, method in members
-                             if hasattr(method, "requirements_definition")]
-        self.log.debug("Requirements will be gathered from %s",
-                       ', '.join(ordering_required))
-        while ordering_required:
-            ordered_count = 0
-            for name in ordering_required[:]:
-                self.log.debug("Check %s", name)
+        self._services = ServiceCollection()
+        levels = self.requirements_levels()
+        if self.log.isEnabledFor(logging.DEBUG):
+            self.log.debug_sampled("Requirements will be gathered from %s",
+                                   ', '.join(name for level in levels for name in level))
+        for level in levels:
+            for name in level:
                 method = getattr(self, name)
-                requirements = getattr(method, "service_requirements")
-                if len(requirements) > 0 and not loaded.issuperset(requirements):
-                    self.log.debug("Not enought requirements. Loaded: %s, Required: %s",
-                                   loaded, requirements)
-                    continue
-                self.log.debug("Getting requirements from %s", name)
+                self.log.debug_sampled("Getting requirements from %s", name)
                 try:
                     services = await method()
                 except Exception:
                     self.log.exception("Exception while receiving %s requirements", name)
                     raise
-                self.log.debug("Requirements from %s: %s", method, services)
+                self.log.debug_sampled("Requirements from %s: %s", name, services)
                 if not (services is None or isinstance(services, list)):
                     raise TypeError("Requirements method must return list or None. "
                                     "It returns %s (%s type) instead.",
                                     services, type(services))
                 if services:
                     for service in services:
+                        service.parent = self
                         self._services.add(service)
-                ordering_required.remove(name)
-                ordered_count += 1
-                loaded.add(name)
-                self.log.debug("Nested service %s was loaded", name)
-            if ordered_count == 0:
-                raise RuntimeError(
-                    "Can't resolve services dependencies "
-                    "from %s" % ', '.join(ordering_required)
-                )
-
-        await self._services.start_all()
+                self.log.debug_sampled("Nested service %s was loaded", name)
+            await self._services.start_all()
 
     async def _stop_nested_services(self):
         """Stop nested services in reverse order.
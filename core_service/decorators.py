@@ -1,4 +1,5 @@
-from typing import List
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
 
 
 def requirements(*deps: List[str]):
@@ -18,7 +19,17 @@ def requirements(*deps: List[str]):
     return wrapper
 
 
-def task(periodic: bool = True, sleep_interval: float = .1, workers: int = 1):
+def task(periodic: bool = True, sleep_interval: float = .1, workers: int = 1,
+         queue: Optional[int] = None, batch_size: Optional[int] = None,
+         max_batch_latency: float = .1, min_workers: Optional[int] = None,
+         max_workers: Optional[int] = None, scale_interval: float = 1.,
+         scale_cooldown: float = 5., schedule: str = 'fixed_delay', jitter: float = 0.,
+         stagger: bool = False, on_error: str = 'raise', retry_backoff: float = .1,
+         retry_backoff_max: float = 30., max_failures: Optional[int] = None,
+         circuit_reset_timeout: float = 30., executor: Optional[str] = None,
+         executor_workers: Optional[int] = None, rate: Optional[float] = None,
+         burst: Optional[int] = None, max_concurrency: Optional[int] = None,
+         limiter: Optional[str] = None):
     """Decorator defining Service method as service task.
 
     Task will be started and stopped with a service.
@@ -26,22 +37,137 @@ def task(periodic: bool = True, sleep_interval: float = .1, workers: int = 1):
     Task is `periodic` by default. It means that after task execution finished
     it will be started again after sleeping for `sleep_interval` seconds.
 
+    With `schedule='fixed_rate'` task is started every `sleep_interval` seconds
+    regardless of its execution time. Ticks missed because of long execution are
+    coalesced into a single run. Random delay up to `jitter` seconds is added to each
+    sleep. Workers are started with evenly distributed phase offsets if `stagger` is set.
+
     Multiple instances of the service task can be started in parallel.
     It is started in single instance by default but you can control this behavior
     using `workers` argument.
+
+    Task became a queue consumer if `queue` size is provided. Service owns a bounded
+    queue for such task, items are put into it with :py:meth:`Service.submit` and
+    passed to the task method one by one. Queue is unbounded if size is `0`.
+
+    Queue items are passed to the task method as a list if `batch_size` is provided.
+    Batch is passed once it is full or `max_batch_latency` seconds passed since
+    its first item was received. Task without `queue` size gets an unbounded queue.
+    Partial batches and items left in the queue are passed on service stop.
+
+    Task exception fails the whole service by default. With `on_error='retry'` failed
+    run is retried after exponential backoff starting from `retry_backoff` up to
+    `retry_backoff_max` seconds. Circuit is opened after `max_failures` consecutive
+    failures: runs are suspended for `circuit_reset_timeout` seconds, then a single
+    probe run decides whether to close the circuit or keep it open. Service with
+    failing task is reported as degraded by healthcheck.
+
+    Blocking or CPU-bound task is defined as a regular (not async) method and run in
+    a `thread` or `process` pool provided with `executor` argument. Pool of `executor_workers`
+    size (maximum number of task workers by default) is created on service start and shut down
+    on service stop. Process pool task should be a static method with picklable arguments.
+
+    Task calls are limited to `rate` calls per second (up to `burst` calls at once)
+    and `max_concurrency` simultaneous calls of all task workers. Limits are shared
+    with other tasks of the service tree using the same `limiter` name, limiter is defined
+    by the first task providing limits or in `limiters` of the service or its ancestors.
+
+    Worker pool is autoscaled between `min_workers` (`workers` by default) and
+    `max_workers` if the latter is provided. Pool size is checked every `scale_interval`
+    seconds and changed by one worker at most once per `scale_cooldown` seconds
+    based on queue depth and the part of time workers are busy.
     """
     if workers < 1:
         raise ValueError("Number of service task workers should be gte 1")
     if sleep_interval < 0:
         raise ValueError("Sleeping interval should be gte 0")
+    if queue is not None and queue < 0:
+        raise ValueError("Queue size should be gte 0")
+    if batch_size is not None and batch_size < 1:
+        raise ValueError("Batch size should be gte 1")
+    if max_batch_latency < 0:
+        raise ValueError("Batch latency should be gte 0")
+    if schedule not in ('fixed_delay', 'fixed_rate'):
+        raise ValueError("Schedule should be 'fixed_delay' or 'fixed_rate'")
+    if jitter < 0:
+        raise ValueError("Jitter should be gte 0")
+    if on_error not in ('raise', 'retry'):
+        raise ValueError("Error policy should be 'raise' or 'retry'")
+    if retry_backoff < 0 or retry_backoff_max < retry_backoff:
+        raise ValueError("Retry backoff should be gte 0 and lte maximum backoff")
+    if max_failures is not None and max_failures < 1:
+        raise ValueError("Maximum number of failures should be gte 1")
+    if circuit_reset_timeout < 0:
+        raise ValueError("Circuit reset timeout should be gte 0")
+    if min_workers is not None and min_workers < 1:
+        raise ValueError("Minimum number of service task workers should be gte 1")
+    if max_workers is not None and max_workers < (workers if min_workers is None else min_workers):
+        raise ValueError("Maximum number of service task workers should be gte minimum")
+    if scale_interval <= 0:
+        raise ValueError("Scaling interval should be gt 0")
+    if scale_cooldown < 0:
+        raise ValueError("Scaling cooldown should be gte 0")
+    if executor not in (None, 'thread', 'process'):
+        raise ValueError("Executor should be 'thread' or 'process'")
+    if executor_workers is not None and (executor is None or executor_workers < 1):
+        raise ValueError("Number of executor workers should be gte 1 and requires executor")
+    if rate is not None and rate <= 0:
+        raise ValueError("Rate should be gt 0")
+    if burst is not None and (rate is None or burst < 1):
+        raise ValueError("Burst should be gte 1 and requires rate")
+    if max_concurrency is not None and max_concurrency < 1:
+        raise ValueError("Maximum concurrency should be gte 1")
+    if batch_size is not None and queue is None:
+        queue = 0
 
     def wrapper(f):
+        if executor is not None and asyncio.iscoroutinefunction(f):
+            raise TypeError("Executor task %s should be a regular function" % f.__name__)
         f.service_task = True
         f.service_task_definition = {
             'periodic': periodic,
             'sleep_interval': sleep_interval,
             'workers': workers,
+            'queue': queue,
+            'batch_size': batch_size,
+            'max_batch_latency': max_batch_latency,
+            'min_workers': min_workers,
+            'max_workers': max_workers,
+            'scale_interval': scale_interval,
+            'scale_cooldown': scale_cooldown,
+            'schedule': schedule,
+            'jitter': jitter,
+            'stagger': stagger,
+            'on_error': on_error,
+            'retry_backoff': retry_backoff,
+            'retry_backoff_max': retry_backoff_max,
+            'max_failures': max_failures,
+            'circuit_reset_timeout': circuit_reset_timeout,
+            'executor': executor,
+            'executor_workers': executor_workers,
+            'rate': rate,
+            'burst': burst,
+            'max_concurrency': max_concurrency,
+            'limiter': limiter,
         }
         return f
 
     return wrapper
+
+
+def marked_members(cls: type, marker: str) -> List[Tuple[str, Any]]:
+    """Collect class members marked by decorator with `marker` attribute.
+
+    Members are looked up through the class MRO, so member redefined in subclass
+    overrides the base class one even if it is not marked. Result is sorted by name.
+    """
+    members: Dict[str, Any] = {}
+    for klass in reversed(cls.__mro__):
+        members.update(vars(klass))
+    result = []
+    for name, member in sorted(members.items()):
+        if isinstance(member, (staticmethod, classmethod)):
+            member = member.__func__
+        if getattr(member, marker, False):
+            result.append((name, member))
+    return result
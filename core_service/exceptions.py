@@ -2,9 +2,41 @@ class ServiceStartupException(RuntimeError):
     pass
 
 
+class RequirementsResolutionException(RuntimeError):
+    """Startup order of requirements methods can't be resolved.
+
+    `cycle` contains names of requirements methods forming a dependency cycle,
+    `unknown` maps requirements methods to unknown dependency names.
+    """
+    def __init__(self, message, *, cycle=None, unknown=None):
+        self.cycle = cycle or []
+        self.unknown = unknown or {}
+        super().__init__(message)
+
+
 class UnexpectedTaskException(RuntimeError):
     pass
 
 
 class UnhealthyException(RuntimeError):
     pass
+
+
+class DegradedException(RuntimeError):
+    """Service is running but some of its activity is failing.
+
+    Degraded service is not stopped by monitoring.
+    """
+    pass
+
+
+class UnhealthyServicesException(UnhealthyException):
+    """Some of the nested services are unhealthy.
+
+    `errors` contains list of `(service, exception)` pairs for each failed service.
+    """
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("Unhealthy services: %s" % ', '.join(
+            "%s (%r)" % (service.name, e) for service, e in errors
+        ))
@@ -0,0 +1,32 @@
+"""Cached service health state.
+
+Each service keeps health of its own last check and aggregated health of its subtree.
+State changes are pushed up to ancestors, so reading health of any service is O(1).
+"""
+from typing import NamedTuple, Optional
+
+HEALTHY = 'healthy'
+DEGRADED = 'degraded'
+UNHEALTHY = 'unhealthy'
+
+#: statuses ordered from the best to the worst
+SEVERITY = {HEALTHY: 0, DEGRADED: 1, UNHEALTHY: 2}
+
+
+class HealthState(NamedTuple):
+    """Service health at a point of time.
+    """
+    #: `healthy`, `degraded` or `unhealthy`
+    status: str
+    #: event loop time of the state change
+    since: float
+    #: description of the failure, prefixed with the nested service names it comes from
+    reason: Optional[str] = None
+
+    @property
+    def healthy(self) -> bool:
+        return self.status == HEALTHY
+
+
+#: health of the service that was not started yet
+NOT_STARTED = HealthState(UNHEALTHY, 0., "Service is not started")
@@ -0,0 +1,197 @@
+"""Lazy nested services.
+
+Rarely used nested service can be started on its first use instead of
+the parent startup and stopped again after an idle period.
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from .abstract import AbstractService
+from .base import Service
+from .exceptions import UnhealthyException
+from .health import HEALTHY, HealthState
+
+log = logging.getLogger(__name__)
+
+
+class LazyService(AbstractService):
+    """Nested service wrapper starting the wrapped service on demand.
+
+    Wrapper is returned from the requirements method instead of the service itself.
+    Wrapped service is started on the first :py:meth:`acquire` call, concurrent
+    callers wait for the same startup. If `idle_timeout` is set, service is stopped
+    once it was not used for `idle_timeout` seconds and will be started again
+    on the next use.
+
+    Active wrapped service is checked by the wrapper healthcheck. Health of the active
+    wrapped service monitored by the shared scheduler is pushed to the parent under
+    the wrapper entry.
+
+    .. code-block:: python
+
+        class Application(Service):
+            def __init__(self):
+                super().__init__()
+                self.reports = LazyService(ReportsDatabase(), idle_timeout=300)
+
+            @requirements()
+            async def databases(self):
+                return [self.reports]
+
+            async def build_report(self):
+                async with self.reports.use() as db:
+                    return await db.fetch_report()
+    """
+    def __init__(self, service: Service, idle_timeout: Optional[float] = None):
+        if idle_timeout is not None and idle_timeout < 0:
+            raise ValueError("Idle timeout should be gte 0")
+        self.service = service
+        self.idle_timeout = idle_timeout
+        self.start_timeout = service.start_timeout
+        self.healthcheck_timeout = service.healthcheck_timeout
+        #: number of current users of the wrapped service
+        self.users = 0
+        #: number of wrapped service starts
+        self.starts = 0
+        self._active = False
+        self._last_used = 0.
+        self._lock: Optional[asyncio.Lock] = None
+        self._idle_handle: Optional[asyncio.TimerHandle] = None
+        self._idle_stop: Optional[asyncio.Task] = None
+
+    @property
+    def name(self):
+        return "%s(lazy)" % self.service.name
+
+    @property
+    def active(self) -> bool:
+        """Wrapped service is started.
+        """
+        return self._active
+
+    async def start(self):
+        """Start wrapper. Wrapped service is not started until it is used.
+        """
+        if isinstance(self.parent, Service):
+            # wrapped service started later is monitored by the shared scheduler
+            self.parent._get_monitoring_scheduler()
+        self._lock = asyncio.Lock()
+        self.should_stop = False
+        self.running = True
+
+    async def stop(self):
+        """Stop wrapper and wrapped service if it is active.
+        """
+        self.should_stop = True
+        self.running = False
+        self._cancel_idle_timer()
+        if self._idle_stop is not None and self._idle_stop is not asyncio.current_task():
+            await asyncio.gather(self._idle_stop, return_exceptions=True)
+        if self._lock is not None:
+            async with self._lock:
+                await self._stop_service()
+
+    async def healthcheck(self):
+        """Check wrapper is running and active wrapped service is healthy.
+
+        Wrapped service monitored by the shared monitoring scheduler is only checked to be running,
+        its health is pushed to the parent instead.
+        """
+        await super().healthcheck()
+        if not self._active:
+            return
+        if not self.service.running:
+            raise UnhealthyException("Lazy service %s was stopped unexpectedly" % self.service.name)
+        if not self.service.monitored:
+            await self.service.healthcheck()
+
+    async def acquire(self) -> Service:
+        """Start wrapped service if it is not active and mark it as used.
+
+        Each call should be paired with :py:meth:`release`.
+
+        :raise RuntimeError: if wrapper is not running
+        """
+        if not self.running or self._lock is None:
+            raise RuntimeError("Service %s is not running" % self.name)
+        self.users += 1
+        self._cancel_idle_timer()
+        try:
+            if not self._active:
+                async with self._lock:
+                    if not self._active:
+                        await self._start_service()
+        except BaseException:
+            self.release()
+            raise
+        return self.service
+
+    def release(self):
+        """Mark wrapped service as not used by the caller.
+
+        Idle timer is started once there are no users left.
+        """
+        self.users -= 1
+        self._last_used = self.loop.time()
+        if self.users == 0 and self.idle_timeout is not None and self.running:
+            self._idle_handle = self.loop.call_later(self.idle_timeout, self._idle)
+
+    @asynccontextmanager
+    async def use(self) -> AsyncIterator[Service]:
+        """Context manager acquiring wrapped service for the block duration.
+        """
+        service = await self.acquire()
+        try:
+            yield service
+        finally:
+            self.release()
+
+    async def _start_service(self):
+        service = self.service
+        service.parent = self.parent
+        log.debug("Starting lazy service %s", service.name)
+        await asyncio.wait_for(service.start(), service.start_timeout)
+        self.starts += 1
+        self._active = True
+        service._health_entry = self
+        self._push_health(service.health)
+
+    async def _stop_service(self):
+        if not self._active:
+            return
+        self._active = False
+        # idle or shutdown stop of the wrapped service doesn't affect parent health
+        self.service._health_entry = None
+        self._push_health(HealthState(HEALTHY, self.loop.time()))
+        log.debug("Stopping lazy service %s", self.service.name)
+        await self.service.stop()
+
+    def _push_health(self, state: HealthState):
+        parent = self.parent
+        if isinstance(parent, Service) and parent.running and self in parent._services:
+            parent._services.set_health(self, state)
+            parent._update_health()
+
+    def _cancel_idle_timer(self):
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+
+    def _idle(self):
+        self._idle_handle = None
+        if self.users or not self._active or self.should_stop:
+            return
+        self._idle_stop = self.loop.create_task(self._stop_idle(), name=f"{self.name}.idle_stop")
+
+    async def _stop_idle(self):
+        assert self._lock is not None
+        async with self._lock:
+            if self.users or self.should_stop:
+                return
+            log.info("Stopping %s service idle for %s seconds", self.service.name, self.idle_timeout)
+            try:
+                await self._stop_service()
+            except Exception:  # noqa
+                log.exception("Failed to stop idle %s service", self.service.name)
@@ -0,0 +1,180 @@
+"""Rate and concurrency limits.
+
+Limiter is acquired around each service task call. It can be private to the task
+or shared by name between tasks of the whole service tree.
+"""
+import asyncio
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from .metrics import LatencyHistogram
+
+
+class Limiter:
+    """Token bucket rate limiter with optional concurrency cap.
+
+    Each acquire takes a token from the bucket refilled with `rate` tokens per second
+    and holding up to `burst` tokens (a single one by default, so calls are evenly spaced).
+    Tokens are reserved in order of requests, so waiting callers are served first come
+    first served. No more than `max_concurrency` callers hold the limiter at once.
+
+    Time spent waiting in :py:meth:`acquire` is recorded into `wait` histogram.
+
+    .. code-block:: python
+
+        limiter = Limiter(rate=10, max_concurrency=3)
+        async with limiter:
+            await session.get(url)
+    """
+    def __init__(self, rate: Optional[float] = None, burst: Optional[int] = None,
+                 max_concurrency: Optional[int] = None, name: Optional[str] = None):
+        if rate is None and max_concurrency is None:
+            raise ValueError("Rate or maximum concurrency should be provided")
+        if rate is not None and rate <= 0:
+            raise ValueError("Rate should be gt 0")
+        if burst is not None and (rate is None or burst < 1):
+            raise ValueError("Burst should be gte 1 and requires rate")
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError("Maximum concurrency should be gte 1")
+        self.name = name
+        self.rate = rate
+        self.burst = burst or 1
+        self.max_concurrency = max_concurrency
+        #: number of callers holding the limiter
+        self.in_use = 0
+        #: number of callers waiting in :py:meth:`acquire`
+        self.waiting = 0
+        #: total number of acquires
+        self.acquired = 0
+        #: time spent waiting for the limiter
+        self.wait = LatencyHistogram()
+        self._tokens = float(self.burst)
+        self._updated: Optional[float] = None
+        self._slots = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    def limits(self) -> tuple:
+        """Limits of the limiter, limiters with the same limits are interchangeable.
+        """
+        return self.rate, self.burst, self.max_concurrency
+
+    async def acquire(self):
+        """Wait for a free concurrency slot and a token.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        self.waiting += 1
+        try:
+            if self.max_concurrency is not None:
+                await self._acquire_slot(loop)
+            if self.rate is not None:
+                try:
+                    delay = self._reserve(loop.time())
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                except BaseException:
+                    # token is returned to the bucket on cancellation
+                    self._tokens += 1
+                    if self.max_concurrency is not None:
+                        self._release_slot()
+                    raise
+        finally:
+            self.waiting -= 1
+        self.in_use += 1
+        self.acquired += 1
+        self.wait.record(loop.time() - started)
+
+    def release(self):
+        """Release concurrency slot taken by :py:meth:`acquire`.
+        """
+        self.in_use -= 1
+        if self.max_concurrency is not None:
+            self._release_slot()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+
+    def _reserve(self, now: float) -> float:
+        """Take a token, bucket goes negative if it is empty.
+
+        :return: number of seconds to wait until the taken token is refilled
+        """
+        assert self.rate is not None
+        if self._updated is not None:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        return -self._tokens / self.rate if self._tokens < 0 else 0.
+
+    async def _acquire_slot(self, loop: asyncio.AbstractEventLoop):
+        assert self.max_concurrency is not None
+        if self._slots < self.max_concurrency and not self._waiters:
+            self._slots += 1
+            return
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # slot was handed over to the cancelled caller, pass it on
+                self._release_slot()
+            raise
+
+    def _release_slot(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._slots -= 1
+
+    def get_stats(self) -> dict:
+        """Limits, current usage and wait time percentiles.
+        """
+        return {
+            'name': self.name,
+            'rate': self.rate,
+            'burst': self.burst,
+            'max_concurrency': self.max_concurrency,
+            'acquired': self.acquired,
+            'in_use': self.in_use,
+            'waiting': self.waiting,
+            'wait': self.wait.snapshot(),
+        }
+
+
+def resolve_limiter(service, name: Optional[str] = None, rate: Optional[float] = None,
+                    burst: Optional[int] = None, max_concurrency: Optional[int] = None) -> Optional[Limiter]:
+    """Find or create limiter of the service task.
+
+    Task limits without `name` create a limiter private to the task. Named limiter
+    is looked up in `limiters` of the service and its ancestors, the nearest one is used.
+    Limiter not defined yet is created from the task limits and registered on the root
+    service, so other tasks of the tree can share it.
+
+    :raise ValueError: if named limiter has different limits or there are no limits to create it
+    """
+    if name is None:
+        if rate is None and max_concurrency is None:
+            return None
+        return Limiter(rate, burst, max_concurrency)
+    root = node = service
+    while node is not None:
+        limiters: Dict[str, Limiter] = getattr(node, 'limiters', {})
+        limiter = limiters.get(name)
+        if limiter is not None:
+            if (rate is not None or max_concurrency is not None) and \
+                    limiter.limits() != (rate, burst or 1, max_concurrency):
+                raise ValueError("Limiter %s is already defined with different limits" % name)
+            return limiter
+        root, node = node, node.parent
+    if rate is None and max_concurrency is None:
+        raise ValueError("Limiter %s is not defined" % name)
+    limiter = Limiter(rate, burst, max_concurrency, name=name)
+    root.limiters[name] = limiter
+    return limiter
@@ -1,10 +1,152 @@
+"""Service logging.
+
+Service and task names are passed with log records as `service` and `task` attributes
+instead of message prefixes. Use :py:class:`ServiceFormatter` to show them.
+
+Debug messages of hot paths, like startup of each nested service, are skipped without
+formatting if debug level is disabled, and can be sampled with :py:func:`set_debug_sampling`.
+"""
 import logging
+import logging.handlers
+import queue
+from typing import Dict, Iterable, List, Optional
 
+#: every n-th hot path debug message is logged
+_debug_sample_rate = 1
+_debug_counters: Dict[str, int] = {}
 
-class ServiceLoggerAdapter(logging.LoggerAdapter):
+
+def set_debug_sampling(rate: int):
+    """Log only every `rate`-th hot path debug message with the same text.
+
+    Sampled records have `sample_rate` attribute.
+    """
+    global _debug_sample_rate
+    if rate < 1:
+        raise ValueError("Sample rate should be gte 1")
+    _debug_sample_rate = rate
+    _debug_counters.clear()
+
+
+def debug_sampled(logger, msg: str, *args, **kwargs):
+    """Log hot path debug message with the logger or service logger adapter.
+
+    Message is skipped before formatting if debug level is disabled or it is not sampled.
     """
-    This example adapter expects the passed in dict-like object to have a
-    'connid' key, whose value in brackets is prepended to the log message.
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    rate = _debug_sample_rate
+    if rate > 1:
+        count = _debug_counters.get(msg, 0)
+        _debug_counters[msg] = count + 1
+        if count % rate:
+            return
+        kwargs['extra'] = {**kwargs.get('extra', {}), 'sample_rate': rate}
+    logger.debug(msg, *args, **kwargs)
+
+
+class ServiceLoggerAdapter(logging.LoggerAdapter):
+    """Logger adapter adding service context to log records.
+
+    Service name is added as `service` record attribute. Task name can be passed
+    with `task` keyword argument and is added as `task` attribute:
+
+    .. code-block:: python
+
+        service.log.info("Scaled to %i workers", workers, task='consume')
     """
     def process(self, msg, kwargs):
-        return '[%s] %s' % (self.extra['service'], msg), kwargs
+        extra = kwargs.get('extra')
+        task = kwargs.pop('task', None)
+        if extra is not None or task is not None:
+            extra = {**self.extra, **(extra or {})}
+            if task is not None:
+                extra['task'] = task
+            kwargs['extra'] = extra
+        else:
+            kwargs['extra'] = self.extra
+        return msg, kwargs
+
+    def debug_sampled(self, msg, *args, **kwargs):
+        """Log hot path debug message, see :py:func:`debug_sampled`.
+        """
+        debug_sampled(self, msg, *args, **kwargs)
+
+
+class ServiceFormatter(logging.Formatter):
+    """Formatter prefixing message with service and task names of the record.
+
+    Message is prefixed with `[Service] ` or `[Service:task] ` if record has service context.
+    """
+    default_format = "%(asctime)s %(levelname)s %(name)s %(service_context)s%(message)s"
+
+    def __init__(self, fmt: Optional[str] = None, *args, **kwargs):
+        super().__init__(fmt or self.default_format, *args, **kwargs)
+
+    def format(self, record):
+        service = getattr(record, 'service', None)
+        task = getattr(record, 'task', None)
+        if service is None:
+            record.service_context = ''
+        elif task is None:
+            record.service_context = '[%s] ' % service
+        else:
+            record.service_context = '[%s:%s] ' % (service, task)
+        return super().format(record)
+
+
+class LogSink:
+    """Write log records in a background thread.
+
+    Handlers of the `logger` (root logger by default) are replaced with a single
+    :py:class:`logging.handlers.QueueHandler` on start, so event loop only puts records
+    into a queue. Records are passed to the original handlers, or `handlers` if provided,
+    by a :py:class:`logging.handlers.QueueListener` thread. Handlers are restored on stop
+    after all queued records are written.
+
+    .. code-block:: python
+
+        with LogSink():
+            asyncio.run(serve(app))
+    """
+    def __init__(self, logger: Optional[logging.Logger] = None,
+                 handlers: Optional[Iterable[logging.Handler]] = None):
+        self.logger = logger or logging.getLogger()
+        self.handlers = list(handlers) if handlers is not None else None
+        self.listener: Optional[logging.handlers.QueueListener] = None
+        self._queue_handler: Optional[logging.handlers.QueueHandler] = None
+        self._replaced: List[logging.Handler] = []
+
+    def start(self):
+        """Replace logger handlers and start listener thread.
+        """
+        if self.listener is not None:
+            raise RuntimeError("Log sink is already started")
+        records = queue.SimpleQueue()
+        self._replaced = list(self.logger.handlers)
+        handlers = self.handlers if self.handlers is not None else self._replaced
+        self.listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+        self._queue_handler = logging.handlers.QueueHandler(records)
+        for handler in self._replaced:
+            self.logger.removeHandler(handler)
+        self.logger.addHandler(self._queue_handler)
+        self.listener.start()
+
+    def stop(self):
+        """Write queued records, stop listener thread and restore logger handlers.
+        """
+        if self.listener is None:
+            return
+        self.logger.removeHandler(self._queue_handler)
+        self.listener.stop()
+        for handler in self._replaced:
+            self.logger.addHandler(handler)
+        self.listener = self._queue_handler = None
+        self._replaced = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
@@ -0,0 +1,104 @@
+"""Service task runtime metrics.
+
+Task iterations are recorded into fixed bucket latency histograms. Recording
+is a single bisect over precomputed bucket bounds and a few counter updates.
+"""
+import bisect
+from typing import List, Sequence
+
+#: bucket upper bounds in seconds, 4 buckets per power of two from 1 µs up to ~15 minutes
+DEFAULT_BOUNDS = tuple(1e-6 * 2 ** (i / 4) for i in range(4 * 30))
+
+
+class LatencyHistogram:
+    """HDR-style histogram with fixed logarithmic buckets.
+
+    Value is counted in the first bucket with upper bound greater or equal to it,
+    values above the last bound are counted in the overflow bucket. Percentiles
+    are reported as bucket upper bounds, so relative error is about 19% with
+    default bounds.
+    """
+    __slots__ = ('bounds', 'counts', 'count', 'total', 'max')
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BOUNDS):
+        self.bounds = bounds
+        self.counts: List[int] = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.
+        self.max = 0.
+
+    def record(self, value: float):
+        """Add value to the histogram.
+        """
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: 'LatencyHistogram'):
+        """Add values of the other histogram with the same bounds.
+        """
+        if other.bounds != self.bounds:
+            raise ValueError("Histograms with different bounds can't be merged")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket containing `q` percentile (0-100) of values.
+        """
+        if not self.count:
+            return 0.
+        rank = q / 100 * self.count
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            if count and cumulative >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self) -> dict:
+        """Number of values, mean, maximum and percentiles in seconds.
+        """
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+        }
+
+
+class TaskMetrics:
+    """Runtime metrics of a service task or a group of tasks.
+    """
+    __slots__ = ('iterations', 'errors', 'in_flight', 'latency')
+
+    def __init__(self):
+        #: number of finished task method calls
+        self.iterations = 0
+        #: number of calls failed with exception
+        self.errors = 0
+        #: number of calls running now
+        self.in_flight = 0
+        #: call duration histogram
+        self.latency = LatencyHistogram()
+
+    def merge(self, other: 'TaskMetrics'):
+        """Add metrics of the other task.
+        """
+        self.iterations += other.iterations
+        self.errors += other.errors
+        self.in_flight += other.in_flight
+        self.latency.merge(other.latency)
+
+    def snapshot(self) -> dict:
+        return {
+            'iterations': self.iterations,
+            'errors': self.errors,
+            'in_flight': self.in_flight,
+            'latency': self.latency.snapshot(),
+        }
@@ -0,0 +1,332 @@
+"""Shared monitoring scheduler and event loop watchdog.
+
+Nested services of the same service tree are monitored by a single scheduler
+owned by the root service instead of running own monitoring task each.
+"""
+import asyncio
+import heapq
+import logging
+import threading
+import time
+from collections import deque
+from functools import partial
+from typing import Deque, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from .tracing import reset_current_span
+
+log = logging.getLogger(__name__)
+
+
+class Wakeup:
+    """Interruptible sleep.
+
+    Sleeping coroutine can be woken up earlier by :py:meth:`wake` call.
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self._future: Optional[asyncio.Future] = None
+
+    async def sleep(self, delay: Optional[float]):
+        """Sleep for `delay` seconds or until woken up. Sleep forever if `delay` is `None`.
+        """
+        self._future = self.loop.create_future()
+        handle = None
+        if delay is not None:
+            handle = self.loop.call_later(delay, self.wake)
+        try:
+            await self._future
+        finally:
+            if handle is not None:
+                handle.cancel()
+            self._future = None
+
+    def wake(self):
+        """Wake up sleeping coroutine.
+        """
+        if self._future is not None and not self._future.done():
+            self._future.set_result(None)
+
+
+class MonitoringScheduler:
+    """Healthcheck scheduler for a service tree.
+
+    Services are grouped into buckets by their monitoring interval. A single
+    asyncio task sleeps until the nearest bucket is due and starts checks of all
+    services of due buckets as separate tasks, so a slow healthcheck doesn't delay
+    checks of other services. Each service is checked once per its interval,
+    service whose previous check is still running is skipped.
+
+    Failed services are stopped. Parent of the stopped service is checked
+    right after that to propagate failure without waiting for the next interval.
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self._buckets: Dict[float, Dict] = {}
+        self._due: List[Tuple[float, float]] = []
+        self._urgent: Dict = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = Wakeup(loop)
+        self._stop_tasks: Set[asyncio.Task] = set()
+        #: running checks by service
+        self._checks: Dict = {}
+        #: services to check again once their running check is finished
+        self._recheck: Set = set()
+
+    def register(self, service):
+        """Add service to the scheduler.
+
+        Service will be checked every `service._monitoring_interval` seconds
+        starting from the next scheduler iteration.
+        """
+        interval = service._monitoring_interval
+        bucket = self._buckets.get(interval)
+        if bucket is None:
+            bucket = self._buckets[interval] = {}
+            heapq.heappush(self._due, (self.loop.time(), interval))
+            self._wakeup.wake()
+        bucket[service] = None
+        service.monitored = True
+
+    def unregister(self, service):
+        """Remove service from the scheduler.
+        """
+        bucket = self._buckets.get(service._monitoring_interval)
+        if bucket is not None:
+            bucket.pop(service, None)
+        self._urgent.pop(service, None)
+        self._recheck.discard(service)
+        service.monitored = False
+
+    def check_now(self, service):
+        """Schedule service healthcheck on the next scheduler iteration.
+        """
+        if service.monitored:
+            self._urgent[service] = None
+            self._wakeup.wake()
+
+    def start(self):
+        """Start scheduler task.
+        """
+        self._task = self.loop.create_task(self._run(), name="monitoring_scheduler")
+
+    async def stop(self):
+        """Stop scheduler task.
+
+        Running checks are cancelled, services stopped by the scheduler are not awaited.
+        """
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        checks = [check for check in self._checks.values() if check is not asyncio.current_task()]
+        self._recheck.clear()
+        if task is not asyncio.current_task():
+            checks.append(task)
+        for check in checks:
+            check.cancel()
+        await asyncio.gather(*checks, return_exceptions=True)
+
+    async def _run(self):
+        # healthcheck spans are not children of the root service start span
+        reset_current_span()
+        while True:
+            if self._urgent:
+                services = list(self._urgent)
+                self._urgent.clear()
+                self._check(services, urgent=True)
+                continue
+            if not self._due:
+                await self._wakeup.sleep(None)
+                continue
+            delay = self._due[0][0] - self.loop.time()
+            if delay > 0:
+                await self._wakeup.sleep(delay)
+                continue
+            self._check(self._pop_due())
+
+    def _pop_due(self) -> List:
+        """Pop all due buckets and schedule their next run.
+        """
+        now = self.loop.time()
+        services: Dict = {}
+        while self._due and self._due[0][0] <= now:
+            due, interval = heapq.heappop(self._due)
+            bucket = self._buckets[interval]
+            if not bucket:
+                del self._buckets[interval]
+                continue
+            services.update(bucket)
+            next_due = due + interval
+            if next_due <= now:
+                next_due = now + interval
+            heapq.heappush(self._due, (next_due, interval))
+        return list(services)
+
+    def _check(self, services: List, urgent: bool = False):
+        """Start check of each service in a separate task.
+
+        Urgent check of the service being checked is repeated after the running one.
+        """
+        for service in services:
+            if service in self._checks:
+                if urgent:
+                    self._recheck.add(service)
+                continue
+            check = self.loop.create_task(service._monitoring_check(), name=f"{service.name}.healthcheck")
+            self._checks[service] = check
+            check.add_done_callback(partial(self._on_checked, service))
+
+    def _on_checked(self, service, check: asyncio.Task):
+        if self._checks.get(service) is check:
+            del self._checks[service]
+        if check.cancelled():
+            return
+        if check.exception() is not None:
+            log.error("Fail to check %s service", service.name, exc_info=check.exception())
+        elif not check.result():
+            self._fail(service)
+            return
+        if service in self._recheck:
+            self._recheck.discard(service)
+            self.check_now(service)
+
+    def _fail(self, service):
+        self.unregister(service)
+        if service.should_stop:
+            return
+        task = self.loop.create_task(service.stop(), name=f"{service.name}.stop")
+        self._stop_tasks.add(task)
+        task.add_done_callback(partial(self._on_stopped, service))
+
+    def _on_stopped(self, service, task: asyncio.Task):
+        self._stop_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log.error("Fail to stop %s service", service.name, exc_info=task.exception())
+        if service.parent is not None:
+            self.check_now(service.parent)
+
+
+class LoopStall(NamedTuple):
+    """Event loop was blocked by a single callback.
+    """
+    #: event loop time the loop was unblocked
+    time: float
+    #: number of seconds the loop was blocked
+    lag: float
+    #: name of the task blocking the loop, `None` if it was not a task
+    task_name: Optional[str]
+    #: service and service task names parsed from the task name
+    service: Optional[str]
+    task: Optional[str]
+
+
+def parse_task_name(name: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """Split `Service.method.index` task name into service and task names.
+    """
+    if name is None:
+        return None, None
+    parts = name.split('.')
+    if len(parts) >= 3 and (parts[-1].isdigit() or parts[-1] in ('autoscaler', 'resend')):
+        return '.'.join(parts[:-2]), parts[-2]
+    if len(parts) >= 2:
+        return '.'.join(parts[:-1]), parts[-1]
+    return None, name
+
+
+class LoopWatchdog:
+    """Event loop lag watchdog.
+
+    Heartbeat callback is scheduled every `interval` seconds. Lag is a delay
+    of the heartbeat relative to its schedule. Sustained lag is an average lag
+    of the last `window` heartbeats.
+
+    Watcher thread checks heartbeats. If the loop is blocked for more than
+    `threshold` seconds it samples the task running on the loop. Once the loop
+    is unblocked, stall is logged with a warning and attributed to the service
+    and task name of that task.
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop, threshold: float = .1,
+                 interval: float = .05, window: int = 20):
+        if threshold <= 0 or interval <= 0:
+            raise ValueError("Watchdog threshold and interval should be gt 0")
+        self.loop = loop
+        self.threshold = threshold
+        self.interval = interval
+        #: lag of the recent heartbeats
+        self.lags: Deque[float] = deque(maxlen=window)
+        #: recent stalls
+        self.stalls: Deque[LoopStall] = deque(maxlen=100)
+        #: maximum lag seen
+        self.max_lag = 0.
+        self._expected = 0.
+        self._heartbeat = 0.
+        self._suspect: Optional[str] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @property
+    def lag(self) -> float:
+        """Lag of the last heartbeat.
+        """
+        return self.lags[-1] if self.lags else 0.
+
+    @property
+    def sustained_lag(self) -> float:
+        """Average lag of the recent heartbeats.
+        """
+        return sum(self.lags) / len(self.lags) if self.lags else 0.
+
+    def start(self):
+        """Start heartbeats and watcher thread.
+        """
+        self._stopped.clear()
+        self._heartbeat = time.monotonic()
+        self._expected = self.loop.time()
+        self._handle = self.loop.call_soon(self._beat)
+        self._thread = threading.Thread(target=self._watch, name="loop_watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop heartbeats and watcher thread.
+        """
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def get_stats(self) -> dict:
+        """Current, sustained and maximum lag in seconds and number of stalls.
+        """
+        return {
+            'lag': self.lag,
+            'sustained_lag': self.sustained_lag,
+            'max_lag': self.max_lag,
+            'stalls': len(self.stalls),
+        }
+
+    def _beat(self):
+        now = self.loop.time()
+        self._heartbeat = time.monotonic()
+        lag = max(now - self._expected, 0.)
+        self.lags.append(lag)
+        if lag > self.max_lag:
+            self.max_lag = lag
+        task_name, self._suspect = self._suspect, None
+        if lag >= self.threshold:
+            service, task = parse_task_name(task_name)
+            self.stalls.append(LoopStall(now, lag, task_name, service, task))
+            log.warning("Event loop was blocked for %.3f seconds by %s", lag,
+                        task_name or "a callback outside of tasks")
+        self._expected = now + self.interval
+        self._handle = self.loop.call_at(self._expected, self._beat)
+
+    def _watch(self):
+        while not self._stopped.wait(self.threshold / 2):
+            blocked = time.monotonic() - self._heartbeat - self.interval
+            if blocked >= self.threshold / 2 and self._suspect is None:
+                task = asyncio.current_task(self.loop)
+                if task is not None:
+                    self._suspect = task.get_name()
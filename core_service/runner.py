@@ -0,0 +1,146 @@
+"""Service runner.
+
+Run service until it is stopped by a signal or by its own monitoring.
+Command line interface is available with ``python -m core_service``.
+"""
+import argparse
+import asyncio
+import importlib
+import logging
+import signal
+from contextlib import nullcontext
+from typing import Callable, List, Optional, Sequence
+
+from .base import Service
+from .logging import LogSink, ServiceFormatter
+
+log = logging.getLogger(__name__)
+
+#: signals stopping the service gracefully
+SHUTDOWN_SIGNALS = (signal.SIGINT, signal.SIGTERM)
+
+
+def run(service: Service, *, uvloop: bool = False, shutdown_timeout: Optional[float] = None,
+        signals: Sequence[signal.Signals] = SHUTDOWN_SIGNALS, log_sink: bool = False) -> int:
+    """Run service in a new event loop until it is stopped.
+
+    Service is stopped gracefully on one of `signals` (SIGINT or SIGTERM by default).
+    Stop is limited by `shutdown_timeout` seconds. Event loop policy is switched to
+    uvloop if `uvloop` is set, it should be installed in this case. Log records are written
+    by a background thread if `log_sink` is set, see :py:class:`core_service.logging.LogSink`.
+
+    .. code-block:: python
+
+        if __name__ == '__main__':
+            raise SystemExit(run(Application(), uvloop=True, shutdown_timeout=30))
+
+    :return: exit code, `0` if service was stopped by signal
+    """
+    if uvloop:
+        install_uvloop()
+    with LogSink() if log_sink else nullcontext():
+        return asyncio.run(serve(service, shutdown_timeout=shutdown_timeout, signals=signals))
+
+
+def install_uvloop():
+    """Use uvloop event loop policy.
+
+    :raise RuntimeError: if uvloop is not installed
+    """
+    try:
+        import uvloop
+    except ImportError as e:
+        raise RuntimeError("uvloop is not installed, install it with `pip install uvloop`") from e
+    uvloop.install()
+
+
+async def serve(service: Service, *, shutdown_timeout: Optional[float] = None,
+                signals: Sequence[signal.Signals] = SHUTDOWN_SIGNALS) -> int:
+    """Start service and wait until it is stopped by itself or by one of `signals`.
+
+    :return: `0` if service was stopped by signal, `1` if it failed or didn't stop
+        in `shutdown_timeout` seconds
+    """
+    loop = asyncio.get_running_loop()
+    terminated = asyncio.Event()
+    for signum in signals:
+        loop.add_signal_handler(signum, terminated.set)
+    try:
+        return await _serve(service, terminated, shutdown_timeout)
+    finally:
+        for signum in signals:
+            loop.remove_signal_handler(signum)
+
+
+async def _serve(service: Service, terminated: asyncio.Event, shutdown_timeout: Optional[float]) -> int:
+    loop = asyncio.get_running_loop()
+    try:
+        await service.start()
+    except Exception:  # noqa
+        log.exception("Failed to start %s service", service.name)
+        return 1
+    signalled = loop.create_task(terminated.wait())
+    stopped = loop.create_task(service.wait_stopped())
+    await asyncio.wait({signalled, stopped}, return_when=asyncio.FIRST_COMPLETED)
+    signalled.cancel()
+    if stopped.done():
+        log.error("Service %s stopped unexpectedly", service.name)
+        return 1
+    stopped.cancel()
+    log.info("Stopping %s service", service.name)
+    try:
+        await asyncio.wait_for(service.stop(), shutdown_timeout)
+    except asyncio.TimeoutError:
+        log.error("Service %s was not stopped in %s seconds", service.name, shutdown_timeout)
+        return 1
+    except Exception:  # noqa
+        log.exception("Failed to stop %s service", service.name)
+        return 1
+    return 0
+
+
+def load_factory(target: str) -> Callable[..., Service]:
+    """Load service class or factory by `module:attribute` path.
+    """
+    module_name, _, attribute = target.partition(':')
+    if not module_name or not attribute:
+        raise ValueError("Target should be in `module:attribute` format, got %r" % target)
+    factory = importlib.import_module(module_name)
+    for name in attribute.split('.'):
+        factory = getattr(factory, name)
+    if not callable(factory):
+        raise TypeError("%s is not a service class or factory" % target)
+    return factory  # type: ignore
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point.
+    """
+    from .supervisor import Supervisor
+
+    parser = argparse.ArgumentParser(prog='python -m core_service',
+                                     description="Run service until SIGINT or SIGTERM is received.")
+    parser.add_argument('target', help="service class or factory as `module:attribute`")
+    parser.add_argument('--uvloop', action='store_true', help="use uvloop event loop")
+    parser.add_argument('--shutdown-timeout', type=float, help="maximum number of seconds to wait for stop")
+    parser.add_argument('--processes', type=int, help="run service copies in worker processes")
+    parser.add_argument('--sharded', action='store_true',
+                        help="pass `worker_index` and `workers` to the factory of worker processes")
+    parser.add_argument('--log-level', default='INFO')
+    parser.add_argument('--log-sink', action='store_true', help="write logs in a background thread")
+    args = parser.parse_args(argv)
+    if args.log_sink and args.processes is not None:
+        parser.error("--log-sink can't be used with --processes")
+    handler = logging.StreamHandler()
+    handler.setFormatter(ServiceFormatter())
+    logging.basicConfig(level=args.log_level.upper(), handlers=[handler])
+    factory = load_factory(args.target)
+    if args.uvloop:
+        # worker processes inherit event loop policy
+        install_uvloop()
+    if args.processes is not None:
+        Supervisor(factory, processes=args.processes, sharded=args.sharded,
+                   shutdown_timeout=args.shutdown_timeout).run()
+        return 0
+    with LogSink() if args.log_sink else nullcontext():
+        return asyncio.run(serve(factory(), shutdown_timeout=args.shutdown_timeout))
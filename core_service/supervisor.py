@@ -0,0 +1,176 @@
+"""Multi-process supervisor.
+
+Service tree is bound to a single event loop and therefore to a single CPU core.
+Supervisor pre-forks worker processes, each running its own copy of the service
+(or its own shard of nested services) on its own event loop.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from multiprocessing.connection import wait
+from typing import Callable, List, Optional, Sequence
+
+from .base import Service
+from .runner import serve
+
+log = logging.getLogger(__name__)
+
+
+def shard(items: Sequence, worker_index: int, workers: int) -> list:
+    """Items handled by the worker with `worker_index` out of `workers`.
+
+    Items are distributed between workers round-robin.
+    """
+    return list(items[worker_index::workers])
+
+
+class Supervisor:
+    """Supervisor of the service worker processes.
+
+    Starts `processes` workers (number of CPU cores by default). Each worker creates
+    a service with `service_factory` and runs it on its own event loop until SIGTERM
+    is received or the service is stopped by its monitoring.
+
+    `service_factory` is called without arguments, so service class can be used as is.
+    If `sharded` is set it is called with `worker_index` and `workers` keyword arguments
+    to create a service handling a part of the work, see :py:func:`shard`.
+
+    Exited worker is restarted after exponential backoff starting from `restart_backoff`
+    up to `restart_backoff_max` seconds. Backoff is reset once worker is running
+    for `restart_backoff_max` seconds.
+
+    On SIGTERM or SIGINT workers are asked to stop their services with SIGTERM and
+    killed if they are still running after `stop_timeout` seconds. Service stop in
+    a worker is limited by `shutdown_timeout` seconds, `stop_timeout` defaults to
+    a second more than that or 10 seconds if there is no shutdown timeout.
+    """
+    def __init__(self, service_factory: Callable[..., Service], processes: Optional[int] = None,
+                 sharded: bool = False, restart_backoff: float = .5, restart_backoff_max: float = 30.,
+                 stop_timeout: Optional[float] = None, shutdown_timeout: Optional[float] = None):
+        if processes is None:
+            processes = os.cpu_count() or 1
+        if processes < 1:
+            raise ValueError("Number of processes should be gte 1")
+        if restart_backoff < 0 or restart_backoff_max < restart_backoff:
+            raise ValueError("Restart backoff should be gte 0 and lte maximum backoff")
+        self.service_factory = service_factory
+        self.processes = processes
+        self.sharded = sharded
+        self.restart_backoff = restart_backoff
+        self.restart_backoff_max = restart_backoff_max
+        self.shutdown_timeout = shutdown_timeout
+        if stop_timeout is None:
+            stop_timeout = shutdown_timeout + 1. if shutdown_timeout is not None else 10.
+        self.stop_timeout = stop_timeout
+        #: worker processes by worker index, `None` if waiting for restart
+        self.workers: List[Optional[multiprocessing.Process]] = [None] * processes
+        #: number of restarts by worker index
+        self.restarts: List[int] = [0] * processes
+        self._crashes = [0] * processes
+        self._started_at = [0.] * processes
+        self._restart_at: List[Optional[float]] = [None] * processes
+        self._stopping = False
+
+    def start(self):
+        """Start all worker processes.
+        """
+        self._stopping = False
+        for index in range(self.processes):
+            self._start_worker(index)
+
+    def supervise(self, timeout: Optional[float] = None):
+        """Wait for worker exit up to `timeout` seconds and restart exited workers when due.
+        """
+        sentinels = [worker.sentinel for worker in self.workers if worker is not None]
+        pending = [at for at in self._restart_at if at is not None]
+        if pending:
+            delay = max(min(pending) - time.monotonic(), 0)
+            timeout = delay if timeout is None else min(timeout, delay)
+        if sentinels:
+            wait(sentinels, timeout)
+        elif timeout:
+            time.sleep(timeout)
+        now = time.monotonic()
+        for index, worker in enumerate(self.workers):
+            restart_at = self._restart_at[index]
+            if worker is not None and not worker.is_alive():
+                self._worker_exited(index, worker, now)
+            elif worker is None and restart_at is not None and restart_at <= now:
+                self.restarts[index] += 1
+                self._start_worker(index)
+
+    def stop(self):
+        """Stop all worker processes gracefully.
+
+        Workers still running after `stop_timeout` seconds are killed.
+        """
+        self._stopping = True
+        self._restart_at = [None] * self.processes
+        workers = [worker for worker in self.workers if worker is not None]
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+        deadline = time.monotonic() + self.stop_timeout
+        for worker in workers:
+            worker.join(max(deadline - time.monotonic(), 0))
+            if worker.is_alive():
+                log.error("Worker %s is not stopped in %s seconds, killing it", worker.name, self.stop_timeout)
+                worker.kill()
+                worker.join()
+        self.workers = [None] * self.processes
+
+    def run(self):
+        """Run workers until SIGTERM or SIGINT is received.
+        """
+        def shutdown(signum, frame):
+            log.info("Received %s, stopping workers", signal.Signals(signum).name)
+            self._stopping = True
+
+        handlers = {signum: signal.signal(signum, shutdown) for signum in (signal.SIGTERM, signal.SIGINT)}
+        try:
+            self.start()
+            while not self._stopping:
+                self.supervise(1.)
+        finally:
+            self.stop()
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+
+    def _start_worker(self, index: int):
+        kwargs = {'worker_index': index, 'workers': self.processes} if self.sharded else {}
+        worker = multiprocessing.Process(target=run_worker,
+                                         args=(self.service_factory, kwargs, self.shutdown_timeout),
+                                         name=f"worker-{index}")
+        worker.start()
+        log.info("Started worker %s with pid %s", worker.name, worker.pid)
+        self.workers[index] = worker
+        self._started_at[index] = time.monotonic()
+        self._restart_at[index] = None
+
+    def _worker_exited(self, index: int, worker: multiprocessing.Process, now: float):
+        worker.join()
+        self.workers[index] = None
+        if self._stopping:
+            return
+        if now - self._started_at[index] >= self.restart_backoff_max:
+            self._crashes[index] = 0
+        delay = min(self.restart_backoff * 2 ** min(self._crashes[index], 32), self.restart_backoff_max)
+        self._crashes[index] += 1
+        log.error("Worker %s exited with code %s, restarting in %.2f seconds", worker.name, worker.exitcode, delay)
+        self._restart_at[index] = now + delay
+
+
+def run_worker(service_factory: Callable[..., Service], kwargs: dict, shutdown_timeout: Optional[float] = None):
+    """Worker process entry point.
+
+    Run service on a new event loop and exit with non-zero code if service failed.
+    Service stop is limited by `shutdown_timeout` seconds.
+    """
+    # supervisor stops workers with SIGTERM, terminal SIGINT is handled by supervisor
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    raise SystemExit(asyncio.run(serve(service_factory(**kwargs), shutdown_timeout=shutdown_timeout,
+                                       signals=(signal.SIGTERM,))))
@@ -2,82 +2,839 @@
 """
 import abc
 import asyncio
+import heapq
 import inspect
 import logging
-from typing import Awaitable, Callable, List
+import random
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Awaitable, Callable, Deque, Dict, List, NamedTuple, Optional, Set, Tuple
 
+from . import tracing
 from .abstract import AbstractService
+from .decorators import marked_members
 from .exceptions import UnexpectedTaskException, UnhealthyException
+from .limits import Limiter, resolve_limiter
+from .logging import debug_sampled
+from .metrics import TaskMetrics
 
 log = logging.getLogger(__name__)
 
 
+class QueueStats:
+    """Queue consumer task statistics.
+    """
+    __slots__ = ('enqueued', 'dequeued', 'wait_time', 'max_wait_time', 'started_at')
+
+    def __init__(self, started_at: float):
+        #: number of items put into the queue
+        self.enqueued = 0
+        #: number of items taken from the queue
+        self.dequeued = 0
+        #: total number of seconds items spent in the queue
+        self.wait_time = 0.
+        #: maximum number of seconds single item spent in the queue
+        self.max_wait_time = 0.
+        self.started_at = started_at
+
+
+class ScalingEvent(NamedTuple):
+    """Worker pool scaling decision.
+    """
+    #: event loop time of the decision
+    time: float
+    workers_before: int
+    workers_after: int
+    reason: str
+
+
 class ServiceTask:
     """Service task wrapper.
 
     Wraps service task async method. Contains task execution parameters.
+    Workers are indexed from zero, index of a finished worker is reused by the next one.
     """
-    service: AbstractService
+    __slots__ = ('callable', 'service', 'name', 'periodic', 'sleep_interval', 'schedule', 'jitter', 'stagger',
+                 'missed_ticks', 'on_error', 'retry_backoff', 'retry_backoff_max', 'max_failures',
+                 'circuit_reset_timeout', 'circuit_state', 'failures', 'consecutive_failures', 'last_error',
+                 'workers', 'queue', 'queue_stats', 'batch_size', 'max_batch_latency', 'min_workers',
+                 'max_workers', 'scale_interval', 'scale_cooldown', 'executor', 'executor_workers',
+                 'executor_submitted', 'executor_completed', 'limiter', 'worker_tasks', 'scaling_events',
+                 'metrics', '_batches', '_busy', '_busy_time', '_retiring', '_restarting', '_free_indexes',
+                 '_next_index', '_resend_index', '_circuit_closed', '_opened_at', '_pool', '_sleep')
+
+    service: 'TasksMixin'
+    #: task name, name of the service method by default
+    name: str
     #: task will be executed in infinity loop with sleep_interval between runs
-    periodic: bool = True
+    periodic: bool
     #: number of seconds between task executions
-    sleep_interval: float = .1
+    sleep_interval: float
+    #: `fixed_delay` sleeps `sleep_interval` after each run, `fixed_rate` starts runs
+    #: every `sleep_interval` seconds
+    schedule: str
+    #: maximum random delay in seconds added to each sleep
+    jitter: float
+    #: start workers with evenly distributed phase offsets
+    stagger: bool
+    #: number of fixed rate ticks skipped because of long execution
+    missed_ticks: int
+    #: `raise` fails the service on task exception, `retry` retries failed run
+    on_error: str
+    #: initial and maximum number of seconds to wait before retry
+    retry_backoff: float
+    retry_backoff_max: float
+    #: number of consecutive failures opening the circuit
+    max_failures: Optional[int]
+    #: number of seconds before probing task with open circuit
+    circuit_reset_timeout: float
+    #: `closed`, `open` or `half_open`
+    circuit_state: str
+    #: total and consecutive number of failed runs
+    failures: int
+    consecutive_failures: int
+    last_error: Optional[BaseException]
     #: number of task instances running in parallel
-    workers: int = 1
+    workers: int
+    #: queue of the consumer task, items are passed to the task method
+    queue: Optional[asyncio.Queue]
+    queue_stats: Optional[QueueStats]
+    #: maximum number of queue items passed to the task method at once
+    batch_size: Optional[int]
+    #: maximum number of seconds to wait for the batch to be full
+    max_batch_latency: float
+    #: worker pool bounds, pool is autoscaled if `max_workers` is set
+    min_workers: int
+    max_workers: Optional[int]
+    #: number of seconds between autoscaling decisions
+    scale_interval: float
+    #: minimum number of seconds between two pool size changes
+    scale_cooldown: float
+    #: pool is scaled up if workers are busy for more than this part of time
+    scale_up_busy_ratio: float = .8
+    #: pool is scaled down if workers are busy for less than this part of time
+    scale_down_busy_ratio: float = .2
+    #: `thread` or `process` pool running regular task method
+    executor: Optional[str]
+    #: size of the executor pool
+    executor_workers: int
+    #: number of task method calls passed to and completed by the executor pool
+    executor_submitted: int
+    executor_completed: int
+    #: rate and concurrency limiter acquired around each task call
+    limiter: Optional[Limiter]
 
     def __init__(self,
-                 service: AbstractService,
-                 f: Callable[[], Awaitable],
+                 service: 'TasksMixin',
+                 f: Callable[..., Awaitable],
                  periodic: bool = True,
                  sleep_interval: float = .1,
-                 workers: int = 1):
+                 workers: int = 1,
+                 queue: Optional[int] = None,
+                 batch_size: Optional[int] = None,
+                 max_batch_latency: float = .1,
+                 min_workers: Optional[int] = None,
+                 max_workers: Optional[int] = None,
+                 scale_interval: float = 1.,
+                 scale_cooldown: float = 5.,
+                 schedule: str = 'fixed_delay',
+                 jitter: float = 0.,
+                 stagger: bool = False,
+                 on_error: str = 'raise',
+                 retry_backoff: float = .1,
+                 retry_backoff_max: float = 30.,
+                 max_failures: Optional[int] = None,
+                 circuit_reset_timeout: float = 30.,
+                 executor: Optional[str] = None,
+                 executor_workers: Optional[int] = None,
+                 rate: Optional[float] = None,
+                 burst: Optional[int] = None,
+                 max_concurrency: Optional[int] = None,
+                 limiter: Optional[str] = None,
+                 name: Optional[str] = None):
         self.callable = f
         self.service = service
+        self.name = name or f.__name__
         self.periodic = periodic
         self.sleep_interval = sleep_interval
+        self.schedule = schedule
+        self.jitter = jitter
+        self.stagger = stagger
+        self.on_error = on_error
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        self.max_failures = max_failures
+        self.circuit_reset_timeout = circuit_reset_timeout
+        self.circuit_state = 'closed'
+        self.missed_ticks = 0
+        self.failures = self.consecutive_failures = 0
+        self.last_error: Optional[BaseException] = None
         self.workers = workers
+        self.batch_size = batch_size
+        self.max_batch_latency = max_batch_latency
+        self.min_workers = workers if min_workers is None else min_workers
+        self.max_workers = max_workers
+        self.scale_interval = scale_interval
+        self.scale_cooldown = scale_cooldown
+        if max_workers is not None:
+            self.workers = min(max(workers, self.min_workers), max_workers)
+        if executor == 'process' and inspect.ismethod(f):
+            raise TypeError("Process executor task %s should be a static method" % self.name)
+        self.executor = executor
+        self.executor_workers = executor_workers or max_workers or workers
+        self.executor_submitted = self.executor_completed = 0
+        self.limiter = resolve_limiter(service, limiter, rate, burst, max_concurrency)
+        self.queue: Optional[asyncio.Queue] = None
+        self.queue_stats: Optional[QueueStats] = None
+        if queue is not None:
+            self.queue = asyncio.Queue(maxsize=queue)
+            self.queue_stats = QueueStats(service.loop.time())
+        #: running worker tasks by worker index
+        self.worker_tasks: Dict[int, asyncio.Task] = {}
+        #: recent pool scaling decisions
+        self.scaling_events: Deque[ScalingEvent] = deque(maxlen=100)
+        #: batches being collected or passed to the task method by worker index
+        self._batches: Dict[int, list] = {}
+        self._busy: Dict[int, float] = {}
+        self._busy_time = 0.
+        self._retiring: Set[int] = set()
+        self._restarting: Set[int] = set()
+        #: indexes of finished workers below `_next_index`, may contain taken ones
+        self._free_indexes: List[int] = []
+        self._next_index = 0
+        #: negative indexes of the tasks passing batches of cancelled workers, -1 is used by flush
+        self._resend_index = -1
+        self._circuit_closed = asyncio.Event()
+        self._circuit_closed.set()
+        self._opened_at = 0.
+        self._pool: Optional[Executor] = None
+        #: iterations, errors, in-flight calls and latency histogram
+        self.metrics = TaskMetrics()
+        timer_wheel = service.root.timer_wheel
+        self._sleep = timer_wheel.sleep if timer_wheel is not None else asyncio.sleep
+
+    @property
+    def autoscaling(self) -> bool:
+        """Worker pool is autoscaled.
+        """
+        return self.max_workers is not None
+
+    def start(self):
+        """Start executor pool, task workers and autoscaler if needed.
+        """
+        if self.executor == 'thread':
+            self._pool = ThreadPoolExecutor(self.executor_workers,
+                                            thread_name_prefix=f"{self.service.name}.{self.name}")
+        elif self.executor == 'process':
+            self._pool = ProcessPoolExecutor(self.executor_workers)
+        for _ in range(self.workers):
+            self.start_worker()
+        if self.autoscaling:
+            task_name = ".".join([self.service.name, self.callable.__name__, "autoscaler"])
+            self.service._tasks.add(self.service.loop.create_task(self.autoscale(), name=task_name), self.name)
+
+    def start_worker(self, index: Optional[int] = None) -> asyncio.Task:
+        """Start new worker with the lowest free index or the given one.
+        """
+        if index is None:
+            index = self._take_index()
+        elif index in self.worker_tasks:
+            raise ValueError("Worker %i of task %s is running" % (index, self.name))
+        task_name = ".".join([self.service.name, self.callable.__name__, str(index)])
+        self.service.log.debug_sampled("Create task %s", task_name, task=self.name)
+        task = self.service.loop.create_task(self.run(index), name=task_name)
+        self.worker_tasks[index] = task
+        self.service._tasks.add(task, self.name, index)
+        return task
+
+    def _take_index(self) -> int:
+        """Lowest index not used by running workers.
+        """
+        free = self._free_indexes
+        while free:
+            index = heapq.heappop(free)
+            if index not in self.worker_tasks:
+                return index
+        index = self._next_index
+        self._next_index += 1
+        return index
+
+    async def run(self, index: int = 0):
+        """Run task worker.
+        """
+        # iteration spans are not children of the service start span
+        tracing.reset_current_span()
+        try:
+            if self.batch_size is not None:
+                await self._consume_batches(index)
+            elif self.queue is not None:
+                await self._consume(index)
+            else:
+                await self._run_periodic(index)
+        finally:
+            self._release(index)
+
+    def _release(self, index: int):
+        """Forget exited worker, its index is reused unless it is restarted.
+
+        Pool size is decreased if worker exited on its own, retired workers are
+        already excluded from it.
+        """
+        if index in self._retiring:
+            self._retiring.discard(index)
+        elif index not in self._restarting and not self.service.should_stop:
+            self.workers -= 1
+        # index may be taken by a new worker before the done callback of this one
+        self.service._tasks.discard(self.worker_tasks.pop(index), self.name, index)
+        if index not in self._restarting:
+            heapq.heappush(self._free_indexes, index)
+        batch = self._batches.pop(index, None) if not self.service.should_stop else None
+        if batch:
+            self._resend(batch)
+
+    def _resend(self, batch: list):
+        """Pass batch of the worker cancelled while service is running in a separate task.
+
+        Batch is passed without waiting for the rest of the items.
+        """
+        self._resend_index -= 1
+        index = self._resend_index
+        task_name = ".".join([self.service.name, self.callable.__name__, "resend"])
+        self.service.log.debug_sampled("Resend batch of %i items of the cancelled worker", len(batch), task=self.name)
+        task = self.service.loop.create_task(self._process_batch(batch, index), name=task_name)
+        self.service._tasks.add(task, self.name, index)
+
+    async def _cancel(self, index: int):
+        """Cancel the worker and wait for it to exit.
+        """
+        worker = self.worker_tasks[index]
+        worker.cancel()
+        await asyncio.wait([worker])
+        if self.worker_tasks.get(index) is worker:
+            # worker cancelled before its first step doesn't run cleanup
+            self._release(index)
+
+    def get_worker(self, index: int) -> asyncio.Task:
+        """Running worker task by index.
+
+        :raise KeyError: if there is no such worker
+        """
+        return self.worker_tasks[index]
+
+    def get_worker_info(self, index: int) -> dict:
+        """State of the running worker.
+
+        Worker is `busy` while it runs the task method and `retiring` if it will exit
+        after the current iteration.
+
+        :raise KeyError: if there is no such worker
+        """
+        worker = self.worker_tasks[index]
+        return {
+            'task': self.name,
+            'index': index,
+            'name': worker.get_name(),
+            'busy': index in self._busy,
+            'retiring': index in self._retiring,
+        }
+
+    async def restart_worker(self, index: int) -> asyncio.Task:
+        """Cancel the worker and start a new one with the same index.
+
+        :raise KeyError: if there is no such worker
+        :raise RuntimeError: if service is stopping
+        """
+        if index not in self.worker_tasks:
+            raise KeyError(index)
+        self._restarting.add(index)
+        try:
+            await self._cancel(index)
+        except BaseException:
+            self._restarting.discard(index)
+            if index not in self.worker_tasks:
+                heapq.heappush(self._free_indexes, index)
+            raise
+        self._restarting.discard(index)
+        if self.service.should_stop:
+            heapq.heappush(self._free_indexes, index)
+            raise RuntimeError("Service %s is stopping" % self.service.name)
+        self.service.log.info("Worker %i of task %s was restarted", index, self.name, task=self.name)
+        return self.start_worker(index)
+
+    async def cancel_worker(self, index: int):
+        """Cancel the worker and wait for it to exit.
+
+        Pool size is decreased by one unless worker is already retiring.
+        Pool of the autoscaled task can't be decreased below `min_workers`.
+
+        :raise KeyError: if there is no such worker
+        :raise ValueError: if autoscaled pool is at its lower bound
+        """
+        if index not in self.worker_tasks:
+            raise KeyError(index)
+        if self.autoscaling and index not in self._retiring and self.workers <= self.min_workers:
+            raise ValueError("Task %s has minimum number of workers %i" % (self.name, self.min_workers))
+        await self._cancel(index)
+
+    def drain(self) -> List[asyncio.Task]:
+        """Cancel idle workers and let busy ones exit after their current iteration.
+
+        :return: busy worker tasks
+        """
+        busy = []
+        for index, worker in list(self.worker_tasks.items()):
+            if index in self._busy:
+                self._retiring.add(index)
+                busy.append(worker)
+            else:
+                worker.cancel()
+        return busy
+
+    def _active(self, index: int) -> bool:
+        return not self.service.should_stop and index not in self._retiring
+
+    async def _call(self, index: int, *args):
+        """Invoke task method holding the limiter.
+
+        Worker waiting for the limiter is not busy.
+        """
+        if self.limiter is None:
+            await self._invoke(index, *args)
+            return
+        async with self.limiter:
+            await self._invoke(index, *args)
+
+    async def _invoke(self, index: int, *args):
+        """Invoke task method, account worker busy time, record metrics and trace span.
+        """
+        loop = self.service.loop
+        metrics = self.metrics
+        span = tracing.start_span('task', self.service.name, self.name, index) if tracing.subscribers else None
+        error = None
+        started = self._busy[index] = loop.time()
+        metrics.in_flight += 1
+        try:
+            if self._pool is None:
+                await self.callable(*args)
+            else:
+                await self._run_in_executor(*args)
+        except BaseException as e:
+            if isinstance(e, Exception):
+                metrics.errors += 1
+            error = e
+            raise
+        finally:
+            now = loop.time()
+            self._busy_time += now - self._busy.pop(index)
+            metrics.in_flight -= 1
+            metrics.iterations += 1
+            metrics.latency.record(now - started)
+            if span is not None:
+                tracing.end_span(span, error)
+
+    async def _run_in_executor(self, *args):
+        """Run regular task method in the executor pool.
+
+        Cancelled call is not interrupted, the pool keeps running it until completion.
+        """
+        self.executor_submitted += 1
+        try:
+            await self.service.loop.run_in_executor(self._pool, partial(self.callable, *args))
+        finally:
+            self.executor_completed += 1
+
+    async def shutdown(self):
+        """Shut down executor pool waiting for running calls to complete.
+
+        Event loop is not blocked while waiting.
+        """
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            await self.service.loop.run_in_executor(None, partial(pool.shutdown, wait=True))
+
+    def get_executor_stats(self) -> dict:
+        """Executor pool size and saturation.
+
+        `pending` calls are running or waiting for a free pool worker, `utilization`
+        is a ratio of pending calls to the pool size and exceeds 1 if pool is saturated.
+        """
+        if self.executor is None:
+            raise TypeError("Task %s is not run in executor" % self.name)
+        pending = self.executor_submitted - self.executor_completed
+        return {
+            'executor': self.executor,
+            'pool_size': self.executor_workers,
+            'submitted': self.executor_submitted,
+            'completed': self.executor_completed,
+            'pending': pending,
+            'running': min(pending, self.executor_workers),
+            'queued': max(pending - self.executor_workers, 0),
+            'utilization': pending / self.executor_workers,
+        }
+
+    @property
+    def degraded(self) -> bool:
+        """Task runs are failing or suspended by open circuit.
+        """
+        return self.consecutive_failures > 0 or self.circuit_state != 'closed'
+
+    async def _iteration(self, index: int, *args):
+        """Invoke task method applying failure policy.
+
+        Failed run is retried after backoff if `on_error` is `retry`.
+        """
+        if self.on_error == 'raise':
+            await self._call(index, *args)
+            return
+        while True:
+            probe = await self._wait_circuit()
+            try:
+                await self._call(index, *args)
+            except Exception as e:
+                delay = self._failed(e, probe)
+                if index in self._retiring:
+                    return
+                await self._sleep(delay)
+                continue
+            except BaseException:
+                if probe and self.circuit_state == 'half_open':
+                    self._open_circuit()
+                raise
+            self._succeeded()
+            return
+
+    async def _wait_circuit(self) -> bool:
+        """Wait until circuit is closed or it is time to probe.
+
+        :return: `True` if caller should make a probe run
+        """
+        loop = self.service.loop
+        while self.circuit_state != 'closed':
+            timeout = self.circuit_reset_timeout
+            if self.circuit_state == 'open':
+                timeout = self._opened_at + self.circuit_reset_timeout - loop.time()
+                if timeout <= 0:
+                    self.circuit_state = 'half_open'
+                    return True
+            try:
+                await asyncio.wait_for(self._circuit_closed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return False
+
+    def _open_circuit(self):
+        self.circuit_state = 'open'
+        self._opened_at = self.service.loop.time()
+        self._circuit_closed.clear()
+
+    def _failed(self, e: Exception, probe: bool) -> float:
+        """Account failed run.
+
+        :return: number of seconds to wait before retry
+        """
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = e
+        self.service.log.warning("Task %s failed %i times in a row: %r",
+                                 self.name, self.consecutive_failures, e, task=self.name)
+        if probe or (self.circuit_state == 'closed' and self.max_failures is not None
+                     and self.consecutive_failures >= self.max_failures):
+            self.service.log.error("Circuit of task %s is open for %s seconds",
+                                   self.name, self.circuit_reset_timeout, task=self.name)
+            self._open_circuit()
+        backoff = self.retry_backoff * 2 ** min(self.consecutive_failures - 1, 32)
+        return min(backoff, self.retry_backoff_max)
+
+    def _succeeded(self):
+        self.consecutive_failures = 0
+        if self.circuit_state != 'closed':
+            self.service.log.info("Circuit of task %s is closed", self.name, task=self.name)
+            self.circuit_state = 'closed'
+            self._circuit_closed.set()
+
+    async def _run_periodic(self, index: int):
+        loop = self.service.loop
+        interval = self.sleep_interval
+        fixed_rate = self.schedule == 'fixed_rate'
+        sleep = self._sleep
+        if self.stagger and self.periodic:
+            await sleep(interval * index / max(self.workers, 1))
+        next_run = loop.time()
+        while self._active(index):
+            await self._iteration(index)
+            if self.periodic is False or index in self._retiring:
+                break
+            delay = interval
+            if fixed_rate:
+                next_run += interval
+                now = loop.time()
+                if next_run < now:
+                    missed = int((now - next_run) // interval) if interval else 0
+                    self.missed_ticks += missed
+                    next_run += missed * interval
+                delay = next_run - now
+            if self.jitter:
+                delay += random.uniform(0, self.jitter)
+            await sleep(delay)
 
-    async def run(self):
-        """Run task.
+    def _take(self, entry):
+        """Account queue entry and return its item.
         """
+        enqueued_at, item = entry
+        wait_time = self.service.loop.time() - enqueued_at
+        stats = self.queue_stats
+        stats.dequeued += 1
+        stats.wait_time += wait_time
+        if wait_time > stats.max_wait_time:
+            stats.max_wait_time = wait_time
+        return item
+
+    async def _consume(self, index: int):
+        """Pass queue items to the task method one by one.
+        """
+        queue = self.queue
+        assert queue is not None
+        while self._active(index):
+            item = self._take(await queue.get())
+            try:
+                await self._iteration(index, item)
+            finally:
+                queue.task_done()
+
+    async def _consume_batches(self, index: int):
+        """Pass queue items to the task method in batches.
+
+        Batch is registered in `_batches` while it is collected and passed to
+        the task method, so it is flushed if worker is cancelled.
+        """
+        loop = self.service.loop
+        queue, batch_size = self.queue, self.batch_size
+        assert queue is not None and batch_size is not None
+        while self._active(index):
+            batch: list = []
+            self._batches[index] = batch
+            batch.append(self._take(await queue.get()))
+            deadline = loop.time() + self.max_batch_latency
+            while len(batch) < batch_size:
+                if not queue.empty():
+                    batch.append(self._take(queue.get_nowait()))
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._take(await asyncio.wait_for(queue.get(), timeout)))
+                except asyncio.TimeoutError:
+                    break
+            await self._process_batch(batch, index)
+
+    async def _process_batch(self, batch: list, index: int = -1):
+        """Pass batch to the task method.
+
+        Failure policy is applied to batches of running workers and batches resent
+        after worker cancellation, not to batches passed on flush. Batch interrupted
+        by cancellation stays in `_batches` to be passed again by :py:meth:`flush`,
+        so its items may be delivered twice.
+        """
+        assert self.queue is not None
+        call = self._iteration if index != -1 else self._call
+        self._batches[index] = batch
+        try:
+            await call(index, batch)
+        except asyncio.CancelledError:
+            raise
+        except BaseException:
+            self._batch_done(index)
+            raise
+        self._batch_done(index)
+
+    def _batch_done(self, index: int):
+        assert self.queue is not None
+        for _ in self._batches.pop(index):
+            self.queue.task_done()
+
+    async def flush(self):
+        """Pass partial batches and items left in the queue to the task method.
+
+        Invoked on service stop after task workers were cancelled.
+        """
+        if self.batch_size is None:
+            return
+        items = [item for batch in self._batches.values() for item in batch]
+        self._batches.clear()
+        while not self.queue.empty():
+            items.append(self._take(self.queue.get_nowait()))
+        for i in range(0, len(items), self.batch_size):
+            await self._process_batch(items[i:i + self.batch_size])
+
+    async def autoscale(self):
+        """Scale worker pool between `min_workers` and `max_workers`.
+
+        Pool is scaled up by one worker if queue contains more items than there are
+        workers or workers are busy for more than `scale_up_busy_ratio` part of time.
+        Pool is scaled down by one worker if queue is empty and workers are busy
+        for less than `scale_down_busy_ratio` part of time. Pool size is changed
+        at most once per `scale_cooldown` seconds.
+        """
+        loop = self.service.loop
+        last_time = loop.time()
+        last_busy_time = 0.
+        last_scaled = -self.scale_cooldown
         while not self.service.should_stop:
-            await self.callable()
-            if self.periodic is False:
+            await asyncio.sleep(self.scale_interval)
+            now = loop.time()
+            # account running iterations up to now
+            for index, started in self._busy.items():
+                self._busy_time += now - started
+                self._busy[index] = now
+            busy_ratio = (self._busy_time - last_busy_time) / ((now - last_time) * max(self.workers, 1))
+            last_time, last_busy_time = now, self._busy_time
+            if now - last_scaled < self.scale_cooldown:
+                continue
+            depth = self.queue.qsize() if self.queue is not None else 0
+            if self.workers < self.max_workers and (depth > self.workers
+                                                    or busy_ratio > self.scale_up_busy_ratio):
+                self._scale(self.workers + 1, "queue depth %i, busy ratio %.2f" % (depth, busy_ratio))
+                last_scaled = now
+            elif self.workers > self.min_workers and depth == 0 and busy_ratio < self.scale_down_busy_ratio:
+                self._scale(self.workers - 1, "busy ratio %.2f" % busy_ratio)
+                last_scaled = now
+
+    def _scale(self, workers: int, reason: str):
+        """Change number of workers.
+
+        Idle workers are cancelled on scale down, busy ones finish current iteration first.
+        Both are marked as retiring until they exit.
+        """
+        event = ScalingEvent(self.service.loop.time(), self.workers, workers, reason)
+        self.service.log.info("Scale %s task from %i to %i workers: %s",
+                              self.name, self.workers, workers, reason, task=self.name)
+        self.scaling_events.append(event)
+        while self.workers < workers:
+            self.start_worker()
+            self.workers += 1
+        while self.workers > workers:
+            running = [i for i in self.worker_tasks if i not in self._retiring]
+            if not running:
                 break
-            await asyncio.sleep(self.sleep_interval)
+            index = max(running)
+            self._retiring.add(index)
+            if index not in self._busy:
+                self.worker_tasks[index].cancel()
+            self.workers -= 1
+
+    def get_scaling_stats(self) -> dict:
+        """Current pool size, its bounds and number of scaling decisions.
+        """
+        return {
+            'workers': self.workers,
+            'busy_workers': len(self._busy),
+            'min_workers': self.min_workers,
+            'max_workers': self.max_workers,
+            'scale_ups': sum(1 for e in self.scaling_events if e.workers_after > e.workers_before),
+            'scale_downs': sum(1 for e in self.scaling_events if e.workers_after < e.workers_before),
+        }
+
+    async def submit(self, item):
+        """Put item into the task queue.
+
+        Wait for a free slot if queue is full.
+        """
+        if self.queue is None or self.queue_stats is None:
+            raise TypeError("Task %s is not a queue consumer" % self.name)
+        await self.queue.put((self.service.loop.time(), item))
+        self.queue_stats.enqueued += 1
+
+    def get_queue_stats(self) -> dict:
+        """Queue depth, enqueue/dequeue rates (items per second) and wait times in seconds.
+        """
+        if self.queue is None or self.queue_stats is None:
+            raise TypeError("Task %s is not a queue consumer" % self.name)
+        stats = self.queue_stats
+        uptime = max(self.service.loop.time() - stats.started_at, 1e-9)
+        return {
+            'depth': self.queue.qsize(),
+            'maxsize': self.queue.maxsize,
+            'enqueued': stats.enqueued,
+            'dequeued': stats.dequeued,
+            'enqueue_rate': stats.enqueued / uptime,
+            'dequeue_rate': stats.dequeued / uptime,
+            'avg_wait_time': stats.wait_time / stats.dequeued if stats.dequeued else 0.,
+            'max_wait_time': stats.max_wait_time,
+        }
 
 
 class TasksCollection:
-    tasks: List[asyncio.Task]
+    """Collection of running service tasks.
 
-    def __init__(self):
-        self.tasks = []
+    Tasks are indexed by service task name and worker index. Tasks report their
+    completion with done callbacks. Finished tasks are removed from collection
+    and the first unexpected exception is stored in `failure`.
+    """
+    #: running tasks by `(name, index)`, index is `None` for auxiliary tasks like autoscaler
+    tasks: Dict[Tuple[str, Optional[int]], asyncio.Task]
+    #: first unexpected exception raised by a task
+    failure: Optional[BaseException] = None
+
+    def __init__(self, on_failure: Optional[Callable[[asyncio.Task, BaseException], None]] = None):
+        self.tasks = {}
+        self.on_failure = on_failure
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+    def add(self, task: asyncio.Task, name: Optional[str] = None, index: Optional[int] = None):
+        """Add task to collection.
+
+        Task is indexed by its asyncio name if `name` is not provided.
+
+        :raise ValueError: if there is a running task with the same name and index
+        """
+        key = (name or task.get_name(), index)
+        if key in self.tasks:
+            raise ValueError("Task %s with index %s is already running" % key)
+        self.tasks[key] = task
+        task.add_done_callback(partial(self._task_done, key))
+
+    def get(self, name: str, index: Optional[int] = None) -> asyncio.Task:
+        """Running task by name and index.
+
+        :raise KeyError: if there is no such task
+        """
+        return self.tasks[name, index]
+
+    def discard(self, task: asyncio.Task, name: str, index: Optional[int] = None):
+        """Remove task from index before it is finished.
 
-    def add(self, task: asyncio.Task):
-        """Add task with definition to collection.
+        Task is still reported by its done callback.
         """
-        self.tasks.append(task)
+        if self.tasks.get((name, index)) is task:
+            del self.tasks[name, index]
+
+    def _task_done(self, key: Tuple[str, Optional[int]], task: asyncio.Task):
+        """Remove finished task from collection and store its failure.
+        """
+        if self.tasks.get(key) is task:
+            del self.tasks[key]
+        debug_sampled(log, "Remove finished task %s from collection", task.get_name())
+        if task.cancelled():
+            return
+        e = task.exception()
+        if e is None:
+            return
+        if self.failure is None:
+            self.failure = e
+        if self.on_failure is not None:
+            self.on_failure(task, e)
 
     def check_all(self):
         """Check tasks health.
 
-        Remove finished tasks from collection.
-
-        Raise exception if some task failed and `allow_fail` is set to `False` for it.
+        Raise exception if some task failed.
         """
-        for task in self.tasks:
-            if task.done():
-                log.debug("Task %s is done", task)
-                try:
-                    e = task.exception()
-                    if e:
-                        raise e
-                except asyncio.CancelledError:  # pragma: nocover
-                    log.debug("Task %s was cancelled", task)
-                except Exception as e:  # noqa
-                    raise UnexpectedTaskException() from e
-                self.tasks.remove(task)
-                log.debug("Remove finished task %s from collection", task)
+        if self.failure is not None:
+            raise UnexpectedTaskException() from self.failure
 
     async def stop_all(self, raise_exceptions=False):
         """Stop all tasks in collection.
@@ -85,34 +842,41 @@ class TasksCollection:
         Cancel all tasks. Will raise exceptions if `raise_exceptions` is `True`
         or log exception instead.
         """
-        task_list = []
-        for task in self.tasks:
+        task_list = list(self.tasks.values())
+        for task in task_list:
             task.cancel()
-            task_list.append(task)
         results = await asyncio.gather(*task_list, return_exceptions=not raise_exceptions)
         # log exceptions if not raised
         if not raise_exceptions:
-            for i, r in enumerate(results):
-                if isinstance(r, Exception):
-                    task = self.tasks[i]
-                    try:
-                        raise r
-                    except asyncio.CancelledError:  # pragma: nocover
-                        log.debug("Task %s was cancelled", task)
-                    except Exception:  # noqa
-                        log.exception("Task %s stopped with exception",
-                                      task.get_name())
-        log.debug("Cancelled %i service tasks", len(self.tasks))
+            for task, r in zip(task_list, results):
+                if isinstance(r, asyncio.CancelledError):
+                    debug_sampled(log, "Task %s was cancelled", task.get_name())
+                elif isinstance(r, Exception):
+                    log.error("Task %s stopped with exception", task.get_name(), exc_info=r)
+        debug_sampled(log, "Cancelled %i service tasks", len(task_list))
 
 
 class TasksMixin(AbstractService, abc.ABC):
     """Tasks mixin for BaseService.
     """
     _tasks: TasksCollection
+    #: limiters shared by name with the tasks of the service and its nested services
+    limiters: Dict[str, Limiter]
+    #: `(name, definition)` pairs of service tasks defined on the class
+    _task_definitions: Tuple[Tuple[str, dict], ...] = ()
 
     def __init__(self):
         super().__init__()
-        self._tasks = TasksCollection()
+        self._tasks = TasksCollection(on_failure=self._on_task_failure)
+        self._service_tasks: Dict[str, ServiceTask] = {}
+        self.limiters = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._task_definitions = tuple(
+            (name, member.service_task_definition)
+            for name, member in marked_members(cls, 'service_task')
+        )
 
     async def healthcheck(self):
         await super().healthcheck()
@@ -120,23 +884,129 @@ class TasksMixin(AbstractService, abc.ABC):
             self._tasks.check_all()
         except UnexpectedTaskException as e:
             self.log.exception("Service tasks healthcheck failed with exception")
-            raise UnhealthyException from e
+            raise UnhealthyException("Service task failed: %r" % e.__cause__) from e
+
+    def degraded_tasks(self) -> List[ServiceTask]:
+        """Service tasks with failing runs or open circuit.
+        """
+        return [service_task for service_task in self._service_tasks.values()
+                if service_task.degraded]
+
+    def get_executor_stats(self) -> Dict[str, dict]:
+        """Executor pool stats of the service tasks run in executor by task name.
+        """
+        return {name: service_task.get_executor_stats()
+                for name, service_task in self._service_tasks.items()
+                if service_task.executor is not None}
+
+    def get_limiter_stats(self) -> Dict[str, dict]:
+        """Limiter stats of the rate or concurrency limited service tasks by task name.
+
+        Shared limiter stats include calls of all the tasks using it.
+        """
+        return {name: service_task.limiter.get_stats()
+                for name, service_task in self._service_tasks.items()
+                if service_task.limiter is not None}
+
+    def get_task_metrics(self) -> TaskMetrics:
+        """Metrics of all the service tasks merged together.
+        """
+        metrics = TaskMetrics()
+        for service_task in self._service_tasks.values():
+            metrics.merge(service_task.metrics)
+        return metrics
+
+    def get_task(self, name: str) -> ServiceTask:
+        """Get service task by name.
+
+        Service tasks are available after service start.
+
+        :raise KeyError: if there is no such task
+        """
+        return self._service_tasks[name]
+
+    def list_workers(self, name: Optional[str] = None) -> List[dict]:
+        """State of running workers of the service task or all service tasks.
+
+        See :py:meth:`ServiceTask.get_worker_info`.
+
+        :raise KeyError: if there is no such task
+        """
+        service_tasks = [self.get_task(name)] if name is not None else self._service_tasks.values()
+        return [service_task.get_worker_info(index)
+                for service_task in service_tasks
+                for index in sorted(service_task.worker_tasks)]
+
+    async def restart_worker(self, name: str, index: int) -> asyncio.Task:
+        """Cancel service task worker and start a new one with the same index.
+
+        :raise KeyError: if there is no such task or worker
+        """
+        return await self.get_task(name).restart_worker(index)
+
+    async def cancel_worker(self, name: str, index: int):
+        """Cancel service task worker, see :py:meth:`ServiceTask.cancel_worker`.
+
+        :raise KeyError: if there is no such task or worker
+        """
+        await self.get_task(name).cancel_worker(index)
+
+    async def submit(self, task_name: str, item):
+        """Submit item to the queue consumer task.
+
+        Wait for a free queue slot if queue is full.
+
+        :raise RuntimeError: if service is not running
+        """
+        if not self.running:
+            raise RuntimeError("Service %s is not running" % self.name)
+        await self.get_task(task_name).submit(item)
+
+    def _on_task_failure(self, task: asyncio.Task, e: BaseException):
+        """Service task failed with unexpected exception.
+
+        Service became unhealthy, monitoring is notified to stop it immediately.
+        """
+        if self.should_stop:
+            return
+        self.log.error("Service task %s failed", task.get_name(), exc_info=e)
+        self._health_changed()
 
     async def _start_service_tasks(self):
         """Start tasks defined on the service.
+
+        Tasks collection is recreated, so stopped service can be started again.
         """
-        members = inspect.getmembers(self, predicate=inspect.isroutine)
-        for name, method in members:
-            if hasattr(method, "service_task"):
-                self.log.debug("Service task %s found", method)
-                service_task = ServiceTask(self, method, **method.service_task_definition)
-                for i in range(service_task.workers):
-                    task_name = ".".join([self.name, method.__name__, str(i)])
-                    log.debug("Create task %s", task_name)
-                    task = self.loop.create_task(service_task.run(), name=task_name)
-                    self._tasks.add(task)
-
-    async def _stop_service_tasks(self):
+        self._tasks = TasksCollection(on_failure=self._on_task_failure)
+        for name, definition in self._task_definitions:
+            method = getattr(self, name)
+            self.log.debug_sampled("Service task %s found", name)
+            service_task = ServiceTask(self, method, name=name, **definition)
+            self._service_tasks[name] = service_task
+            service_task.start()
+
+    async def _stop_service_tasks(self, drain_timeout: Optional[float] = None):
         """Cancel and await all managed service tasks.
+
+        If `drain_timeout` is provided, workers running an iteration are given up to
+        `drain_timeout` seconds to finish it before being cancelled.
+        Flush batches of batching tasks and shut down executor pools after that.
         """
+        if drain_timeout:
+            busy = [worker for service_task in self._service_tasks.values() for worker in service_task.drain()]
+            if busy:
+                self.log.debug("Draining %i busy workers", len(busy))
+                done, pending = await asyncio.wait(busy, timeout=drain_timeout)
+                for worker in done:
+                    if not worker.cancelled() and worker.exception() is not None:
+                        self.log.error("Task %s stopped with exception", worker.get_name(),
+                                       exc_info=worker.exception())
+                if pending:
+                    self.log.warning("%i workers were not drained in %s seconds", len(pending), drain_timeout)
         await self._tasks.stop_all()
+        for service_task in self._service_tasks.values():
+            try:
+                await service_task.flush()
+            except Exception:  # noqa
+                self.log.exception("Failed to flush %s task", service_task.name, task=service_task.name)
+            await service_task.shutdown()
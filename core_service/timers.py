@@ -0,0 +1,91 @@
+"""Shared timers.
+
+Periodic service tasks of a service tree can sleep on a single hashed timer
+wheel instead of scheduling own event loop timer for each sleep.
+"""
+import asyncio
+import math
+from typing import List, Optional
+
+
+class TimerWheel:
+    """Hashed timer wheel.
+
+    Sleeping coroutines are put into one of `slots` buckets by their wake up tick.
+    Single driver task wakes up every `resolution` seconds and resolves due sleeps
+    of the current bucket. Sleeps longer than a full wheel turn stay in the bucket
+    for required number of turns.
+
+    Sleep durations are rounded to the `resolution`. Driver task is running
+    only while there are sleeping coroutines.
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop, resolution: float = .01, slots: int = 512):
+        if resolution <= 0:
+            raise ValueError("Timer resolution should be gt 0")
+        if slots < 1:
+            raise ValueError("Number of timer slots should be gte 1")
+        self.loop = loop
+        self.resolution = resolution
+        self._slots: List[list] = [[] for _ in range(slots)]
+        self._tick = 0
+        self._origin = 0.
+        self._pending = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        """Number of sleeping coroutines.
+        """
+        return self._pending
+
+    async def sleep(self, delay: float):
+        """Sleep for `delay` seconds with `resolution` accuracy.
+        """
+        ticks = max(1, math.ceil(delay / self.resolution))
+        slots = len(self._slots)
+        future = self.loop.create_future()
+        self._slots[(self._tick + ticks) % slots].append([(ticks - 1) // slots, future])
+        self._pending += 1
+        if self._task is None:
+            self._origin = self.loop.time() - self._tick * self.resolution
+            self._task = self.loop.create_task(self._run(), name="timer_wheel")
+        try:
+            await future
+        finally:
+            self._pending -= 1
+
+    async def close(self):
+        """Stop driver task. Sleeping coroutines are cancelled.
+        """
+        for slot in self._slots:
+            for _, future in slot:
+                future.cancel()
+            slot.clear()
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _run(self):
+        slots = len(self._slots)
+        try:
+            while self._pending:
+                tick = self._tick + 1
+                await asyncio.sleep(self._origin + tick * self.resolution - self.loop.time())
+                self._tick = tick
+                slot = self._slots[tick % slots]
+                if not slot:
+                    continue
+                waiting = []
+                for entry in slot:
+                    rounds, future = entry
+                    if future.done():
+                        continue
+                    if rounds:
+                        entry[0] = rounds - 1
+                        waiting.append(entry)
+                    else:
+                        future.set_result(None)
+                self._slots[tick % slots] = waiting
+        finally:
+            self._task = None
@@ -0,0 +1,220 @@
+"""Lifecycle tracing.
+
+Service `start`, `stop`, `healthcheck` calls and service task iterations are reported
+as spans to subscribed :py:class:`Subscriber` instances. Spans of a nested service
+lifecycle are children of the parent service spans.
+
+Instrumented calls check a single list if there are no subscribers, so tracing
+is almost free until the first subscriber is added.
+
+.. code-block:: python
+
+    with JsonFileExporter('trace.jsonl'):
+        await app.start()
+        await app.stop()
+"""
+import functools
+import itertools
+import json
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Deque, Dict, List, Optional, Tuple
+
+#: subscribed span subscribers
+subscribers: List['Subscriber'] = []
+
+_span_ids = itertools.count(1)
+_current_span: ContextVar[Optional['Span']] = ContextVar('current_span', default=None)
+
+
+class Span:
+    """Timed service lifecycle call or task iteration.
+    """
+    __slots__ = ('name', 'service', 'task', 'worker', 'span_id', 'parent_id',
+                 'started_at', 'duration', 'error', '_started', '_owner')
+
+    def __init__(self, name: str, service: str, task: Optional[str] = None, worker: Optional[int] = None,
+                 parent: Optional['Span'] = None, owner: Optional[int] = None):
+        #: `start`, `stop`, `healthcheck` or `task`
+        self.name = name
+        self.service = service
+        self.task = task
+        #: index of the task worker
+        self.worker = worker
+        self.span_id = next(_span_ids)
+        self.parent_id = parent.span_id if parent is not None else None
+        #: wall clock time of the span start
+        self.started_at = time.time()
+        #: span duration in seconds, `None` until span is finished
+        self.duration: Optional[float] = None
+        #: representation of the exception finished the span
+        self.error: Optional[str] = None
+        self._started = time.perf_counter()
+        self._owner = owner
+
+    def finish(self, error: Optional[BaseException] = None):
+        self.duration = time.perf_counter() - self._started
+        if error is not None:
+            self.error = repr(error)
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'service': self.service,
+            'task': self.task,
+            'worker': self.worker,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'started_at': self.started_at,
+            'duration': self.duration,
+            'error': self.error,
+        }
+
+    def __repr__(self):
+        return '<Span %s %s%s %s>' % (self.name, self.service, ':%s' % self.task if self.task else '',
+                                      self.duration)
+
+
+class Subscriber:
+    """Span subscriber.
+
+    Override :py:meth:`on_start` and :py:meth:`on_end` to receive spans.
+    Subscriber is subscribed for the duration of the `with` block.
+    Callbacks are invoked on the event loop and should not block.
+    """
+    def on_start(self, span: Span):
+        pass
+
+    def on_end(self, span: Span):
+        pass
+
+    def __enter__(self):
+        subscribe(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        unsubscribe(self)
+
+
+def subscribe(subscriber: Subscriber):
+    """Start passing spans to the subscriber.
+    """
+    subscribers.append(subscriber)
+
+
+def unsubscribe(subscriber: Subscriber):
+    """Stop passing spans to the subscriber.
+    """
+    subscribers.remove(subscriber)
+
+
+def start_span(name: str, service: str, task: Optional[str] = None, worker: Optional[int] = None,
+               owner: Optional[int] = None) -> Span:
+    """Create span as a child of the current one and report its start.
+
+    Caller should check there are `subscribers` first.
+    """
+    span = Span(name, service, task, worker, _current_span.get(), owner)
+    for subscriber in subscribers:
+        subscriber.on_start(span)
+    return span
+
+
+def end_span(span: Span, error: Optional[BaseException] = None):
+    """Finish span and report its end.
+    """
+    span.finish(error)
+    for subscriber in subscribers:
+        subscriber.on_end(span)
+
+
+def reset_current_span():
+    """Detach current asyncio task from the span it was created in.
+    """
+    _current_span.set(None)
+
+
+def traced(name: str):
+    """Decorator reporting service coroutine method calls as `name` spans.
+
+    Call of the method overridden in subclass and decorated there too is reported once.
+    """
+    def decorator(f):
+        @functools.wraps(f)
+        async def wrapper(self, *args, **kwargs):
+            if not subscribers:
+                return await f(self, *args, **kwargs)
+            current = _current_span.get()
+            if current is not None and current._owner == id(self) and current.name == name:
+                # super implementation call
+                return await f(self, *args, **kwargs)
+            span = start_span(name, self.name, owner=id(self))
+            token = _current_span.set(span)
+            try:
+                result = await f(self, *args, **kwargs)
+            except BaseException as e:
+                end_span(span, e)
+                raise
+            finally:
+                _current_span.reset(token)
+            end_span(span)
+            return result
+
+        wrapper.traced = True
+        return wrapper
+
+    return decorator
+
+
+class MemoryExporter(Subscriber):
+    """Keep up to `maxlen` finished spans in memory.
+    """
+    def __init__(self, maxlen: Optional[int] = None):
+        self.spans: Deque[Span] = deque(maxlen=maxlen)
+
+    def on_end(self, span: Span):
+        self.spans.append(span)
+
+    def clear(self):
+        self.spans.clear()
+
+    def summary(self) -> List[dict]:
+        """Number of spans, total and maximum duration grouped by name, service and task.
+
+        Groups are sorted by total duration, the longest first.
+        """
+        groups: Dict[Tuple, dict] = {}
+        for span in self.spans:
+            key = span.name, span.service, span.task
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = {'name': span.name, 'service': span.service, 'task': span.task,
+                                       'count': 0, 'errors': 0, 'total': 0., 'max': 0.}
+            group['count'] += 1
+            group['errors'] += span.error is not None
+            group['total'] += span.duration
+            group['max'] = max(group['max'], span.duration)
+        return sorted(groups.values(), key=lambda group: group['total'], reverse=True)
+
+
+class JsonFileExporter(Subscriber):
+    """Write finished spans to a file as JSON lines.
+
+    Writes are buffered, file is flushed and closed on :py:meth:`close` or at the end
+    of the `with` block.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'a')
+
+    def on_end(self, span: Span):
+        self._file.write(json.dumps(span.to_dict()))
+        self._file.write('\n')
+
+    def close(self):
+        self._file.close()
+
+    def __exit__(self, exc_type, exc, tb):
+        super().__exit__(exc_type, exc, tb)
+        self.close()
@@ -7,7 +7,7 @@ setup(
     author='Sarafan Community',
     author_email='flu2020@pm.me',
     description='asyncio service microframework',
-    packages=find_packages(),
+    packages=find_packages(exclude=('tests', 'tests.*', 'benchmarks', 'benchmarks.*')),
     install_requires=[
     ],
     extras_require={
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+from core_service import Service, task
+
+
+class ScalingService(Service):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.consumed = 0
+
+    @task(queue=0, min_workers=1, max_workers=3, scale_interval=0.01, scale_cooldown=0)
+    async def consume(self, item):
+        await asyncio.sleep(0.02)
+        self.consumed += 1
+
+    @task(min_workers=2, max_workers=4, sleep_interval=0.01, scale_interval=0.01, scale_cooldown=0)
+    async def idle(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_scale_up_on_queue_depth():
+    service = ScalingService()
+    await service.start()
+    consume = service.get_task('consume')
+    assert consume.workers == 1
+    for i in range(30):
+        await service.submit('consume', i)
+    await asyncio.sleep(0.1)
+    assert consume.workers == 3
+    assert len(consume.worker_tasks) == 3
+    assert consume.get_scaling_stats()['scale_ups'] == 2
+    assert consume.scaling_events[0].workers_before == 1
+    assert consume.scaling_events[0].workers_after == 2
+
+    await consume.queue.join()
+    await asyncio.sleep(0.1)
+    # idle workers are removed down to the lower bound
+    assert consume.workers == 1
+    assert len(consume.worker_tasks) == 1
+    assert consume.get_scaling_stats()['scale_downs'] == 2
+    assert service.consumed == 30
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_scale_down_bounds():
+    service = ScalingService()
+    await service.start()
+    idle = service.get_task('idle')
+    assert idle.workers == 2
+    await asyncio.sleep(0.05)
+    assert idle.workers == 2
+    assert not idle.scaling_events
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_busy_worker_retired_after_iteration():
+    class BusyService(Service):
+        @task(min_workers=1, max_workers=2, scale_interval=10)
+        async def busy(self):
+            await asyncio.sleep(0.02)
+
+    service = BusyService()
+    await service.start()
+    busy = service.get_task('busy')
+    busy._scale(2, "test")
+    await asyncio.sleep(0.01)
+    busy._scale(1, "test")
+    assert 1 in busy._retiring
+    assert not busy.worker_tasks[1].done()
+    await asyncio.sleep(0.03)
+    assert list(busy.worker_tasks) == [0]
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_finished_workers_leave_pool():
+    class OnceService(Service):
+        @task(periodic=False, workers=2, min_workers=1, max_workers=3, scale_interval=0.02, scale_cooldown=0)
+        async def once(self):
+            await asyncio.sleep(0.01)
+
+    service = OnceService()
+    await service.start()
+    once = service.get_task('once')
+    await asyncio.sleep(0.1)
+    assert once.workers == 0
+    assert not once.worker_tasks
+    assert service.running
+    await service.healthcheck()
+    once._scale(0, "test")
+    await service.stop()
+
+
+class BatchScalingService(Service):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.batches = []
+
+    @task(queue=0, batch_size=10, max_batch_latency=10, min_workers=1, max_workers=2, workers=2, scale_interval=10)
+    async def store(self, items):
+        self.batches.append(items)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_batch_worker_resends_batch():
+    service = BatchScalingService()
+    await service.start()
+    store = service.get_task('store')
+    for i in range(4):
+        await service.submit('store', i)
+        # let both workers take items
+        await asyncio.sleep(0.005)
+    collected = list(store._batches[1])
+    assert collected
+    # idle worker collecting a partial batch is cancelled
+    store._scale(1, "test")
+    await asyncio.sleep(0.01)
+    assert collected in service.batches
+    assert 1 not in store._batches
+    await service.stop()
+    assert sorted(item for batch in service.batches for item in batch) == list(range(4))
@@ -0,0 +1,55 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks import lifecycle, runner
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('registered', runner.CASES, ids=lambda registered: registered.name)
+async def test_benchmark_cases_quick(registered):
+    for params in registered.quick_params:
+        result = await registered.func(**params)
+        assert result is None or isinstance(result, dict)
+
+
+@pytest.mark.asyncio
+async def test_deep_tree_start_stop():
+    """Deep service tree is started without hitting recursion limit."""
+    await lifecycle.tree_start_stop_deep(depth=1000)
+
+
+def test_metrics_overhead():
+    output = subprocess.run([sys.executable, '-m', 'benchmarks.metrics', '--iterations', '100', '--repeat', '1'],
+                            capture_output=True, timeout=30, check=True).stdout
+    result = json.loads(output)
+    assert result['iterations'] == 100
+    assert 'overhead_us_per_iteration' in result
+    assert 'record_us_per_iteration' in result
+
+
+def test_run_case():
+    calls = []
+
+    def sync_case(n):
+        calls.append(n)
+        return {'value': n * len(calls)}
+
+    result = runner.run_case(sync_case, {'n': 2}, rounds=3)
+    assert calls == [2, 2, 2]
+    assert result['rounds'] == 3
+    assert result['min'] <= result['median'] <= result['max']
+    assert result['metrics'] == {'value': 4}
+
+
+def test_compare_results():
+    baseline = {'results': [{'name': 'case', 'params': {'n': 1}, 'median': 2.}]}
+    current = {'results': [
+        {'name': 'case', 'params': {'n': 1}, 'median': 1.},
+        {'name': 'case', 'params': {'n': 2}, 'median': 1.},
+    ]}
+    assert runner.compare(baseline, current) == [
+        {'name': 'case', 'params': {'n': 1}, 'baseline': 2., 'current': 1., 'ratio': .5},
+    ]
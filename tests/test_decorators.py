@@ -1,6 +1,7 @@
 import pytest
 
-from core_service import task
+from core_service import Service, requirements, task
+from core_service.decorators import marked_members
 
 
 def test_wrong_task_arguments():
@@ -8,3 +9,86 @@ def test_wrong_task_arguments():
         task(sleep_interval=-1)
     with pytest.raises(ValueError):
         task(workers=0)
+    with pytest.raises(ValueError):
+        task(queue=-1)
+    with pytest.raises(ValueError):
+        task(batch_size=0)
+    with pytest.raises(ValueError):
+        task(batch_size=1, max_batch_latency=-1)
+    with pytest.raises(ValueError):
+        task(schedule='cron')
+    with pytest.raises(ValueError):
+        task(jitter=-1)
+    with pytest.raises(ValueError):
+        task(min_workers=0)
+    with pytest.raises(ValueError):
+        task(min_workers=3, max_workers=2)
+    with pytest.raises(ValueError):
+        task(workers=3, max_workers=2)
+    with pytest.raises(ValueError):
+        task(max_workers=2, scale_interval=0)
+    with pytest.raises(ValueError):
+        task(max_workers=2, scale_cooldown=-1)
+    with pytest.raises(ValueError):
+        task(on_error='ignore')
+    with pytest.raises(ValueError):
+        task(on_error='retry', retry_backoff=-1)
+    with pytest.raises(ValueError):
+        task(on_error='retry', retry_backoff=2, retry_backoff_max=1)
+    with pytest.raises(ValueError):
+        task(on_error='retry', max_failures=0)
+    with pytest.raises(ValueError):
+        task(on_error='retry', circuit_reset_timeout=-1)
+    with pytest.raises(ValueError):
+        task(rate=0)
+    with pytest.raises(ValueError):
+        task(max_concurrency=2, burst=2)
+    with pytest.raises(ValueError):
+        task(max_concurrency=0)
+
+
+def test_definitions_collected_per_class():
+    class BaseTaskService(Service):
+        @task()
+        async def first_task(self):
+            pass
+
+        @task(workers=2)
+        async def second_task(self):
+            pass
+
+        @requirements()
+        async def base_requirements(self):
+            return []
+
+    class ChildTaskService(BaseTaskService):
+        async def first_task(self):
+            pass
+
+        @task(workers=3)
+        async def second_task(self):
+            pass
+
+        @requirements('base_requirements')
+        async def child_requirements(self):
+            return []
+
+    assert [name for name, _ in BaseTaskService._task_definitions] == ['first_task', 'second_task']
+    assert [name for name, _ in ChildTaskService._task_definitions] == ['second_task']
+    assert ChildTaskService._task_definitions[0][1]['workers'] == 3
+    assert ChildTaskService._requirements_definitions == (
+        ('base_requirements', ()),
+        ('child_requirements', ('base_requirements',)),
+    )
+
+
+def test_marked_static_members():
+    class StaticService:
+        @staticmethod
+        @task()
+        def static_task():
+            pass
+
+    assert marked_members(StaticService, 'service_task') == [
+        ('static_task', StaticService.static_task),
+    ]
@@ -0,0 +1,112 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from core_service import Service, task
+
+
+class ThreadService(Service):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.threads = set()
+        self.results = []
+
+    @task(queue=10, workers=2, executor='thread')
+    def blocking(self, item):
+        self.threads.add(threading.current_thread().name)
+        time.sleep(0.05)
+        self.results.append(item)
+
+
+class ProcessService(Service):
+    @staticmethod
+    @task(executor='process', periodic=False)
+    def compute():
+        return os.getpid()
+
+
+@pytest.mark.asyncio
+async def test_thread_executor_task():
+    service = ThreadService()
+    await service.start()
+    ticks = 0
+    for i in range(4):
+        await service.submit('blocking', i)
+    # event loop is not blocked while task is running
+    while len(service.results) < 2:
+        await asyncio.sleep(0.01)
+        ticks += 1
+    assert ticks > 2
+    stats = service.get_executor_stats()['blocking']
+    assert stats['executor'] == 'thread'
+    assert stats['pool_size'] == 2
+    assert stats['submitted'] >= 2
+    assert stats['running'] <= 2
+    assert 0 <= stats['utilization'] <= 1
+    await service.stop()
+    assert all(name.startswith('ThreadService.blocking') for name in service.threads)
+    assert service.get_task('blocking')._pool is None
+
+
+@pytest.mark.asyncio
+async def test_executor_saturation_stats():
+    service = ThreadService()
+    await service.start()
+    blocking = service.get_task('blocking')
+    blocking.executor_submitted += 3
+    stats = blocking.get_executor_stats()
+    assert stats['queued'] == stats['pending'] - 2
+    assert stats['utilization'] > 1
+    blocking.executor_submitted -= 3
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_thread_executor_stop_waits_running_call():
+    service = ThreadService()
+    await service.start()
+    await service.submit('blocking', 'item')
+    await asyncio.sleep(0.01)
+    await service.stop()
+    assert service.results == ['item']
+
+
+@pytest.mark.asyncio
+async def test_process_executor_task():
+    service = ProcessService()
+    await service.start()
+    compute = service.get_task('compute')
+    while compute.executor_completed < 1:
+        await asyncio.sleep(0.01)
+    assert service.get_executor_stats() == {'compute': {
+        'executor': 'process', 'pool_size': 1, 'submitted': 1, 'completed': 1,
+        'pending': 0, 'running': 0, 'queued': 0, 'utilization': 0.,
+    }}
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_process_executor_bound_method():
+    class BoundMethodService(Service):
+        @task(executor='process')
+        def compute(self):
+            pass
+
+    service = BoundMethodService()
+    with pytest.raises(TypeError):
+        await service.start()
+    assert not service.running
+
+
+def test_executor_task_definition():
+    with pytest.raises(TypeError):
+        @task(executor='thread')
+        async def coroutine_task():
+            pass
+    with pytest.raises(ValueError):
+        task(executor='fork')
+    with pytest.raises(ValueError):
+        task(executor_workers=2)
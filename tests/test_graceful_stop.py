@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from core_service import Service, requirements, task
+
+
+class WritingService(Service):
+    def __init__(self, duration=0.05, **kwargs):
+        super().__init__(**kwargs)
+        self.duration = duration
+        self.started = 0
+        self.written = 0
+
+    @task(sleep_interval=0, workers=2)
+    async def write(self):
+        self.started += 1
+        await asyncio.sleep(self.duration)
+        self.written += 1
+
+    @task(queue=10, workers=3)
+    async def consume(self, item):
+        await asyncio.sleep(item)
+        self.written += 1
+
+
+@pytest.mark.asyncio
+async def test_stop_interrupts_iterations():
+    service = WritingService()
+    await service.start()
+    await asyncio.sleep(0.01)
+    await service.stop()
+    assert service.started == 2
+    assert service.written == 0
+
+
+@pytest.mark.asyncio
+async def test_drain_busy_workers():
+    service = WritingService(drain_timeout=1)
+    await service.start()
+    await service.submit('consume', 0.05)
+    await asyncio.sleep(0.01)
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+    await service.stop()
+    assert loop.time() - started_at < 0.2
+    # two periodic iterations and a single queue item, idle consumers cancelled immediately
+    assert service.started == 2
+    assert service.written == 3
+    assert not service._tasks.tasks
+
+
+@pytest.mark.asyncio
+async def test_drain_timeout():
+    service = WritingService(duration=10, drain_timeout=0.02)
+    await service.start()
+    await asyncio.sleep(0.01)
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+    await service.stop()
+    assert loop.time() - started_at < 0.5
+    assert service.written == 0
+    assert not service._tasks.tasks
+
+
+@pytest.mark.asyncio
+async def test_drain_failed_iteration(caplog):
+    class FailingService(Service):
+        @task()
+        async def fail(self):
+            await asyncio.sleep(0.02)
+            raise Exception("EXPECTED_EXCEPTION")
+
+    service = FailingService(drain_timeout=1)
+    await service.start()
+    await asyncio.sleep(0.01)
+    await service.stop()
+    assert 'EXPECTED_EXCEPTION' in caplog.text
+
+
+class SlowStopService(Service):
+    def __init__(self, stopped):
+        super().__init__()
+        self.stopped = stopped
+
+    async def stop(self):
+        await asyncio.sleep(0.05)
+        self.stopped.append(self)
+        await super().stop()
+
+
+@pytest.mark.asyncio
+async def test_nested_services_stopped_concurrently_by_levels():
+    stopped = []
+    first = [SlowStopService(stopped) for _ in range(5)]
+    second = [SlowStopService(stopped) for _ in range(5)]
+
+    class TreeService(Service):
+        @requirements()
+        async def first_level(self):
+            return first
+
+        @requirements('first_level')
+        async def second_level(self):
+            return second
+
+    service = TreeService()
+    await service.start()
+    assert service._services.started_levels == [first, second]
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+    await service.stop()
+    assert loop.time() - started_at < 0.2
+    assert set(stopped[:5]) == set(second)
+    assert set(stopped[5:]) == set(first)
+    assert not service._services.started_services
+    assert not service._services.started_levels
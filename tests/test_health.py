@@ -0,0 +1,196 @@
+import asyncio
+
+import pytest
+
+from core_service import Service, requirements, task
+from core_service.exceptions import DegradedException, UnhealthyException, UnhealthyServicesException
+from core_service.health import DEGRADED, HEALTHY, NOT_STARTED, UNHEALTHY
+from core_service.lazy import LazyService
+
+
+class LeafService(Service):
+    def __init__(self, **kwargs):
+        super().__init__(monitoring_interval=10, **kwargs)
+        self.checks = 0
+        self.error = None
+
+    async def healthcheck(self):
+        self.checks += 1
+        await super().healthcheck()
+        if self.error is not None:
+            raise self.error
+
+
+class NodeService(LeafService):
+    def __init__(self, children, **kwargs):
+        super().__init__(**kwargs)
+        self.children = children
+
+    @requirements()
+    async def nested(self):
+        return self.children
+
+
+@pytest.mark.asyncio
+async def test_health_pushed_to_ancestors():
+    leaf = LeafService()
+    node = NodeService([leaf, LeafService()])
+    root = NodeService([node])
+    assert root.health is NOT_STARTED
+    await root.start()
+    assert root.health.status == HEALTHY
+    assert leaf.health.healthy
+
+    leaf.error = UnhealthyException("Connection lost")
+    assert not await leaf._monitoring_check()
+    assert leaf.health.status == UNHEALTHY
+    assert node.health.status == UNHEALTHY
+    assert node.health.reason == "LeafService: Connection lost"
+    assert root.health.status == UNHEALTHY
+    assert root.health.reason == "NodeService: LeafService: Connection lost"
+    assert root.health.since == leaf.health.since
+
+    # parent healthcheck uses pushed health instead of checking nested services
+    checks = leaf.checks
+    with pytest.raises(UnhealthyServicesException, match='Connection lost'):
+        await node.healthcheck()
+    assert leaf.checks == checks
+
+    leaf.error = None
+    assert await leaf._monitoring_check()
+    assert root.health.status == HEALTHY
+    await root.healthcheck()
+    await root.stop()
+
+
+@pytest.mark.asyncio
+async def test_degraded_nested_service():
+    leaf = LeafService()
+    root = NodeService([leaf])
+    await root.start()
+    leaf.error = DegradedException("Slow replica")
+    assert await leaf._monitoring_check()
+    assert leaf.health.status == DEGRADED
+    assert root.health.status == DEGRADED
+    with pytest.raises(DegradedException, match='Slow replica'):
+        await root.healthcheck()
+    # unhealthy nested service is reported first
+    other = LeafService()
+    root._services.set_health(other, leaf.health._replace(status=UNHEALTHY, reason="Down"))
+    root._update_health()
+    assert root.health.reason == "LeafService: Down"
+    root._services.set_health(other, leaf.health._replace(status=HEALTHY))
+    root._update_health()
+    assert root.health.status == DEGRADED
+    leaf.error = None
+    assert await leaf._monitoring_check()
+    assert root.health.status == HEALTHY
+    await root.stop()
+
+
+@pytest.mark.asyncio
+async def test_task_failure_updates_health():
+    class FailingService(LeafService):
+        @task(periodic=False)
+        async def fail(self):
+            await asyncio.sleep(0.01)
+            raise ValueError("EXPECTED_EXCEPTION")
+
+    leaf = FailingService()
+    root = NodeService([leaf])
+    await root.start()
+    await asyncio.sleep(0.03)
+    assert leaf.health.status == UNHEALTHY
+    assert 'EXPECTED_EXCEPTION' in leaf.health.reason
+    assert 'EXPECTED_EXCEPTION' in root.health.reason
+    # failed services are stopped by monitoring, failure reason is kept
+    await asyncio.wait_for(root.wait_stopped(), 1)
+    assert 'EXPECTED_EXCEPTION' in root.health.reason
+
+
+@pytest.mark.asyncio
+async def test_stopped_health():
+    leaf = LeafService()
+    root = NodeService([leaf])
+    await root.start()
+    await root.stop()
+    assert leaf.health.status == UNHEALTHY
+    assert leaf.health.reason == "Service is stopped"
+    # nested services stopped with the parent are not pushed to it
+    assert not root._services.unhealthy
+    assert root.health.reason == "Service is stopped"
+    await root.start()
+    assert root.health.healthy
+    assert leaf.health.healthy
+    await root.stop()
+
+
+@pytest.mark.asyncio
+async def test_deep_tree_propagation():
+    leaf = LeafService()
+    root = leaf
+    for _ in range(1000):
+        root = NodeService([root])
+    await root.start()
+    leaf.error = UnhealthyException("Gone")
+    assert not await leaf._monitoring_check()
+    assert root.health.status == UNHEALTHY
+    assert root.health.reason.endswith("LeafService: Gone")
+    leaf.error = None
+    await root.stop()
+
+
+@pytest.mark.asyncio
+async def test_deep_tree_metrics():
+    leaf = LeafService()
+    root = leaf
+    for _ in range(1000):
+        root = NodeService([root])
+    await root.start()
+    metrics = root.get_metrics()
+    depth = 0
+    while metrics['services']:
+        metrics, = metrics['services']
+        depth += 1
+    assert depth == 1000
+    assert metrics['service'] == 'LeafService'
+    await root.stop()
+
+
+@pytest.mark.asyncio
+async def test_lazy_service_health_not_pushed():
+    leaf = LeafService()
+    root = NodeService([LazyService(leaf, idle_timeout=0)])
+    await root.start()
+    async with root.children[0].use():
+        assert leaf.health.healthy
+    await asyncio.sleep(0.01)
+    # idle stop of the wrapped service doesn't affect parent health
+    assert leaf.health.status == UNHEALTHY
+    assert root.health.healthy
+    await root.healthcheck()
+    await root.stop()
+
+
+@pytest.mark.asyncio
+async def test_degraded_lazy_service_health_pushed():
+    leaf = LeafService()
+    lazy = LazyService(leaf, idle_timeout=0)
+    root = NodeService([lazy])
+    await root.start()
+    # let the first scheduled checks pass
+    await asyncio.sleep(0.01)
+    async with lazy.use():
+        assert leaf.monitored
+        leaf.error = DegradedException("Slow replica")
+        assert await leaf._monitoring_check()
+        assert root.health.status == DEGRADED
+        assert root.health.reason == "LeafService(lazy): Slow replica"
+        with pytest.raises(DegradedException, match='Slow replica'):
+            await root.healthcheck()
+    await asyncio.sleep(0.01)
+    # degraded state is dropped with idle stop
+    assert not lazy.active
+    assert root.health.healthy
+    await root.healthcheck()
+    await root.stop()
@@ -0,0 +1,171 @@
+import asyncio
+
+import pytest
+
+from core_service import Service, requirements
+from core_service.exceptions import UnhealthyException, UnhealthyServicesException
+from core_service.lazy import LazyService
+
+
+class DatabaseService(Service):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.starts = 0
+        self.healthy = True
+
+    async def start(self):
+        self.starts += 1
+        await asyncio.sleep(0.01)
+        await super().start()
+
+    async def healthcheck(self):
+        await super().healthcheck()
+        if not self.healthy:
+            raise UnhealthyException("Database is gone")
+
+
+class ApplicationService(Service):
+    def __init__(self, idle_timeout=None, **kwargs):
+        super().__init__(**kwargs)
+        self.database = DatabaseService()
+        self.lazy = LazyService(self.database, idle_timeout=idle_timeout)
+
+    @requirements()
+    async def databases(self):
+        return [self.lazy]
+
+
+@pytest.mark.asyncio
+async def test_started_on_first_use():
+    service = ApplicationService()
+    await service.start()
+    assert service.lazy.running
+    assert not service.database.running
+    async with service.lazy.use() as database:
+        assert database is service.database
+        assert database.running
+        assert database.parent is service
+        assert service.lazy.users == 1
+    assert service.lazy.users == 0
+    assert service.database.running
+    await service.stop()
+    assert not service.database.running
+    assert not service.lazy.active
+
+
+@pytest.mark.asyncio
+async def test_concurrent_first_use():
+    service = ApplicationService()
+    await service.start()
+    await asyncio.gather(*[service.lazy.acquire() for _ in range(5)])
+    assert service.database.starts == 1
+    assert service.lazy.starts == 1
+    assert service.lazy.users == 5
+    for _ in range(5):
+        service.lazy.release()
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_idle_stop():
+    service = ApplicationService(idle_timeout=0.02)
+    await service.start()
+    async with service.lazy.use():
+        await asyncio.sleep(0.04)
+        # not stopped while used
+        assert service.database.running
+    await asyncio.sleep(0.05)
+    assert not service.database.running
+    assert not service.lazy.active
+    assert service.lazy.running
+    await service.healthcheck()
+    # started again on the next use
+    async with service.lazy.use() as database:
+        assert database.running
+    assert service.database.starts == 2
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_reused_before_idle_timeout():
+    service = ApplicationService(idle_timeout=0.05)
+    await service.start()
+    async with service.lazy.use():
+        pass
+    await asyncio.sleep(0.03)
+    async with service.lazy.use():
+        pass
+    await asyncio.sleep(0.03)
+    assert service.database.running
+    await service.stop()
+    assert service.database.starts == 1
+
+
+@pytest.mark.asyncio
+async def test_included_in_healthcheck():
+    service = ApplicationService()
+    await service.start()
+    await service.lazy.acquire()
+    assert service.database.monitored
+    service.database.healthy = False
+    # failed service is stopped by the shared monitoring, parent is stopped after it
+    await asyncio.wait_for(service.wait_stopped(), 1)
+    assert not service.database.running
+    assert not service.lazy.running
+    service.lazy.release()
+
+
+@pytest.mark.asyncio
+async def test_healthcheck_standalone():
+    lazy = LazyService(DatabaseService())
+    await lazy.start()
+    await lazy.healthcheck()
+    await lazy.acquire()
+    assert not lazy.service.monitored
+    lazy.service.healthy = False
+    with pytest.raises(UnhealthyException):
+        await lazy.healthcheck()
+    lazy.service.healthy = True
+    lazy.release()
+    await lazy.stop()
+
+
+@pytest.mark.asyncio
+async def test_failure_makes_parent_unhealthy():
+    service = ApplicationService()
+    await service.start()
+    await service.lazy.acquire()
+    await service.database.stop()
+    with pytest.raises(UnhealthyServicesException):
+        await service.healthcheck()
+    service.lazy.release()
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_start_failure():
+    service = ApplicationService()
+    await service.start()
+
+    async def fail():
+        raise RuntimeError("Can't connect")
+
+    service.database.start = fail
+    with pytest.raises(RuntimeError):
+        await service.lazy.acquire()
+    assert service.lazy.users == 0
+    assert not service.lazy.active
+    await service.healthcheck()
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_acquire_not_running():
+    lazy = LazyService(DatabaseService())
+    with pytest.raises(RuntimeError):
+        await lazy.acquire()
+
+
+def test_negative_idle_timeout():
+    with pytest.raises(ValueError):
+        LazyService(DatabaseService(), idle_timeout=-1)
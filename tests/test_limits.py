@@ -0,0 +1,182 @@
+import asyncio
+
+import pytest
+
+from core_service import Service, requirements, task
+from core_service.exceptions import ServiceStartupException
+from core_service.limits import Limiter
+
+
+@pytest.mark.asyncio
+async def test_rate():
+    limiter = Limiter(rate=100)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    for _ in range(5):
+        async with limiter:
+            pass
+    assert loop.time() - started >= 0.035
+    stats = limiter.get_stats()
+    assert stats['acquired'] == 5
+    assert stats['in_use'] == 0
+    assert stats['wait']['count'] == 5
+    assert stats['wait']['max'] > 0.005
+
+
+@pytest.mark.asyncio
+async def test_burst():
+    limiter = Limiter(rate=10, burst=3)
+    loop = asyncio.get_running_loop()
+    await asyncio.wait_for(asyncio.gather(*[limiter.acquire() for _ in range(3)]), 0.05)
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(limiter.acquire(), 0.01)
+    assert limiter.waiting == 0
+    # cancelled caller returned the token, next one waits for a single token only
+    started = loop.time()
+    await limiter.acquire()
+    assert 0.07 <= loop.time() - started < 0.14
+    assert limiter.acquired == 4
+
+
+@pytest.mark.asyncio
+async def test_max_concurrency():
+    limiter = Limiter(max_concurrency=2)
+    running = []
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with limiter:
+            running.append(None)
+            peak = max(peak, len(running))
+            await asyncio.sleep(0.01)
+            running.pop()
+
+    await asyncio.gather(*[call() for _ in range(6)])
+    assert peak == 2
+    assert limiter.in_use == 0
+    assert limiter._slots == 0
+
+
+@pytest.mark.asyncio
+async def test_cancel_waiting_for_slot():
+    limiter = Limiter(max_concurrency=1)
+    await limiter.acquire()
+    waiter = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.waiting == 1
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+    limiter.release()
+    # slot is not handed over to the cancelled caller
+    await asyncio.wait_for(limiter.acquire(), 0.1)
+    limiter.release()
+    assert limiter._slots == 0
+
+
+def test_validation():
+    with pytest.raises(ValueError):
+        Limiter()
+    with pytest.raises(ValueError):
+        Limiter(rate=0)
+    with pytest.raises(ValueError):
+        Limiter(max_concurrency=1, burst=2)
+    with pytest.raises(ValueError):
+        Limiter(max_concurrency=0)
+
+
+class ApiService(Service):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+        self.running_calls = 0
+        self.peak = 0
+
+    @task(sleep_interval=0, workers=5, rate=50)
+    async def poll(self):
+        self.calls += 1
+
+
+@pytest.mark.asyncio
+async def test_task_rate():
+    service = ApiService()
+    await service.start()
+    await asyncio.sleep(0.2)
+    await service.stop()
+    assert 8 <= service.calls <= 12
+    stats = service.get_limiter_stats()['poll']
+    assert stats['acquired'] == service.calls
+    # waiting workers are not busy
+    assert service.get_task('poll')._busy_time < 0.05
+
+
+class BackendClient(Service):
+    @task(sleep_interval=0, workers=3, limiter='backend', max_concurrency=2)
+    async def fetch(self):
+        parent = self.parent
+        parent.running_calls += 1
+        parent.peak = max(parent.peak, parent.running_calls)
+        await asyncio.sleep(0.01)
+        parent.running_calls -= 1
+
+
+class OtherBackendClient(Service):
+    @task(sleep_interval=0, workers=3, limiter='backend')
+    async def push(self):
+        parent = self.parent
+        parent.running_calls += 1
+        parent.peak = max(parent.peak, parent.running_calls)
+        await asyncio.sleep(0.01)
+        parent.running_calls -= 1
+
+
+class ApplicationService(ApiService):
+    def __init__(self, nested=(BackendClient, OtherBackendClient), **kwargs):
+        super().__init__(**kwargs)
+        self.nested = [cls() for cls in nested]
+
+    @requirements()
+    async def clients(self):
+        return self.nested
+
+
+@pytest.mark.asyncio
+async def test_shared_limiter():
+    service = ApplicationService()
+    await service.start()
+    await asyncio.sleep(0.1)
+    await service.stop()
+    assert service.peak == 2
+    limiter = service.limiters['backend']
+    assert limiter.name == 'backend'
+    assert service.nested[0].get_task('fetch').limiter is limiter
+    assert service.nested[1].get_task('push').limiter is limiter
+    assert service.nested[1].get_limiter_stats()['push']['acquired'] == limiter.acquired
+
+
+@pytest.mark.asyncio
+async def test_limiter_defined_by_ancestor():
+    limiter = Limiter(max_concurrency=1)
+    service = ApplicationService(nested=(OtherBackendClient,), limiters={'backend': limiter})
+    await service.start()
+    await asyncio.sleep(0.05)
+    await service.stop()
+    assert limiter.name == 'backend'
+    assert service.peak == 1
+    assert limiter.acquired > 0
+
+
+@pytest.mark.asyncio
+async def test_limiter_not_defined():
+    service = OtherBackendClient()
+    with pytest.raises(ValueError):
+        await service.start()
+    assert not service.running
+
+
+@pytest.mark.asyncio
+async def test_limiter_conflict():
+    service = ApplicationService(limiters={'backend': Limiter(max_concurrency=1)})
+    with pytest.raises(ServiceStartupException):
+        await service.start()
+    assert not service.running
@@ -0,0 +1,120 @@
+import logging
+import threading
+
+import pytest
+
+from core_service import Service
+from core_service.logging import LogSink, ServiceFormatter, debug_sampled, set_debug_sampling
+
+
+class Records(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.records.append(record)
+        self.threads.add(threading.current_thread())
+
+
+@pytest.fixture
+def records():
+    logger = logging.getLogger(__name__)
+    handler = Records()
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    yield handler.records
+    logger.removeHandler(handler)
+    logger.setLevel(logging.NOTSET)
+    set_debug_sampling(1)
+
+
+class LoggingService(Service):
+    pass
+
+
+def test_service_context(records):
+    service = LoggingService()
+    service.log.info("Started %i workers", 3)
+    service.log.warning("Task failed", task='poll', extra={'attempt': 2})
+    first, second = records
+    assert first.getMessage() == "Started 3 workers"
+    assert first.service == 'LoggingService'
+    assert not hasattr(first, 'task')
+    assert second.service == 'LoggingService'
+    assert second.task == 'poll'
+    assert second.attempt == 2
+
+
+def test_formatter(records):
+    service = LoggingService()
+    service.log.info("Started")
+    service.log.info("Scaled", task='poll')
+    logging.getLogger(__name__).info("Plain")
+    formatter = ServiceFormatter('%(service_context)s%(message)s')
+    assert [formatter.format(record) for record in records] == [
+        '[LoggingService] Started', '[LoggingService:poll] Scaled', 'Plain',
+    ]
+
+
+def test_debug_sampled(records):
+    logger = logging.getLogger(__name__)
+    set_debug_sampling(3)
+    for i in range(7):
+        debug_sampled(logger, "Hot path %i", i)
+    assert [record.getMessage() for record in records] == ["Hot path 0", "Hot path 3", "Hot path 6"]
+    assert records[0].sample_rate == 3
+    set_debug_sampling(1)
+    LoggingService().log.debug_sampled("Hot path", task='poll')
+    assert records[-1].task == 'poll'
+    assert not hasattr(records[-1], 'sample_rate')
+    with pytest.raises(ValueError):
+        set_debug_sampling(0)
+
+
+def test_debug_disabled(records):
+    class Unformattable:
+        def __str__(self):
+            raise AssertionError("formatted")
+
+    logger = logging.getLogger(__name__)
+    logger.setLevel(logging.INFO)
+    debug_sampled(logger, "Hot path %s", Unformattable())
+    LoggingService().log.debug_sampled("Hot path %s", Unformattable())
+    assert not records
+
+
+def test_log_sink():
+    logger = logging.getLogger(__name__ + '.sink')
+    logger.propagate = False
+    handler = Records()
+    logger.addHandler(handler)
+    try:
+        with LogSink(logger) as sink:
+            assert logger.handlers == [sink._queue_handler]
+            for i in range(10):
+                logger.warning("Record %i", i)
+        assert logger.handlers == [handler]
+        assert [record.getMessage() for record in handler.records] == ["Record %i" % i for i in range(10)]
+        # records are emitted by the listener thread
+        assert threading.current_thread() not in handler.threads
+        sink.stop()
+    finally:
+        logger.removeHandler(handler)
+        logger.propagate = True
+
+
+def test_log_sink_handlers():
+    logger = logging.getLogger(__name__ + '.sink')
+    logger.propagate = False
+    handler = Records()
+    sink = LogSink(logger, handlers=[handler])
+    sink.start()
+    with pytest.raises(RuntimeError):
+        sink.start()
+    logger.error("Record")
+    sink.stop()
+    assert logger.handlers == []
+    assert [record.getMessage() for record in handler.records] == ["Record"]
+    logger.propagate = True
@@ -0,0 +1,109 @@
+import asyncio
+import time
+
+import pytest
+
+from core_service import Service, requirements, task
+from core_service.exceptions import DegradedException, UnhealthyException
+from core_service.monitoring import LoopWatchdog, parse_task_name
+
+
+class BlockingService(Service):
+    blocking = 0.
+
+    @task(sleep_interval=0.01)
+    async def block(self):
+        if self.blocking:
+            time.sleep(self.blocking)
+            self.blocking = 0.
+
+
+class TreeService(Service):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.nested = BlockingService()
+
+    @requirements()
+    async def nested_services(self):
+        return [self.nested]
+
+
+def test_parse_task_name():
+    assert parse_task_name('BlockingService.block.0') == ('BlockingService', 'block')
+    assert parse_task_name('Poller.feed.fetch.12') == ('Poller.feed', 'fetch')
+    assert parse_task_name('BlockingService.block.autoscaler') == ('BlockingService', 'block')
+    assert parse_task_name('BlockingService.block.resend') == ('BlockingService', 'block')
+    assert parse_task_name('BlockingService.monitoring_task') == ('BlockingService', 'monitoring_task')
+    assert parse_task_name('timer_wheel') == (None, 'timer_wheel')
+    assert parse_task_name(None) == (None, None)
+
+
+@pytest.mark.asyncio
+async def test_stall_attributed_to_task(caplog):
+    service = TreeService(loop_lag_threshold=0.05)
+    await service.start()
+    watchdog = service.loop_watchdog
+    assert service.nested.loop_watchdog is None
+    await asyncio.sleep(0.05)
+    assert not watchdog.stalls
+    service.nested.blocking = 0.15
+    await asyncio.sleep(0.1)
+    await service.stop()
+    assert service.loop_watchdog is None
+
+    stall, = watchdog.stalls
+    assert stall.service == 'BlockingService'
+    assert stall.task == 'block'
+    assert stall.task_name == 'BlockingService.block.0'
+    assert 0.1 <= stall.lag < 0.3
+    assert watchdog.max_lag == stall.lag
+    assert watchdog.get_stats()['stalls'] == 1
+    assert 'blocked for' in caplog.text
+    assert 'BlockingService.block.0' in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_stall_outside_of_tasks():
+    watchdog = LoopWatchdog(asyncio.get_running_loop(), threshold=0.05, interval=0.01)
+    watchdog.start()
+    await asyncio.sleep(0.02)
+    asyncio.get_running_loop().call_soon(time.sleep, 0.1)
+    await asyncio.sleep(0.15)
+    watchdog.stop()
+    stall, = watchdog.stalls
+    assert stall.task_name is None
+    assert stall.lag >= 0.09
+    assert watchdog.lag < 0.05
+    assert 0 < watchdog.sustained_lag < stall.lag
+
+
+@pytest.mark.asyncio
+async def test_sustained_lag_fails_healthcheck():
+    # threshold well above scheduler noise on loaded machines
+    service = TreeService(max_loop_lag=0.1, monitoring_interval=10)
+    await service.start()
+    await service.healthcheck()
+    service.nested.blocking = 0.5
+    await asyncio.sleep(0.05)
+    with pytest.raises(UnhealthyException, match='loop lag'):
+        await service.healthcheck()
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_sustained_lag_fails_degraded_service():
+    service = TreeService(max_loop_lag=0.1, monitoring_interval=10)
+    await service.start()
+    service._services.set_health(service.nested, service.nested.health._replace(status='degraded', reason="Slow"))
+    with pytest.raises(DegradedException):
+        await service.healthcheck()
+    service.nested.blocking = 0.5
+    await asyncio.sleep(0.05)
+    with pytest.raises(UnhealthyException, match='loop lag'):
+        await service.healthcheck()
+    await service.stop()
+
+
+def test_watchdog_arguments():
+    with pytest.raises(ValueError):
+        LoopWatchdog(None, threshold=0)
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from core_service import Service, requirements, task
+from core_service.metrics import LatencyHistogram
+
+
+class WorkerService(Service):
+    calls = 0
+
+    @task(sleep_interval=0)
+    async def work(self):
+        self.calls += 1
+        await asyncio.sleep(0.002)
+        if self.calls % 2:
+            raise Exception("Odd call")
+
+    @task(queue=10)
+    async def consume(self, item):
+        await asyncio.sleep(item)
+
+
+class RetryWorkerService(WorkerService):
+    @task(sleep_interval=0, on_error='retry', retry_backoff=0)
+    async def work(self):
+        await super().work()
+
+
+class ParentService(Service):
+    def __init__(self):
+        super().__init__()
+        self.children = [RetryWorkerService(), RetryWorkerService()]
+
+    @requirements()
+    async def nested(self):
+        return self.children
+
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for i in range(1, 101):
+        histogram.record(i / 1000)
+    assert histogram.count == 100
+    assert histogram.max == 0.1
+    assert histogram.snapshot()['mean'] == pytest.approx(0.0505)
+    for q in (50, 90, 99):
+        value = histogram.percentile(q)
+        # bucket bound is within 19% of the exact percentile
+        assert q / 1000 <= value <= q / 1000 * 1.19
+    assert histogram.percentile(100) == 0.1
+    assert LatencyHistogram().percentile(50) == 0.
+
+
+def test_histogram_overflow_and_merge():
+    first, second = LatencyHistogram(), LatencyHistogram()
+    first.record(10000)
+    second.record(0)
+    first.merge(second)
+    assert first.counts[0] == first.counts[-1] == 1
+    assert first.percentile(99) == 10000
+    with pytest.raises(ValueError):
+        first.merge(LatencyHistogram(bounds=(1., 2.)))
+
+
+@pytest.mark.asyncio
+async def test_task_metrics():
+    service = RetryWorkerService()
+    await service.start()
+    await service.submit('consume', 0.01)
+    await asyncio.sleep(0.005)
+    metrics = service.get_metrics()
+    assert metrics['tasks']['consume']['in_flight'] == 1
+    await asyncio.sleep(0.03)
+    metrics = service.get_metrics()
+    await service.stop()
+
+    work = metrics['tasks']['work']
+    assert work['iterations'] >= 4
+    assert 1 <= work['errors'] <= work['iterations'] // 2 + 1
+    assert work['latency']['count'] == work['iterations']
+    assert 0.002 <= work['latency']['p50'] < 0.02
+    consume = metrics['tasks']['consume']
+    assert consume['iterations'] == 1
+    assert consume['in_flight'] == 0
+    assert consume['latency']['max'] >= 0.01
+    total = metrics['total']
+    assert total['iterations'] == work['iterations'] + 1
+    assert metrics['services'] == []
+
+
+@pytest.mark.asyncio
+async def test_nested_metrics_rollup():
+    service = ParentService()
+    await service.start()
+    await asyncio.sleep(0.02)
+    metrics = service.get_metrics()
+    await service.stop()
+    assert metrics['service'] == 'ParentService'
+    assert metrics['tasks'] == {}
+    assert [child['service'] for child in metrics['services']] == ['RetryWorkerService'] * 2
+    assert metrics['total']['iterations'] == sum(
+        child['total']['iterations'] for child in metrics['services'])
+    assert metrics['total']['errors'] == sum(child['total']['errors'] for child in metrics['services'])
+    assert metrics['total']['errors'] > 0
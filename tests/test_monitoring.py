@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+
+from core_service import Service, requirements
+from core_service.exceptions import UnhealthyException, UnhealthyServicesException
+from core_service.monitoring import MonitoringScheduler
+
+
+class CountingService(Service):
+    checks = 0
+
+    async def healthcheck(self):
+        self.checks += 1
+        await super().healthcheck()
+
+
+class TreeService(CountingService):
+    def __init__(self, nested, **kwargs):
+        super().__init__(**kwargs)
+        self.nested = nested
+
+    @requirements()
+    async def nested_services(self):
+        return self.nested
+
+
+@pytest.mark.asyncio
+async def test_standalone_service_monitoring_task():
+    service = CountingService()
+    await service.start()
+    assert service._monitoring_task is not None
+    assert service._monitoring_scheduler is None
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_service_tree_shared_scheduler():
+    children = [CountingService(monitoring_interval=0.05) for _ in range(3)]
+    service = TreeService(children, monitoring_interval=0.05)
+    await service.start()
+    assert service._monitoring_task is None
+    assert all(child._monitoring_task is None for child in children)
+    assert all(child._monitoring_scheduler is service._monitoring_scheduler for child in children)
+    assert all(child.monitored for child in children + [service])
+    assert all(child.parent is service for child in children)
+    assert children[0].root is service
+
+    # startup check only
+    assert [child.checks for child in children] == [1, 1, 1]
+    await asyncio.sleep(0.12)
+    # checked once per interval by the scheduler, not by the parent healthcheck
+    assert all(2 <= child.checks <= 4 for child in children)
+    await service.stop()
+    assert not any(child.monitored for child in children + [service])
+
+
+@pytest.mark.asyncio
+async def test_failed_nested_service_stops_tree():
+    child = CountingService(monitoring_interval=10)
+    service = TreeService([child], monitoring_interval=10)
+    await service.start()
+    child.running = False
+    # parent uses health pushed by the child own check
+    await service.healthcheck()
+    assert not await child._monitoring_check()
+    assert child.health.status == 'unhealthy'
+    with pytest.raises(UnhealthyServicesException):
+        await service.healthcheck()
+    service._monitoring_scheduler.check_now(child)
+    await asyncio.sleep(0.05)
+    assert not service.running
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_scheduler_stops_healthcheck_timeout():
+    class SlowHealthcheckService(Service):
+        async def healthcheck(self):
+            await asyncio.sleep(10)
+
+    child = SlowHealthcheckService(monitoring_interval=0.01, healthcheck_timeout=0.01)
+    service = TreeService([CountingService()], monitoring_interval=10)
+    await service.start()
+    child.parent = service
+    # register after startup to skip the startup healthcheck
+    child.running = True
+    child._get_monitoring_scheduler().register(child)
+    await asyncio.sleep(0.05)
+    assert not child.running
+    assert not child.monitored
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_slow_healthcheck_does_not_delay_siblings():
+    class SwitchedService(CountingService):
+        slow = failing = False
+
+        async def healthcheck(self):
+            await super().healthcheck()
+            if self.slow:
+                await asyncio.sleep(2)
+            if self.failing:
+                raise UnhealthyException("Failing")
+
+    slow = SwitchedService(monitoring_interval=0.05)
+    failing = SwitchedService(monitoring_interval=0.05)
+    service = TreeService([slow, failing], monitoring_interval=10)
+    await service.start()
+    slow.slow = True
+    await asyncio.sleep(0.1)
+    checks = slow.checks
+    failing.failing = True
+    await asyncio.sleep(0.2)
+    # failure is detected and propagated to the root while the slow check is running
+    assert not failing.running
+    assert not service.running
+    # slow service is not checked again while its check is running
+    assert slow.checks == checks
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_scheduler_drops_empty_buckets():
+    loop = asyncio.get_running_loop()
+    scheduler = MonitoringScheduler(loop)
+    service = CountingService(monitoring_interval=0.01)
+    service.running = True
+    scheduler.register(service)
+    scheduler.start()
+    await asyncio.sleep(0.05)
+    assert service.checks >= 2
+    scheduler.unregister(service)
+    await asyncio.sleep(0.03)
+    assert not scheduler._buckets
+    await scheduler.stop()
+    await scheduler.stop()
+    service.running = False
@@ -3,7 +3,9 @@ import asyncio
 import pytest
 
 from core_service import Service, requirements, task
-from core_service.exceptions import ServiceStartupException
+from core_service.container import ServiceCollection, resolve_requirements
+from core_service.exceptions import (RequirementsResolutionException, ServiceStartupException,
+                                     UnhealthyServicesException)
 
 
 class NestedService(Service):
@@ -11,11 +13,11 @@ class NestedService(Service):
 
 
 class MainService(Service):
-    def __init__(self, *, nested=None, loop=None):
-        super().__init__(loop=loop)
+    def __init__(self, *, nested=None, loop=None, monitoring_interval=.1):
+        super().__init__(loop=loop, monitoring_interval=monitoring_interval)
         if nested is None:
             nested = NestedService
-        self.nested = nested(loop=loop)
+        self.nested = nested(loop=loop, monitoring_interval=monitoring_interval)
 
     @requirements()
     async def main_requirements(self):
@@ -74,9 +76,9 @@ async def test_nested_service_task_failure():
         async def fail_task(self):
             raise Exception
 
-    service = MainService(nested=FailService)
+    service = MainService(nested=FailService, monitoring_interval=10)
     await service.start()
-    await asyncio.sleep(0)
+    await asyncio.sleep(0.05)
     assert not service.running
     assert not service.nested.running
     await service.stop()
@@ -177,6 +179,37 @@ async def test_unresolvable_requirements():
     service = UnresolvableService()
     with pytest.raises(RuntimeError):
         await service.start()
+    with pytest.raises(RequirementsResolutionException, match='first_reqs -> second_reqs -> first_reqs'):
+        UnresolvableService.requirements_levels()
+
+
+def test_requirements_levels():
+    levels = resolve_requirements([
+        ('d', ('b', 'c')),
+        ('c', ('a',)),
+        ('b', ()),
+        ('a', ()),
+        ('e', ('d', 'a')),
+    ])
+    assert levels == (('b', 'a'), ('c',), ('d',), ('e',))
+
+
+def test_requirements_cycle_path():
+    with pytest.raises(RequirementsResolutionException) as exc_info:
+        resolve_requirements([
+            ('root', ()),
+            ('a', ('root', 'c')),
+            ('b', ('a',)),
+            ('c', ('b',)),
+            ('tail', ('c',)),
+        ])
+    assert exc_info.value.cycle == ['a', 'c', 'b', 'a']
+
+
+def test_unknown_requirements():
+    with pytest.raises(RequirementsResolutionException, match='first requires missing') as exc_info:
+        resolve_requirements([('first', ('missing',)), ('second', ('first',))])
+    assert exc_info.value.unknown == {'first': ['missing']}
 
 
 @pytest.mark.asyncio
@@ -186,3 +219,122 @@ async def test_requirements_method_exception(caplog):
         await service.start()
     assert service.running is False
     assert 'EXPECTED_EXCEPTION' in caplog.text
+
+
+class SlowStartService(Service):
+    async def start(self):
+        await asyncio.sleep(0.1)
+        await super().start()
+
+
+@pytest.mark.asyncio
+async def test_nested_services_started_concurrently():
+    class ParallelService(Service):
+        @requirements()
+        async def main_requirements(self):
+            return [SlowStartService() for _ in range(5)]
+
+    service = ParallelService()
+    started_at = asyncio.get_running_loop().time()
+    await service.start()
+    assert asyncio.get_running_loop().time() - started_at < 0.3
+    assert all(nested.running for nested in service._services.services)
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_nested_service_start_timeout():
+    class HangingStartService(Service):
+        async def start(self):
+            await asyncio.sleep(10)
+
+    class PartialStartService(Service):
+        async def start(self):
+            await super().start()
+            await asyncio.sleep(10)
+
+    healthy = NestedService()
+    partial = PartialStartService(start_timeout=0.01)
+
+    class TimeoutService(Service):
+        @requirements()
+        async def main_requirements(self):
+            return [healthy, HangingStartService(start_timeout=0.01), partial]
+
+    service = TimeoutService()
+    with pytest.raises(ServiceStartupException):
+        await service.start()
+    assert not healthy.running
+    assert not partial.running
+    assert not service._services.started_services
+
+
+@pytest.mark.asyncio
+async def test_nested_start_timeout_stops_grandchildren():
+    class SlowLeaf(Service):
+        async def start(self):
+            await super().start()
+            await asyncio.sleep(10)
+
+    leaf = SlowLeaf()
+
+    class Mid(Service):
+        @requirements()
+        async def leaves(self):
+            return [leaf]
+
+    mid = Mid(start_timeout=0.05)
+
+    class Root(Service):
+        @requirements()
+        async def mids(self):
+            return [mid]
+
+    service = Root()
+    with pytest.raises(ServiceStartupException):
+        await service.start()
+    assert not service.running
+    assert not mid.running
+    assert not leaf.running
+
+
+@pytest.mark.asyncio
+async def test_started_levels_stopped_on_requirements_failure():
+    first = NestedService()
+
+    class LevelFailureService(Service):
+        @requirements()
+        async def first_requirements(self):
+            return [first]
+
+        @requirements('first_requirements')
+        async def second_requirements(self):
+            assert first.running
+            raise Exception("EXPECTED_EXCEPTION")
+
+    service = LevelFailureService()
+    with pytest.raises(Exception, match='EXPECTED_EXCEPTION'):
+        await service.start()
+    assert not first.running
+
+
+@pytest.mark.asyncio
+async def test_collection_healthcheck_reports_all_failures():
+    class SlowHealthcheckService(Service):
+        async def healthcheck(self):
+            await asyncio.sleep(10)
+
+    collection = ServiceCollection()
+    healthy = NestedService()
+    stopped = NestedService()
+    slow = SlowHealthcheckService(healthcheck_timeout=0.01)
+    for service in (healthy, stopped, slow):
+        collection.add(service)
+    healthy.running = slow.running = True
+
+    with pytest.raises(UnhealthyServicesException) as exc_info:
+        await collection.healthcheck()
+    assert [service for service, _ in exc_info.value.errors] == [stopped, slow]
+    assert isinstance(exc_info.value.errors[1][1], asyncio.TimeoutError)
+    assert 'SlowHealthcheckService' in str(exc_info.value)
+    healthy.running = slow.running = False
@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+
+from core_service import Service, task
+
+
+class ConsumerService(Service):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.consumed = []
+
+    @task(queue=2, workers=2)
+    async def consume(self, item):
+        await asyncio.sleep(0.01)
+        self.consumed.append(item)
+
+    @task(sleep_interval=1)
+    async def periodic(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_queue_consumer():
+    service = ConsumerService()
+    await service.start()
+    for i in range(10):
+        await service.submit('consume', i)
+    await service.get_task('consume').queue.join()
+    assert sorted(service.consumed) == list(range(10))
+
+    stats = service.get_task('consume').get_queue_stats()
+    assert stats['depth'] == 0
+    assert stats['maxsize'] == 2
+    assert stats['enqueued'] == stats['dequeued'] == 10
+    assert stats['enqueue_rate'] > 0
+    assert stats['max_wait_time'] >= stats['avg_wait_time'] > 0
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_queue_backpressure():
+    service = ConsumerService()
+    await service.start()
+    # two items are being consumed, two more fill the queue
+    for i in range(4):
+        await service.submit('consume', i)
+    submit = asyncio.ensure_future(service.submit('consume', 4))
+    await asyncio.sleep(0)
+    assert not submit.done()
+    await asyncio.wait_for(submit, 1)
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_wrong_submit():
+    service = ConsumerService()
+    with pytest.raises(RuntimeError):
+        await service.submit('consume', 1)
+    await service.start()
+    with pytest.raises(KeyError):
+        await service.submit('unknown', 1)
+    with pytest.raises(TypeError):
+        await service.submit('periodic', 1)
+    with pytest.raises(TypeError):
+        service.get_task('periodic').get_queue_stats()
+    await service.stop()
+
+
+class BatchService(Service):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.batches = []
+
+    @task(batch_size=3, max_batch_latency=0.05)
+    async def store(self, items):
+        self.batches.append(items)
+
+
+@pytest.mark.asyncio
+async def test_batch_task():
+    service = BatchService()
+    await service.start()
+    for i in range(4):
+        await service.submit('store', i)
+    await asyncio.sleep(0.01)
+    # full batch passed immediately, partial one waits for latency deadline
+    assert service.batches == [[0, 1, 2]]
+    await asyncio.sleep(0.1)
+    assert service.batches == [[0, 1, 2], [3]]
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_batch_flushed_on_stop():
+    service = BatchService()
+    await service.start()
+    for i in range(2):
+        await service.submit('store', i)
+    await asyncio.sleep(0.01)
+    # worker is collecting batch, other items are left in the queue
+    service.running = False
+    for i in range(2, 6):
+        await service.get_task('store').submit(i)
+    await service.stop()
+    assert [item for batch in service.batches for item in batch] == list(range(6))
+    assert all(len(batch) <= 3 for batch in service.batches)
+
+
+class SlowBatchService(BatchService):
+    @task(batch_size=3, max_batch_latency=0.05)
+    async def store(self, items):
+        self.batches.append(items)
+        await asyncio.sleep(0.05)
+
+
+@pytest.mark.asyncio
+async def test_interrupted_batch_flushed_on_stop():
+    service = SlowBatchService()
+    await service.start()
+    for i in range(7):
+        await service.submit('store', i)
+    await asyncio.sleep(0.01)
+    # stop cancels the worker during the first batch call
+    assert service.batches == [[0, 1, 2]]
+    await service.stop()
+    # interrupted batch is passed again
+    assert sorted(set(item for batch in service.batches[1:] for item in batch)) == list(range(7))
+    # each item is marked done once
+    await asyncio.wait_for(service.get_task('store').queue.join(), 0.1)
+
+
+@pytest.mark.asyncio
+async def test_batch_flush_failure(caplog):
+    class FailingBatchService(Service):
+        @task(batch_size=10, max_batch_latency=10)
+        async def store(self, items):
+            raise Exception("EXPECTED_EXCEPTION")
+
+    service = FailingBatchService()
+    await service.start()
+    await service.submit('store', 1)
+    await service.stop()
+    assert 'Failed to flush store task' in caplog.text
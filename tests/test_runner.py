@@ -0,0 +1,119 @@
+import asyncio
+import importlib.util
+import os
+import signal
+import subprocess
+import sys
+
+import pytest
+
+from core_service import Service, run, task
+from core_service.runner import load_factory, main, serve
+
+
+class SelfTerminatingService(Service):
+    """Send SIGTERM to own process after start."""
+    stopped = False
+
+    async def start(self):
+        await super().start()
+        self.loop.call_later(0.05, os.kill, os.getpid(), signal.SIGTERM)
+
+    async def stop(self):
+        await super().stop()
+        SelfTerminatingService.stopped = True
+
+
+class HangingStopService(SelfTerminatingService):
+    async def stop(self):
+        await super().stop()
+        await asyncio.sleep(10)
+
+
+@pytest.mark.asyncio
+async def test_serve_failed_service():
+    class FailService(Service):
+        @task()
+        async def fail(self):
+            raise Exception("EXPECTED_EXCEPTION")
+
+    class FailStartService(Service):
+        async def start(self):
+            raise Exception("EXPECTED_EXCEPTION")
+
+    assert await serve(FailService(monitoring_interval=0.01)) == 1
+    assert await serve(FailStartService()) == 1
+
+
+@pytest.mark.asyncio
+async def test_serve_terminated_service():
+    service = Service()
+    loop = asyncio.get_running_loop()
+    loop.call_later(0.05, os.kill, os.getpid(), signal.SIGINT)
+    assert await serve(service) == 0
+    assert not service.running
+
+
+@pytest.mark.asyncio
+async def test_serve_stop_failure():
+    class FailStopService(SelfTerminatingService):
+        async def stop(self):
+            await super().stop()
+            raise Exception("EXPECTED_EXCEPTION")
+
+    assert await serve(FailStopService()) == 1
+
+
+def run_process(*args):
+    return subprocess.run([sys.executable, *args], capture_output=True, timeout=30)
+
+
+def test_run():
+    code = "from core_service import run; from tests.test_runner import SelfTerminatingService as S; " \
+           "raise SystemExit(run(S()) + 2 * S.stopped)"
+    assert run_process('-c', code).returncode == 2
+
+
+def test_run_shutdown_timeout():
+    result = run_process('-m', 'core_service', 'tests.test_runner:HangingStopService', '--shutdown-timeout', '0.01')
+    assert result.returncode == 1
+    assert b'was not stopped in 0.01 seconds' in result.stderr
+
+
+def test_run_without_uvloop():
+    if importlib.util.find_spec('uvloop') is not None:
+        pytest.skip("uvloop is installed")
+    with pytest.raises(RuntimeError, match='uvloop is not installed'):
+        run(Service(), uvloop=True)
+
+
+def test_loop_requires_running_loop():
+    with pytest.raises(RuntimeError):
+        Service().loop
+
+
+def test_load_factory():
+    assert load_factory('tests.test_runner:SelfTerminatingService') is SelfTerminatingService
+    assert load_factory('core_service.runner:main') is main
+    with pytest.raises(ValueError):
+        load_factory('tests.test_runner')
+    with pytest.raises(TypeError):
+        load_factory('core_service.runner:SHUTDOWN_SIGNALS')
+    with pytest.raises(AttributeError):
+        load_factory('tests.test_runner:Missing')
+
+
+def test_main():
+    result = run_process('-m', 'core_service', 'tests.test_runner:SelfTerminatingService', '--log-level', 'debug')
+    assert result.returncode == 0
+    assert b'Stopping SelfTerminatingService service' in result.stderr
+
+
+def test_main_log_sink():
+    result = run_process('-m', 'core_service', 'tests.test_runner:SelfTerminatingService',
+                         '--log-level', 'debug', '--log-sink')
+    assert result.returncode == 0
+    assert b'[SelfTerminatingService] Service was stopped' in result.stderr
+    result = run_process('-m', 'core_service', 'tests.test_runner:SelfTerminatingService',
+                         '--log-sink', '--processes', '2')
+    assert result.returncode == 2
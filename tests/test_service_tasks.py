@@ -50,8 +50,94 @@ async def test_service_task_with_exception():
 
     service = FailTaskService()
     await service.start()
-    await asyncio.sleep(0)
+    await asyncio.sleep(0.01)
+
+    assert service.running is False
+
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_task_failure_detected_without_polling():
+    """Failed task stops the service regardless of the monitoring interval.
+    """
+    class FailTaskService(Service):
+        @task(periodic=False)
+        async def example_fail_task(self):
+            await asyncio.sleep(0.01)
+            raise Exception("Fail for example")
+
+    service = FailTaskService(monitoring_interval=10)
+    await service.start()
+    await asyncio.sleep(0.05)
 
     assert service.running is False
+    assert isinstance(service._tasks.failure, Exception)
+
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_fixed_rate_task():
+    class FixedRateService(Service):
+        def __init__(self):
+            super().__init__()
+            self.started = []
+
+        @task(schedule='fixed_rate', sleep_interval=0.05)
+        async def example_task(self):
+            self.started.append(self.loop.time())
+            await asyncio.sleep(0.02)
+
+    service = FixedRateService()
+    await service.start()
+    await asyncio.sleep(0.22)
+    await service.stop()
+    periods = [b - a for a, b in zip(service.started, service.started[1:])]
+    assert len(periods) >= 3
+    # runtime is not added to the period
+    assert all(period < 0.065 for period in periods)
+    assert service.get_task('example_task').missed_ticks == 0
+
+
+@pytest.mark.asyncio
+async def test_fixed_rate_missed_ticks():
+    class SlowService(Service):
+        @task(schedule='fixed_rate', sleep_interval=0.02)
+        async def example_task(self):
+            await asyncio.sleep(0.05)
+
+    service = SlowService()
+    await service.start()
+    await asyncio.sleep(0.12)
+    await service.stop()
+    assert service.get_task('example_task').missed_ticks >= 2
+
+
+@pytest.mark.asyncio
+async def test_staggered_workers_with_jitter(monkeypatch):
+    jitters = []
+
+    def uniform(a, b):
+        jitters.append(b)
+        return 0
 
+    monkeypatch.setattr('core_service.tasks.random.uniform', uniform)
+
+    class StaggeredService(Service):
+        def __init__(self):
+            super().__init__()
+            self.started = {}
+
+        @task(sleep_interval=0.1, workers=2, stagger=True, jitter=0.01)
+        async def example_task(self):
+            self.started.setdefault(asyncio.current_task().get_name(), self.loop.time())
+
+    service = StaggeredService()
+    await service.start()
+    await asyncio.sleep(0.08)
     await service.stop()
+    first = service.started['StaggeredService.example_task.0']
+    second = service.started['StaggeredService.example_task.1']
+    assert 0.04 < second - first < 0.07
+    assert jitters and set(jitters) == {0.01}
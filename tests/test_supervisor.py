@@ -0,0 +1,122 @@
+import asyncio
+import os
+import signal
+import time
+
+import pytest
+
+from core_service import Service
+from core_service.supervisor import Supervisor, shard
+
+
+class FileService(Service):
+    """Write worker pid and shard into the directory on start and stop."""
+    def __init__(self, path, worker_index=None, workers=None):
+        super().__init__()
+        self.path = path
+        self.items = shard(range(6), worker_index, workers) if workers else []
+
+    async def start(self):
+        await super().start()
+        with open(os.path.join(self.path, 'started-%i' % os.getpid()), 'w') as f:
+            f.write(','.join(map(str, self.items)))
+
+    async def stop(self):
+        await super().stop()
+        open(os.path.join(self.path, 'stopped-%i' % os.getpid()), 'w').close()
+
+
+class HangingStopService(FileService):
+    async def stop(self):
+        await super().stop()
+        await asyncio.sleep(10)
+
+
+class Factory:
+    def __init__(self, path, service_class=FileService):
+        self.path = str(path)
+        self.service_class = service_class
+
+    def __call__(self, **kwargs):
+        return self.service_class(self.path, **kwargs)
+
+
+def wait_for(condition, timeout=5.):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def started(path):
+    return [name for name in os.listdir(path) if name.startswith('started-')]
+
+
+def test_shard():
+    assert shard([1, 2, 3, 4, 5], 1, 2) == [2, 4]
+
+
+def test_supervisor_restarts_and_stops_workers(tmp_path):
+    supervisor = Supervisor(Factory(tmp_path), processes=2, restart_backoff=0.01, stop_timeout=5)
+    supervisor.start()
+    try:
+        wait_for(lambda: len(started(tmp_path)) == 2)
+        crashed = supervisor.workers[0]
+        os.kill(crashed.pid, signal.SIGKILL)
+        deadline = time.monotonic() + 5
+        while supervisor.restarts[0] == 0:
+            assert time.monotonic() < deadline
+            supervisor.supervise(0.05)
+        assert supervisor.workers[0].pid != crashed.pid
+        wait_for(lambda: len(started(tmp_path)) == 3)
+    finally:
+        supervisor.stop()
+    assert supervisor.workers == [None, None]
+    stopped = [name for name in os.listdir(tmp_path) if name.startswith('stopped-')]
+    # killed worker was not stopped gracefully
+    assert len(stopped) == 2
+
+
+def test_supervisor_sharded_workers(tmp_path):
+    supervisor = Supervisor(Factory(tmp_path), processes=3, sharded=True)
+    supervisor.start()
+    try:
+        wait_for(lambda: len(started(tmp_path)) == 3)
+    finally:
+        supervisor.stop()
+    shards = sorted((tmp_path / name).read_text() for name in started(tmp_path))
+    assert shards == ['0,3', '1,4', '2,5']
+
+
+def test_supervisor_shutdown_timeout(tmp_path):
+    supervisor = Supervisor(Factory(tmp_path, HangingStopService), processes=1, shutdown_timeout=0.1)
+    assert supervisor.stop_timeout == 1.1
+    supervisor.start()
+    worker = supervisor.workers[0]
+    try:
+        wait_for(lambda: len(started(tmp_path)) == 1)
+    finally:
+        supervisor.stop()
+    # worker gave up waiting for the stop and exited on its own instead of being killed
+    assert worker.exitcode == 1
+
+
+def test_supervisor_arguments():
+    with pytest.raises(ValueError):
+        Supervisor(Service, processes=0)
+    with pytest.raises(ValueError):
+        Supervisor(Service, restart_backoff=2, restart_backoff_max=1)
+    assert Supervisor(Service).processes == os.cpu_count()
+
+
+@pytest.mark.asyncio
+async def test_wait_stopped():
+    service = Service()
+    with pytest.raises(RuntimeError):
+        await service.wait_stopped()
+    await service.start()
+    waiter = asyncio.ensure_future(service.wait_stopped())
+    await asyncio.sleep(0)
+    assert not waiter.done()
+    await service.stop()
+    await asyncio.wait_for(waiter, 1)
@@ -2,6 +2,7 @@ import asyncio
 
 import pytest
 
+from core_service.exceptions import UnexpectedTaskException
 from core_service.tasks import TasksCollection
 
 
@@ -13,6 +14,48 @@ async def example_task():
 async def test_finished_task_removed(event_loop):
     collection = TasksCollection()
     collection.add(event_loop.create_task(example_task()))
-    await asyncio.sleep(0)
+    await asyncio.sleep(0.01)
     collection.check_all()
     assert len(collection.tasks) == 0
+
+
+async def fail_task():
+    raise Exception("Fail for example")
+
+
+@pytest.mark.asyncio
+async def test_failed_task_reported(event_loop):
+    failures = []
+    collection = TasksCollection(on_failure=lambda task, e: failures.append(e))
+    for _ in range(3):
+        collection.add(event_loop.create_task(fail_task()))
+    await asyncio.sleep(0.01)
+    assert len(collection.tasks) == 0
+    assert len(failures) == 3
+    with pytest.raises(UnexpectedTaskException):
+        collection.check_all()
+
+
+async def wait_forever():
+    await asyncio.Event().wait()
+
+
+@pytest.mark.asyncio
+async def test_indexed_tasks(event_loop):
+    collection = TasksCollection()
+    first = event_loop.create_task(wait_forever())
+    collection.add(first, 'consume', 0)
+    collection.add(event_loop.create_task(wait_forever()), 'consume', 1)
+    assert collection.get('consume', 0) is first
+    assert len(collection) == 2
+    with pytest.raises(ValueError):
+        collection.add(event_loop.create_task(example_task()), 'consume', 0)
+    first.cancel()
+    await asyncio.sleep(0.01)
+    with pytest.raises(KeyError):
+        collection.get('consume', 0)
+    # index of the finished task can be taken by a new one
+    collection.add(event_loop.create_task(wait_forever()), 'consume', 0)
+    await collection.stop_all()
+    await asyncio.sleep(0.01)
+    assert len(collection) == 0
@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+
+from core_service import Service, task
+from core_service.container import ServiceCollection
+from core_service.exceptions import DegradedException
+from core_service.tasks import ServiceTask
+
+
+class FlakyService(Service):
+    def __init__(self, fail_times, **kwargs):
+        super().__init__(**kwargs)
+        self.fail_times = fail_times
+        self.calls = 0
+
+    @task(on_error='retry', retry_backoff=0.01, sleep_interval=0.01)
+    async def flaky(self):
+        self.calls += 1
+        if self.calls <= self.fail_times:
+            raise Exception("Flaky failure")
+
+
+async def wait_until(condition, timeout=2.):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.001)
+
+
+@pytest.mark.asyncio
+async def test_retry_failed_task():
+    service = FlakyService(fail_times=2, monitoring_interval=0.005)
+    await service.start()
+    flaky = service.get_task('flaky')
+    await wait_until(lambda: flaky.degraded)
+    with pytest.raises(DegradedException, match='flaky'):
+        await service.healthcheck()
+    await wait_until(lambda: service.calls > 3)
+    assert service.running
+    assert not flaky.degraded
+    assert flaky.failures == 2
+    await service.healthcheck()
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_retry_backoff():
+    service = FlakyService(fail_times=100)
+    service.running = True
+    await service._start_service_tasks()
+    flaky = service.get_task('flaky')
+    assert flaky._failed(Exception(), False) == 0.01
+    assert flaky._failed(Exception(), False) == 0.02
+    flaky.consecutive_failures = 100
+    assert flaky._failed(Exception(), False) == flaky.retry_backoff_max
+    service.running = False
+    service.should_stop = True
+    await service._stop_service_tasks()
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker():
+    class BrokenBackendService(Service):
+        def __init__(self):
+            super().__init__()
+            self.calls = 0
+            self.broken = True
+
+        @task(on_error='retry', retry_backoff=0, max_failures=3, circuit_reset_timeout=0.2,
+              sleep_interval=0, workers=2)
+        async def call_backend(self):
+            self.calls += 1
+            await asyncio.sleep(0.001)
+            if self.broken:
+                raise Exception("Backend is down")
+
+    service = BrokenBackendService()
+    await service.start()
+    call_backend = service.get_task('call_backend')
+    await wait_until(lambda: call_backend.circuit_state == 'open')
+    calls = service.calls
+    failures = call_backend.failures
+    # the other worker may finish a call started before the circuit was opened
+    assert calls <= 4
+    # single probe after reset timeout fails and opens circuit again,
+    # the next probe is not due for another reset timeout
+    await wait_until(lambda: call_backend.failures > failures)
+    assert call_backend.circuit_state == 'open'
+    assert service.calls == calls + 1
+
+    service.broken = False
+    await wait_until(lambda: call_backend.circuit_state == 'closed')
+    await wait_until(lambda: service.calls > calls + 3)
+    assert service.running
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_opens_circuit(monkeypatch):
+    service = FlakyService(fail_times=0)
+    service.running = True
+    await service._start_service_tasks()
+    flaky = service.get_task('flaky')
+    flaky.circuit_state = 'half_open'
+
+    async def cancelled():
+        raise asyncio.CancelledError
+
+    flaky.callable = cancelled
+
+    async def probe(self):
+        return True
+
+    monkeypatch.setattr(ServiceTask, '_wait_circuit', probe)
+    with pytest.raises(asyncio.CancelledError):
+        await flaky._iteration(0)
+    assert flaky.circuit_state == 'open'
+    service.running = False
+    service.should_stop = True
+    await service._stop_service_tasks()
+
+
+@pytest.mark.asyncio
+async def test_degraded_nested_service():
+    collection = ServiceCollection()
+    healthy = Service()
+    degraded = FlakyService(fail_times=100)
+    collection.add(healthy)
+    collection.add(degraded)
+    await collection.start_all()
+    await asyncio.sleep(0.01)
+    with pytest.raises(DegradedException, match='FlakyService'):
+        await collection.healthcheck()
+    await collection.stop_all()
@@ -0,0 +1,176 @@
+import asyncio
+
+import pytest
+
+from core_service import Service, task
+
+
+class WorkersService(Service):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.runs = {}
+
+    @task(workers=3, sleep_interval=0.01)
+    async def work(self):
+        name = asyncio.current_task().get_name()
+        self.runs[name] = self.runs.get(name, 0) + 1
+
+    @task(periodic=False)
+    async def block(self):
+        await asyncio.sleep(10)
+
+
+@pytest.mark.asyncio
+async def test_list_workers():
+    service = WorkersService()
+    await service.start()
+    await asyncio.sleep(0.01)
+    workers = service.list_workers('work')
+    assert [worker['index'] for worker in workers] == [0, 1, 2]
+    assert workers[0]['name'] == 'WorkersService.work.0'
+    assert not workers[0]['retiring']
+    assert len(service.list_workers()) == 4
+    block, = service.list_workers('block')
+    assert block['busy']
+    assert service._tasks.get('block', 0) is service.get_task('block').get_worker(0)
+    with pytest.raises(KeyError):
+        service.list_workers('unknown')
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_restart_worker():
+    service = WorkersService()
+    await service.start()
+    work = service.get_task('work')
+    old = work.get_worker(1)
+    new = await service.restart_worker('work', 1)
+    assert old.cancelled()
+    assert new is work.get_worker(1) is service._tasks.get('work', 1)
+    assert new.get_name() == 'WorkersService.work.1'
+    assert work.workers == 3
+    await asyncio.sleep(0.03)
+    assert service.runs['WorkersService.work.1'] >= 2
+    with pytest.raises(KeyError):
+        await service.restart_worker('work', 5)
+    await service.healthcheck()
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_cancel_worker():
+    service = WorkersService()
+    await service.start()
+    work = service.get_task('work')
+    await service.cancel_worker('work', 0)
+    assert sorted(work.worker_tasks) == [1, 2]
+    assert work.workers == 2
+    with pytest.raises(KeyError):
+        service._tasks.get('work', 0)
+    # the lowest free index is reused
+    assert work.start_worker().get_name() == 'WorkersService.work.0'
+    assert work.start_worker().get_name() == 'WorkersService.work.3'
+    with pytest.raises(ValueError):
+        work.start_worker(3)
+    await service.healthcheck()
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_worker_cancelled_before_start():
+    service = WorkersService()
+    await service.start()
+    work = service.get_task('work')
+    worker = work.start_worker()
+    await service.cancel_worker('work', 3)
+    assert worker.cancelled()
+    assert 3 not in work.worker_tasks
+    assert work.start_worker().get_name() == 'WorkersService.work.3'
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_cancel_autoscaled_worker():
+    class ScalingService(Service):
+        @task(min_workers=1, max_workers=3, workers=2, sleep_interval=0.01, scale_interval=0.01,
+              scale_cooldown=10)
+        async def work(self):
+            await asyncio.sleep(0.005)
+
+    service = ScalingService()
+    await service.start()
+    work = service.get_task('work')
+    await service.cancel_worker('work', 1)
+    assert work.workers == 1
+    with pytest.raises(ValueError):
+        await service.cancel_worker('work', 0)
+    work._scale(2, "test")
+    await asyncio.sleep(0.003)
+    # busy worker retired by scale down is not counted twice
+    work._scale(1, "test")
+    retiring, = work._retiring
+    await service.cancel_worker('work', retiring)
+    assert work.workers == 1
+    await asyncio.sleep(0.03)
+    assert service.running
+    await service.healthcheck()
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_index_reused_before_done_callback():
+    class JobService(Service):
+        runs = 0
+
+        @task(periodic=False)
+        async def job(self):
+            self.runs += 1
+            if self.runs > 1:
+                await asyncio.sleep(10)
+
+    service = JobService()
+    await service.start()
+    job = service.get_task('job')
+    first = job.get_worker(0)
+    while not first.done():
+        await asyncio.sleep(0)
+    # done callback of the finished worker is not called yet
+    worker = job.start_worker()
+    assert worker.get_name() == 'JobService.job.0'
+    assert service._tasks.get('job', 0) is worker
+    await asyncio.sleep(0.01)
+    # done callback of the finished worker doesn't remove the new one
+    assert service._tasks.get('job', 0) is worker
+    await service.healthcheck()
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_worker_resends_batch():
+    class BatchService(Service):
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            self.batches = []
+
+        @task(queue=0, batch_size=10, max_batch_latency=10, workers=2)
+        async def consume(self, items):
+            self.batches.append(items)
+
+    service = BatchService()
+    await service.start()
+    consume = service.get_task('consume')
+    for i in range(4):
+        await service.submit('consume', i)
+        # let both workers take items
+        await asyncio.sleep(0.005)
+    collected = {index: list(batch) for index, batch in consume._batches.items()}
+    assert collected[0] and collected[1]
+    await service.restart_worker('consume', 0)
+    await service.cancel_worker('consume', 1)
+    # partial batches are passed without waiting for latency or stop
+    await asyncio.wait_for(consume.queue.join(), 1)
+    assert sorted(service.batches) == sorted(collected.values())
+    # only the new worker collects its batch
+    assert consume._batches == {0: []}
+    await service.healthcheck()
+    await service.stop()
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from core_service import Service, requirements, task
+from core_service.timers import TimerWheel
+
+
+@pytest.mark.asyncio
+async def test_timer_wheel_sleep():
+    loop = asyncio.get_running_loop()
+    wheel = TimerWheel(loop, resolution=0.01, slots=4)
+    started = loop.time()
+    # longer than a full wheel turn
+    await asyncio.gather(wheel.sleep(0.02), wheel.sleep(0.07))
+    elapsed = loop.time() - started
+    assert 0.06 <= elapsed < 0.1
+    assert wheel.pending == 0
+    await asyncio.sleep(0.02)
+    assert wheel._task is None
+
+
+@pytest.mark.asyncio
+async def test_timer_wheel_cancel_and_close():
+    loop = asyncio.get_running_loop()
+    wheel = TimerWheel(loop, resolution=0.01)
+    cancelled = loop.create_task(wheel.sleep(0.05))
+    closed = loop.create_task(wheel.sleep(10))
+    await asyncio.sleep(0.01)
+    assert wheel.pending == 2
+    cancelled.cancel()
+    await asyncio.sleep(0.05)
+    assert wheel.pending == 1
+    await wheel.close()
+    assert closed.cancelled()
+    assert wheel.pending == 0
+
+
+def test_timer_wheel_arguments():
+    with pytest.raises(ValueError):
+        TimerWheel(None, resolution=0)
+    with pytest.raises(ValueError):
+        TimerWheel(None, slots=0)
+
+
+@pytest.mark.asyncio
+async def test_service_tree_timer_wheel():
+    class PeriodicService(Service):
+        counter = 0
+
+        @task(sleep_interval=0.01, workers=10)
+        async def example_task(self):
+            self.counter += 1
+
+    class RootService(Service):
+        def __init__(self):
+            super().__init__(timer_resolution=0.005)
+            self.nested = PeriodicService()
+
+        @requirements()
+        async def nested_services(self):
+            return [self.nested]
+
+    service = RootService()
+    await service.start()
+    wheel = service.timer_wheel
+    assert wheel is not None
+    assert service.nested.timer_wheel is None
+    assert service.nested.get_task('example_task')._sleep == wheel.sleep
+    await asyncio.sleep(0.05)
+    assert wheel.pending == 10
+    assert service.nested.counter >= 30
+    await service.stop()
+    assert service.timer_wheel is None
+    assert wheel._task is None
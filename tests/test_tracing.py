@@ -0,0 +1,151 @@
+import asyncio
+import json
+
+import pytest
+
+from core_service import Service, requirements, task
+from core_service import tracing
+from core_service.tracing import JsonFileExporter, MemoryExporter, Subscriber
+
+
+class WorkerService(Service):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.iterations = 0
+
+    async def start(self):
+        await asyncio.sleep(0.01)
+        await super().start()
+
+    @task(sleep_interval=0.01)
+    async def work(self):
+        self.iterations += 1
+        if self.iterations == 2:
+            raise ValueError("EXPECTED_EXCEPTION")
+
+    @task(periodic=False)
+    async def once(self):
+        pass
+
+
+class ParentService(Service):
+    @requirements()
+    async def workers(self):
+        return [WorkerService()]
+
+
+class Events(Subscriber):
+    def __init__(self):
+        self.events = []
+
+    def on_start(self, span):
+        self.events.append(('start', span.name, span.service))
+
+    def on_end(self, span):
+        self.events.append(('end', span.name, span.service))
+
+
+def spans_by_name(exporter):
+    spans = {}
+    for span in exporter.spans:
+        spans.setdefault((span.name, span.service, span.task), []).append(span)
+    return spans
+
+
+@pytest.mark.asyncio
+async def test_lifecycle_spans():
+    service = ParentService()
+    with MemoryExporter() as exporter:
+        await service.start()
+        await service.healthcheck()
+        await service.stop()
+    assert not tracing.subscribers
+    spans = spans_by_name(exporter)
+    parent_start, = spans['start', 'ParentService', None]
+    nested_start, = spans['start', 'WorkerService', None]
+    # overridden start is traced once as a whole
+    assert nested_start.duration >= 0.01
+    assert nested_start.parent_id == parent_start.span_id
+    assert parent_start.parent_id is None
+    assert parent_start.duration >= nested_start.duration
+    parent_stop, = spans['stop', 'ParentService', None]
+    nested_stop, = spans['stop', 'WorkerService', None]
+    assert nested_stop.parent_id == parent_stop.span_id
+    # startup healthcheck of the nested service
+    assert any(span.parent_id == parent_start.span_id for span in spans['healthcheck', 'WorkerService', None])
+    assert all(span.parent_id is None for span in spans['healthcheck', 'ParentService', None])
+
+
+@pytest.mark.asyncio
+async def test_task_spans():
+    service = WorkerService()
+    with MemoryExporter() as exporter:
+        await service.start()
+        await asyncio.sleep(0.05)
+        await service.stop()
+    spans = spans_by_name(exporter)
+    once, = spans['task', 'WorkerService', 'once']
+    assert once.worker == 0
+    # iterations are not children of the start span
+    assert once.parent_id is None
+    work = spans['task', 'WorkerService', 'work']
+    assert len(work) >= 2
+    assert work[0].error is None
+    assert 'EXPECTED_EXCEPTION' in work[1].error
+    summary = {(group['name'], group['task']): group for group in exporter.summary()}
+    assert summary['task', 'work']['count'] == len(work)
+    assert summary['task', 'work']['errors'] == 1
+    assert summary['start', None]['total'] == spans['start', 'WorkerService', None][0].duration
+
+
+@pytest.mark.asyncio
+async def test_start_end_events():
+    service = Service()
+    with Events() as subscriber:
+        await service.start()
+        await service.stop()
+    assert subscriber.events == [
+        ('start', 'start', 'Service'), ('end', 'start', 'Service'),
+        ('start', 'stop', 'Service'), ('end', 'stop', 'Service'),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_failed_start_span():
+    class FailService(Service):
+        async def start(self):
+            raise RuntimeError("EXPECTED_EXCEPTION")
+
+    with MemoryExporter() as exporter:
+        with pytest.raises(RuntimeError):
+            await FailService().start()
+    span, = exporter.spans
+    assert span.name == 'start'
+    assert 'EXPECTED_EXCEPTION' in span.error
+
+
+@pytest.mark.asyncio
+async def test_json_file_exporter(tmp_path):
+    path = str(tmp_path / 'trace.jsonl')
+    service = ParentService()
+    with JsonFileExporter(path):
+        await service.start()
+        await service.stop()
+    with open(path) as f:
+        spans = [json.loads(line) for line in f]
+    assert {(span['name'], span['service']) for span in spans} >= {
+        ('start', 'ParentService'), ('start', 'WorkerService'),
+        ('stop', 'ParentService'), ('stop', 'WorkerService'),
+    }
+    assert all(span['duration'] is not None for span in spans)
+
+
+def test_maxlen():
+    exporter = MemoryExporter(maxlen=2)
+    for i in range(3):
+        span = tracing.Span('task', 'Service', 'work', i)
+        span.finish()
+        exporter.on_end(span)
+    assert [span.worker for span in exporter.spans] == [1, 2]
+    exporter.clear()
+    assert not exporter.spans